@@ -0,0 +1,134 @@
+"""Attendance tracking partitions
+
+Revision ID: e5d1c94b7a28
+Revises: c6b2e8d47f15
+Create Date: 2026-10-16 18:12:07.350118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5d1c94b7a28'
+down_revision: Union[str, None] = 'c6b2e8d47f15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The partition key is part of the primary key, so it can not be NULL.
+    # Pings without a timestamp are moved to the start of their class.
+    op.execute(
+        """
+        UPDATE attendance_tracking
+        SET created_at_in_utc = (
+            schedule_instances.date + schedule_instances.start_time_in_utc
+        ) AT TIME ZONE 'UTC'
+        FROM schedule_instances
+        WHERE attendance_tracking.schedule_instance_id = schedule_instances.id
+        AND attendance_tracking.created_at_in_utc IS NULL
+        """
+    )
+
+    # Move the existing table out of the way, the new one keeps its sequence
+    op.drop_index('ix_attendance_tracking_schedule_instance_user', table_name='attendance_tracking')
+    op.drop_index('ix_attendance_tracking_id', table_name='attendance_tracking')
+    op.rename_table('attendance_tracking', 'attendance_tracking_unpartitioned')
+    op.execute('ALTER TABLE attendance_tracking_unpartitioned RENAME CONSTRAINT attendance_tracking_pkey TO attendance_tracking_unpartitioned_pkey')
+    op.execute('ALTER SEQUENCE attendance_tracking_id_seq OWNED BY NONE')
+
+    op.create_table('attendance_tracking',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('attendance_tracking_id_seq')"), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('schedule_instance_id', sa.Integer(), nullable=False),
+    sa.Column('created_at_in_utc', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['schedule_instance_id'], ['schedule_instances.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id', 'created_at_in_utc'),
+    postgresql_partition_by='RANGE (created_at_in_utc)'
+    )
+    op.execute('ALTER SEQUENCE attendance_tracking_id_seq OWNED BY attendance_tracking.id')
+    op.create_index(op.f('ix_attendance_tracking_id'), 'attendance_tracking', ['id'], unique=False)
+    op.create_index('ix_attendance_tracking_schedule_instance_user', 'attendance_tracking', ['schedule_instance_id', 'user_id', 'created_at_in_utc'], unique=False)
+
+    # A partition per month, from the oldest ping up to two months ahead.
+    # From then on the manage_attendance_tracking_partitions job keeps up.
+    op.execute(
+        """
+        DO $$
+        DECLARE
+            month timestamp;
+        BEGIN
+            FOR month IN
+                SELECT generate_series(
+                    date_trunc(
+                        'month',
+                        COALESCE(
+                            (SELECT MIN(created_at_in_utc) FROM attendance_tracking_unpartitioned),
+                            now()
+                        ) AT TIME ZONE 'UTC'
+                    ),
+                    date_trunc('month', now() AT TIME ZONE 'UTC') + interval '2 months',
+                    interval '1 month'
+                )
+            LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF attendance_tracking FOR VALUES FROM (%L) TO (%L)',
+                    'attendance_tracking_y' || to_char(month, 'YYYY') || 'm' || to_char(month, 'MM'),
+                    month AT TIME ZONE 'UTC',
+                    (month + interval '1 month') AT TIME ZONE 'UTC'
+                );
+            END LOOP;
+        END
+        $$
+        """
+    )
+
+    op.execute(
+        """
+        INSERT INTO attendance_tracking (
+            id, user_id, schedule_instance_id, created_at_in_utc
+        )
+        SELECT id, user_id, schedule_instance_id, created_at_in_utc
+        FROM attendance_tracking_unpartitioned
+        """
+    )
+    op.drop_table('attendance_tracking_unpartitioned')
+
+
+def downgrade() -> None:
+    # Detached partitions are left alone, only attached ones are copied back
+    op.drop_index('ix_attendance_tracking_schedule_instance_user', table_name='attendance_tracking')
+    op.drop_index('ix_attendance_tracking_id', table_name='attendance_tracking')
+    op.rename_table('attendance_tracking', 'attendance_tracking_partitioned')
+    op.execute('ALTER TABLE attendance_tracking_partitioned RENAME CONSTRAINT attendance_tracking_pkey TO attendance_tracking_partitioned_pkey')
+    op.execute('ALTER SEQUENCE attendance_tracking_id_seq OWNED BY NONE')
+
+    op.create_table('attendance_tracking',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('attendance_tracking_id_seq')"), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('schedule_instance_id', sa.Integer(), nullable=False),
+    sa.Column('created_at_in_utc', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['schedule_instance_id'], ['schedule_instances.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute('ALTER SEQUENCE attendance_tracking_id_seq OWNED BY attendance_tracking.id')
+
+    op.execute(
+        """
+        INSERT INTO attendance_tracking (
+            id, user_id, schedule_instance_id, created_at_in_utc
+        )
+        SELECT id, user_id, schedule_instance_id, created_at_in_utc
+        FROM attendance_tracking_partitioned
+        """
+    )
+    # Drops the attached partitions along with it
+    op.drop_table('attendance_tracking_partitioned')
+
+    op.create_index(op.f('ix_attendance_tracking_id'), 'attendance_tracking', ['id'], unique=False)
+    op.create_index('ix_attendance_tracking_schedule_instance_user', 'attendance_tracking', ['schedule_instance_id', 'user_id', 'created_at_in_utc'], unique=False)
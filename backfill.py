@@ -0,0 +1,131 @@
+import argparse
+import asyncio
+import time
+
+from datetime import date, timedelta
+
+from jobs.schedule_instances import (
+    materialize_schedule_instances_for_date_range,
+)
+from sqlite.crud import schedules
+from sqlite.database import sessionmanager
+
+
+def return_date_range_chunks(
+    start_date: date, end_date: date, days_per_chunk: int
+) -> list[tuple[date, date]]:
+    """Split a date range (inclusive) into consecutive chunks"""
+    if days_per_chunk < 1:
+        raise ValueError("days_per_chunk should be at least 1")
+
+    chunks = []
+    chunk_start_date = start_date
+
+    while chunk_start_date <= end_date:
+        chunk_end_date = min(
+            chunk_start_date + timedelta(days=days_per_chunk - 1), end_date
+        )
+        chunks.append((chunk_start_date, chunk_end_date))
+        chunk_start_date = chunk_end_date + timedelta(days=1)
+
+    return chunks
+
+
+async def backfill(
+    start_date: date, end_date: date, workers: int, days_per_chunk: int
+):
+    async with sessionmanager.session() as db:
+        result = await db.execute(schedules.get_schedule_rows_query())
+        db_schedules = result.all()
+
+    queue = asyncio.Queue()
+    for chunk in return_date_range_chunks(
+        start_date=start_date,
+        end_date=end_date,
+        days_per_chunk=days_per_chunk,
+    ):
+        queue.put_nowait(chunk)
+
+    created_schedule_instances_counts = []
+
+    # Every worker has its own session, and so its own connection
+    async def work():
+        while not queue.empty():
+            chunk_start_date, chunk_end_date = queue.get_nowait()
+            chunk_started_at = time.perf_counter()
+
+            async with sessionmanager.session() as db:
+                created_schedule_instances_count = (
+                    await materialize_schedule_instances_for_date_range(
+                        db_schedules=db_schedules,
+                        start_date=chunk_start_date,
+                        end_date=chunk_end_date,
+                        db=db,
+                    )
+                )
+
+            created_schedule_instances_counts.append(
+                created_schedule_instances_count
+            )
+            print(
+                f"{chunk_start_date} to {chunk_end_date}: created "
+                + f"{created_schedule_instances_count} instances in "
+                + f"{time.perf_counter() - chunk_started_at:.2f}s"
+            )
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*[work() for _ in range(workers)])
+    elapsed = time.perf_counter() - started_at
+
+    created_schedule_instances_count = sum(created_schedule_instances_counts)
+    print(
+        f"Created {created_schedule_instances_count} instances for "
+        + f"{len(db_schedules)} schedules in {elapsed:.2f}s "
+        + f"({created_schedule_instances_count / elapsed:.1f} instances/sec)"
+    )
+
+
+async def main(args: argparse.Namespace):
+    try:
+        await backfill(
+            start_date=args.start_date,
+            end_date=args.end_date,
+            workers=args.workers,
+            days_per_chunk=args.days_per_chunk,
+        )
+    finally:
+        await sessionmanager.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Create schedule instances or classes for a date range. "
+        + "Instances that already exist are skipped, so a range can safely "
+        + "be backfilled again."
+    )
+    parser.add_argument("start_date", type=date.fromisoformat)
+    parser.add_argument("end_date", type=date.fromisoformat)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Number of chunks backfilled concurrently",
+    )
+    parser.add_argument(
+        "--days-per-chunk",
+        type=int,
+        default=7,
+        help="Number of days every worker backfills in one transaction",
+    )
+    args = parser.parse_args()
+
+    if args.start_date > args.end_date:
+        parser.error("start_date should not be after end_date")
+    if args.workers < 1:
+        parser.error("--workers should be at least 1")
+    if args.days_per_chunk < 1:
+        parser.error("--days-per-chunk should be at least 1")
+
+    asyncio.run(main(args))
+
+# python backfill.py 2025-01-01 2025-03-31 --workers 4
@@ -0,0 +1,131 @@
+import argparse
+import asyncio
+import statistics
+import time
+
+from utils.password import (
+    PasswordPool,
+    get_password_hash,
+    verify_password,
+)
+
+
+BENCHMARK_PASSWORD = "benchmark"
+
+
+async def measure_event_loop_lag(
+    stop: asyncio.Event, interval_in_seconds: float
+) -> list[float]:
+    """How late every tick of a fixed interval sleep wakes up"""
+    lags = []
+
+    while not stop.is_set():
+        started_at = time.perf_counter()
+        await asyncio.sleep(interval_in_seconds)
+        lags.append(time.perf_counter() - started_at - interval_in_seconds)
+
+    return lags
+
+
+async def benchmark(
+    mode: str,
+    logins: int,
+    concurrency: int,
+    workers: int,
+    interval_in_seconds: float,
+):
+    hashed_password = get_password_hash(password=BENCHMARK_PASSWORD)
+    password_pool = PasswordPool(max_workers=workers)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    # What authenticate_user did before, and what it does now
+    async def login():
+        async with semaphore:
+            if mode == "inline":
+                verify_password(
+                    plain_password=BENCHMARK_PASSWORD,
+                    hashed_password=hashed_password,
+                )
+            else:
+                await password_pool.verify(
+                    plain_password=BENCHMARK_PASSWORD,
+                    hashed_password=hashed_password,
+                )
+
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(
+        measure_event_loop_lag(
+            stop=stop, interval_in_seconds=interval_in_seconds
+        )
+    )
+    # Let the probe take its first tick before the logins start
+    await asyncio.sleep(0)
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*[login() for _ in range(logins)])
+    elapsed = time.perf_counter() - started_at
+
+    stop.set()
+    lags = sorted(await lag_task)
+
+    print(
+        f"{mode}: {logins} logins in {elapsed:.2f}s "
+        + f"({logins / elapsed:.1f} logins/sec), event loop lag "
+        + f"p50 {statistics.median(lags) * 1000:.1f}ms, "
+        + f"p99 {lags[int(len(lags) * 0.99)] * 1000:.1f}ms, "
+        + f"max {lags[-1] * 1000:.1f}ms over {len(lags)} ticks"
+    )
+
+
+async def main(args: argparse.Namespace):
+    for mode in args.modes:
+        await benchmark(
+            mode=mode,
+            logins=args.logins,
+            concurrency=args.concurrency,
+            workers=args.workers,
+            interval_in_seconds=args.interval_in_ms / 1000,
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Verify passwords like concurrent logins do, and report "
+        + "how late the event loop gets to everything else meanwhile. "
+        + "inline verifies on the event loop, pool on the password pool."
+    )
+    parser.add_argument(
+        "modes",
+        nargs="*",
+        choices=["inline", "pool"],
+        default=["inline", "pool"],
+    )
+    parser.add_argument(
+        "--logins",
+        type=int,
+        default=50,
+        help="Number of logins",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=20,
+        help="Number of logins in flight at once",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=2,
+        help="Number of password pool threads, like PASSWORD_POOL_MAX_WORKERS",
+    )
+    parser.add_argument(
+        "--interval-in-ms",
+        type=float,
+        default=10,
+        help="Interval of the event loop lag probe",
+    )
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
+
+# python benchmark_logins.py inline pool --logins 50 --concurrency 20
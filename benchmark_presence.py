@@ -0,0 +1,242 @@
+import argparse
+import asyncio
+import random
+import time
+
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import insert, select
+
+from constants import time_constants
+
+from sqlite import models
+from sqlite.crud.attendance_tracking import (
+    get_presence_intervals_query,
+    return_merged_presence_intervals,
+)
+from sqlite.database import sessionmanager
+
+from utils.date_utils import return_schedule_instance_window
+
+
+# Pings inserted per statement in sql mode
+INSERT_BATCH_ROWS = 10000
+
+
+def return_created_at_lists(
+    user_ids: list[int],
+    pings: int,
+    start: datetime,
+    end: datetime,
+    seed: int,
+) -> dict[int, list[datetime]]:
+    """Sorted timestamps of synthetic pings per user, spread over a class
+
+    Pings arrive about one ping interval apart with some jitter, a few are
+    sent twice, and every user drops out now and then, so there are bursts,
+    duplicates and gaps to merge.
+    """
+    rng = random.Random(seed)
+    ping_interval = time_constants.ATTENDANCE_TRACKING_PING_INTERVAL_IN_SECONDS
+    duration = (end - start).total_seconds()
+
+    created_at_lists = {}
+    for index, user_id in enumerate(user_ids):
+        ping_count = pings // len(user_ids) + (
+            1 if index < pings % len(user_ids) else 0
+        )
+
+        offsets = []
+        offset = rng.uniform(0, ping_interval)
+        while len(offsets) < ping_count:
+            offsets.append(offset % duration)
+
+            chance = rng.random()
+            if chance < 0.05:
+                offset += rng.uniform(0, 1)
+            elif chance < 0.07:
+                offset += rng.uniform(3, 20) * ping_interval
+            else:
+                offset += ping_interval + rng.uniform(-3, 3)
+
+        created_at_lists[user_id] = [
+            start + timedelta(seconds=offset) for offset in sorted(offsets)
+        ]
+
+    return created_at_lists
+
+
+def benchmark_python(args: argparse.Namespace):
+    """Merge in Python, like archived classes and bitmap storage do"""
+    start = datetime(2024, 1, 1, 8, 0, tzinfo=timezone.utc)
+    end = start + timedelta(minutes=args.duration_in_minutes)
+    created_at_lists = return_created_at_lists(
+        user_ids=list(range(1, args.users + 1)),
+        pings=args.pings,
+        start=start,
+        end=end,
+        seed=args.seed,
+    )
+
+    started_at = time.perf_counter()
+    user_intervals = {
+        user_id: return_merged_presence_intervals(
+            created_at_list=created_at_list,
+            start=start,
+            end=end,
+            gap_tolerance_in_seconds=args.gap_tolerance_in_seconds,
+        )
+        for user_id, created_at_list in created_at_lists.items()
+    }
+    elapsed = time.perf_counter() - started_at
+
+    print(
+        f"python: {args.pings} pings of {len(created_at_lists)} users "
+        + f"merged into {sum(map(len, user_intervals.values()))} "
+        + f"intervals in {elapsed:.3f}s "
+        + f"({args.pings / elapsed:,.0f} pings/sec)"
+    )
+
+
+async def benchmark_sql(args: argparse.Namespace):
+    """Merge in Postgres, like get_presence_by_schedule_instance_id does
+
+    The pings are inserted into the partitions of the class, which have to
+    exist, and rolled back once the query has been timed.
+    """
+    if args.schedule_instance_id is None:
+        print("sql: skipped, --schedule-instance-id is required")
+        return
+
+    async with sessionmanager.session() as db:
+        schedule_instance = await db.get(
+            models.ScheduleInstanceModel, args.schedule_instance_id
+        )
+        if not schedule_instance:
+            print("sql: skipped, schedule instance not found")
+            return
+
+        start, end = return_schedule_instance_window(
+            date=schedule_instance.date,
+            start_time_in_utc=schedule_instance.start_time_in_utc,
+            end_time_in_utc=schedule_instance.end_time_in_utc,
+        )
+        result = await db.execute(
+            select(models.UserModel.id)
+            .where(models.UserModel.is_student.is_(True))
+            .order_by(models.UserModel.id)
+            .limit(args.users)
+        )
+        user_ids = result.scalars().all()
+        if not user_ids:
+            print("sql: skipped, there are no students")
+            return
+
+        created_at_lists = return_created_at_lists(
+            user_ids=user_ids,
+            pings=args.pings,
+            start=start,
+            end=end,
+            seed=args.seed,
+        )
+        rows = [
+            {
+                "user_id": user_id,
+                "schedule_instance_id": args.schedule_instance_id,
+                "created_at_in_utc": created_at,
+            }
+            for user_id, created_at_list in created_at_lists.items()
+            for created_at in created_at_list
+        ]
+
+        started_at = time.perf_counter()
+        for index in range(0, len(rows), INSERT_BATCH_ROWS):
+            await db.execute(
+                insert(models.AttendanceTrackingModel),
+                rows[index : index + INSERT_BATCH_ROWS],
+            )
+        inserted_in = time.perf_counter() - started_at
+
+        started_at = time.perf_counter()
+        result = await db.execute(
+            get_presence_intervals_query(
+                schedule_instance_id=args.schedule_instance_id,
+                start=start,
+                end=end,
+                gap_tolerance_in_seconds=args.gap_tolerance_in_seconds,
+            )
+        )
+        intervals = result.all()
+        elapsed = time.perf_counter() - started_at
+
+        # Leave the class as it was
+        await db.rollback()
+
+    print(
+        f"sql: {len(rows)} pings of {len(user_ids)} users "
+        + f"(inserted in {inserted_in:.1f}s) merged into {len(intervals)} "
+        + f"intervals in {elapsed:.3f}s ({len(rows) / elapsed:,.0f} pings/sec)"
+    )
+
+
+async def main(args: argparse.Namespace):
+    for mode in args.modes:
+        if mode == "python":
+            benchmark_python(args)
+        else:
+            await benchmark_sql(args)
+
+    await sessionmanager.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Merge synthetic attendance tracking pings into presence "
+        + "intervals and report how long it takes. python merges like "
+        + "archived classes and bitmap storage do, sql runs the gaps and "
+        + "islands query against a class in Postgres."
+    )
+    parser.add_argument(
+        "modes",
+        nargs="*",
+        choices=["python", "sql"],
+        default=["python"],
+    )
+    parser.add_argument(
+        "--pings",
+        type=int,
+        default=1_000_000,
+        help="Number of pings",
+    )
+    parser.add_argument(
+        "--users",
+        type=int,
+        default=1000,
+        help="Number of users the pings are spread over",
+    )
+    parser.add_argument(
+        "--duration-in-minutes",
+        type=int,
+        default=480,
+        help="Length of the class in python mode",
+    )
+    parser.add_argument(
+        "--gap-tolerance-in-seconds",
+        type=float,
+        default=time_constants.ATTENDANCE_TRACKING_GAP_TOLERANCE_IN_SECONDS,
+    )
+    parser.add_argument(
+        "--schedule-instance-id",
+        type=int,
+        help="Class the pings are inserted into in sql mode",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+    )
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
+
+# python benchmark_presence.py python sql --schedule-instance-id 1
@@ -1,3 +1,13 @@
 DATE_TIME_FORMAT = "%Y-%m-%d"
 START_AND_END_TIME_FORMAT = "%H:%M:%S"
 CREATED_AND_UPDATED_AT_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+# Clients ping attendance tracking once every 30 seconds
+ATTENDANCE_TRACKING_PING_INTERVAL_IN_SECONDS = 30
+# Pings this far apart still count as one stretch of presence
+ATTENDANCE_TRACKING_GAP_TOLERANCE_IN_SECONDS = 90
+
+# How far ahead of the server a client's clock may be
+MAX_CLIENT_CLOCK_SKEW_IN_SECONDS = 30
+# How old a ping buffered offline may be, storage may bound it further
+MAX_ATTENDANCE_TRACKING_PING_AGE_IN_DAYS = 7
@@ -0,0 +1,219 @@
+from datetime import datetime, time, timedelta, timezone
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from secret import secret
+
+from sqlite import archive
+from sqlite.crud import attendance, attendance_tracking
+from sqlite.enums import AttendanceTrackingRetentionEnum
+from sqlite.models import ScheduleInstanceModel
+
+from jobs.instrumentation import job_phase, increment_job_counter
+
+from utils.date_utils import return_first_day_of_month
+
+
+async def manage_attendance_tracking_partitions(db: AsyncSession) -> None:
+    """Create the monthly attendance tracking partitions ahead of time.
+
+    Partitions are created from the current month up to the configured
+    number of months ahead, so a ping never lands on a missing partition.
+    With a retention period, partitions that ended before it are detached
+    and kept as standalone tables, or dropped.
+    """
+    now = datetime.now(tz=timezone.utc)
+    current_month = return_first_day_of_month(date=now.date())
+
+    with job_phase("load_partitions"):
+        partition_months = (
+            await attendance_tracking.get_attendance_tracking_partition_months(
+                db=db
+            )
+        )
+
+    with job_phase("create_partitions"):
+        for months in range(
+            secret.ATTENDANCE_TRACKING_PARTITIONS_AHEAD_MONTHS + 1
+        ):
+            month = return_first_day_of_month(
+                date=current_month, months=months
+            )
+            if month in partition_months:
+                continue
+
+            await attendance_tracking.create_attendance_tracking_partition(
+                month=month, db=db
+            )
+            increment_job_counter("partitions_created")
+
+    if secret.ATTENDANCE_TRACKING_RETENTION_MONTHS > 0:
+        retain_from = return_first_day_of_month(
+            date=current_month,
+            months=-secret.ATTENDANCE_TRACKING_RETENTION_MONTHS,
+        )
+        expired_partition_months = [
+            month for month in partition_months if month < retain_from
+        ]
+
+        if (
+            secret.ATTENDANCE_TRACKING_RETENTION_ACTION
+            == AttendanceTrackingRetentionEnum.DROP
+        ):
+            with job_phase("drop_partitions"):
+                for month in expired_partition_months:
+                    await attendance_tracking.drop_attendance_tracking_partition(  # noqa: E501
+                        month=month, db=db
+                    )
+            increment_job_counter(
+                "partitions_dropped", len(expired_partition_months)
+            )
+        else:
+            with job_phase("detach_partitions"):
+                for month in expired_partition_months:
+                    await attendance_tracking.detach_attendance_tracking_partition(  # noqa: E501
+                        month=month, db=db
+                    )
+            increment_job_counter(
+                "partitions_detached", len(expired_partition_months)
+            )
+
+    with job_phase("commit"):
+        await db.commit()
+
+
+# Classes archived per table and run, every run is a single transaction
+ARCHIVE_SCHEDULE_INSTANCES_PER_RUN = 100
+
+
+def return_archive_row(row) -> dict:
+    archive_row = dict(row._mapping)
+    archive_row["created_at_in_utc"] = archive_row[
+        "created_at_in_utc"
+    ].isoformat()
+    if "attendance_status" in archive_row:
+        archive_row["attendance_status"] = archive_row[
+            "attendance_status"
+        ].value
+
+    return archive_row
+
+
+async def archive_schedule_instances(
+    archive_name: str,
+    schedule_instance_ids_query,
+    rows_query_func,
+    delete_query_func,
+    db: AsyncSession,
+) -> None:
+    """Write the rows of every class to its archive file, then delete them
+
+    Rows are streamed from a server side cursor and deleted in batches once
+    the file is on disk. A failed run leaves the rows in place, the next
+    run writes them to the same file again.
+    """
+    with job_phase(f"load_{archive_name}_schedule_instances"):
+        result = await db.execute(
+            select(ScheduleInstanceModel.id, ScheduleInstanceModel.date).where(
+                ScheduleInstanceModel.id.in_(schedule_instance_ids_query)
+            )
+        )
+        db_schedule_instances = result.all()
+
+    for schedule_instance in db_schedule_instances:
+
+        async def return_archive_rows():
+            result = await db.stream(
+                rows_query_func(
+                    schedule_instance_id=schedule_instance.id
+                ).execution_options(
+                    yield_per=secret.ATTENDANCE_ARCHIVE_DELETE_BATCH_ROWS
+                )
+            )
+            async for row in result:
+                yield return_archive_row(row=row)
+
+        with job_phase(f"write_{archive_name}"):
+            archived_row_count = await archive.write_archive(
+                path=archive.return_archive_path(
+                    archive_name=archive_name,
+                    date=schedule_instance.date,
+                    schedule_instance_id=schedule_instance.id,
+                ),
+                rows=return_archive_rows(),
+            )
+        increment_job_counter(f"{archive_name}_archived", archived_row_count)
+
+        batch_rows = secret.ATTENDANCE_ARCHIVE_DELETE_BATCH_ROWS
+        with job_phase(f"delete_{archive_name}"):
+            while True:
+                result = await db.execute(
+                    delete_query_func(
+                        schedule_instance_id=schedule_instance.id,
+                        batch_rows=batch_rows,
+                    )
+                )
+                increment_job_counter(
+                    f"{archive_name}_deleted", result.rowcount
+                )
+
+                if result.rowcount < batch_rows:
+                    break
+
+    increment_job_counter(
+        f"{archive_name}_schedule_instances_archived",
+        len(db_schedule_instances),
+    )
+
+
+async def archive_attendance_tracking(db: AsyncSession) -> None:
+    """Move pings, and optionally attendances, of old classes to files.
+
+    Classes with rows from before the configured number of days are written
+    to gzipped NDJSON files, a directory per class date, and their rows are
+    deleted from Postgres. Summaries stay, the admin attendance tracking
+    endpoints read the pings of archived classes from their file, and the
+    attendance result endpoints read archived attendances from theirs.
+    """
+    if secret.ATTENDANCE_ARCHIVE_AFTER_DAYS <= 0:
+        return
+
+    now = datetime.now(tz=timezone.utc)
+    cutoff = datetime.combine(
+        now.date() - timedelta(days=secret.ATTENDANCE_ARCHIVE_AFTER_DAYS),
+        time(0, 0),
+        tzinfo=timezone.utc,
+    )
+
+    await archive_schedule_instances(
+        archive_name=archive.ATTENDANCE_TRACKING_ARCHIVE,
+        schedule_instance_ids_query=(
+            attendance_tracking.get_schedule_instance_ids_to_archive_query(
+                cutoff=cutoff, limit=ARCHIVE_SCHEDULE_INSTANCES_PER_RUN
+            )
+        ),
+        rows_query_func=(
+            attendance_tracking.get_attendance_trackings_to_archive_query
+        ),
+        delete_query_func=(
+            attendance_tracking.delete_archived_attendance_trackings_query
+        ),
+        db=db,
+    )
+
+    if secret.ATTENDANCE_ARCHIVE_INCLUDE_ATTENDANCES:
+        await archive_schedule_instances(
+            archive_name=archive.ATTENDANCES_ARCHIVE,
+            schedule_instance_ids_query=(
+                attendance.get_schedule_instance_ids_to_archive_query(
+                    cutoff=cutoff, limit=ARCHIVE_SCHEDULE_INSTANCES_PER_RUN
+                )
+            ),
+            rows_query_func=attendance.get_attendances_to_archive_query,
+            delete_query_func=attendance.delete_archived_attendances_query,
+            db=db,
+        )
+
+    with job_phase("commit"):
+        await db.commit()
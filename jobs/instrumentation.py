@@ -0,0 +1,138 @@
+import contextlib
+import json
+import logging
+import os
+
+from collections import defaultdict
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from time import perf_counter
+from typing import Iterator
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from secret import secret
+
+from utils.metrics import metrics
+
+
+logger = logging.getLogger(__name__)
+
+
+class JobRun:
+    """Row counts, statement count and wall time per phase of one job run"""
+
+    def __init__(self, job_name: str, budget_in_seconds: float | None):
+        self.job_name = job_name
+        self.budget_in_seconds = budget_in_seconds
+        self.started_at_in_utc = datetime.now(tz=timezone.utc)
+
+        self.counters: dict[str, int] = defaultdict(int)
+        self.phases_in_seconds: dict[str, float] = defaultdict(float)
+        self.statements = 0
+        self.wall_time_in_seconds = 0.0
+        self.status = "running"
+
+        self._started_at = perf_counter()
+
+    def finish(self, status: str):
+        self.wall_time_in_seconds = perf_counter() - self._started_at
+        self.status = status
+
+    def to_dict(self) -> dict:
+        return {
+            "job": self.job_name,
+            "status": self.status,
+            "started_at_in_utc": self.started_at_in_utc.isoformat(),
+            "wall_time_in_seconds": round(self.wall_time_in_seconds, 6),
+            "budget_in_seconds": self.budget_in_seconds,
+            "statements": self.statements,
+            "counters": dict(self.counters),
+            "phases_in_seconds": {
+                name: round(seconds, 6)
+                for name, seconds in self.phases_in_seconds.items()
+            },
+        }
+
+
+current_job_run: ContextVar[JobRun | None] = ContextVar(
+    "current_job_run", default=None
+)
+
+
+def increment_job_counter(name: str, value: int = 1):
+    """Add to a counter of the running job, a no-op outside of jobs"""
+    job_run = current_job_run.get()
+    if job_run is not None:
+        job_run.counters[name] += value
+
+
+@contextlib.contextmanager
+def job_phase(name: str) -> Iterator[None]:
+    """Time a phase of the running job, a no-op outside of jobs"""
+    job_run = current_job_run.get()
+    if job_run is None:
+        yield
+        return
+
+    started_at = perf_counter()
+    try:
+        yield
+    finally:
+        job_run.phases_in_seconds[name] += perf_counter() - started_at
+
+
+def _count_statement(*args, **kwargs):
+    job_run = current_job_run.get()
+    if job_run is not None:
+        job_run.statements += 1
+
+
+def instrument_engine(engine: AsyncEngine):
+    """Count the statements every job run sends to the database"""
+    if not event.contains(
+        engine.sync_engine, "before_cursor_execute", _count_statement
+    ):
+        event.listen(
+            engine.sync_engine, "before_cursor_execute", _count_statement
+        )
+
+
+def record_job_run(job_run: JobRun):
+    """Emit a finished run as a structured log line and as metrics"""
+    job_run_dict = job_run.to_dict()
+
+    level = logging.INFO
+    if job_run.status != "succeeded":
+        level = logging.ERROR
+    elif (
+        job_run.budget_in_seconds
+        and job_run.wall_time_in_seconds
+        >= secret.JOBS_BUDGET_WARNING_RATIO * job_run.budget_in_seconds
+    ):
+        # The next tick is close to overlapping this one
+        level = logging.WARNING
+
+    logger.log(level, json.dumps(job_run_dict))
+
+    prefix = f"jobs.{job_run.job_name}"
+    metrics.increment(f"{prefix}.runs.{job_run.status}")
+    metrics.observe(f"{prefix}.wall_time_seconds", job_run.wall_time_in_seconds)
+    metrics.increment(f"{prefix}.statements", job_run.statements)
+    for name, value in job_run.counters.items():
+        metrics.increment(f"{prefix}.{name}", value)
+    for name, seconds in job_run.phases_in_seconds.items():
+        metrics.observe(f"{prefix}.phases.{name}_seconds", seconds)
+    metrics.set_last(prefix, job_run_dict)
+
+    if secret.METRICS_FILE:
+        write_metrics_file(path=secret.METRICS_FILE)
+
+
+def write_metrics_file(path: str):
+    """Atomically replace the metrics file with the current snapshot"""
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "w") as f:
+        json.dump(metrics.snapshot(), f)
+    os.replace(temporary_path, path)
@@ -0,0 +1,38 @@
+from datetime import time
+
+from jobs.runner import JobRunner
+from jobs import schedule_instances, attendance_tracking
+
+
+job_runner = JobRunner()
+
+# Extend every schedule's instances by a day, once the UTC date rolls over
+job_runner.add_job(
+    name="materialize_schedule_instances",
+    func=schedule_instances.materialize_schedule_instances,
+    daily_at_in_utc=time(0, 0),
+)
+# Created, updated or deleted schedules, a no-op when nothing has changed
+job_runner.add_job(
+    name="process_schedule_events",
+    func=schedule_instances.process_schedule_events,
+    interval_in_seconds=10.0,
+)
+# Keep the schedule outbox from growing with every processed event
+job_runner.add_job(
+    name="prune_schedule_events",
+    func=schedule_instances.prune_schedule_events,
+    daily_at_in_utc=time(0, 0),
+)
+# Keep attendance tracking partitions ahead of the pings, retire old ones
+job_runner.add_job(
+    name="manage_attendance_tracking_partitions",
+    func=attendance_tracking.manage_attendance_tracking_partitions,
+    daily_at_in_utc=time(0, 0),
+)
+# Move the pings of old classes to files, a no-op unless configured
+job_runner.add_job(
+    name="archive_attendance_tracking",
+    func=attendance_tracking.archive_attendance_tracking,
+    interval_in_seconds=3600.0,
+)
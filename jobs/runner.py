@@ -0,0 +1,238 @@
+import asyncio
+import logging
+import signal
+from time import perf_counter
+
+from datetime import datetime, time, timedelta, timezone
+from typing import Awaitable, Callable
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from sqlite.database import sessionmanager
+
+from jobs.instrumentation import (
+    JobRun,
+    current_job_run,
+    instrument_engine,
+    record_job_run,
+)
+
+from utils.metrics import metrics
+
+
+logger = logging.getLogger(__name__)
+
+JobFunction = Callable[[AsyncSession], Awaitable[None]]
+
+
+class Job:
+    def __init__(
+        self,
+        name: str,
+        func: JobFunction,
+        interval_in_seconds: float | None = None,
+        daily_at_in_utc: time | None = None,
+        exclusive: bool = True,
+    ):
+        self.name = name
+        self.func = func
+        self.interval_in_seconds = interval_in_seconds
+        self.daily_at_in_utc = daily_at_in_utc
+        self.exclusive = exclusive
+
+    @property
+    def is_periodic(self) -> bool:
+        return (
+            self.interval_in_seconds is not None
+            or self.daily_at_in_utc is not None
+        )
+
+    def seconds_until_next_run(self, now: datetime) -> float:
+        if self.interval_in_seconds is not None:
+            return self.interval_in_seconds
+
+        next_run = datetime.combine(
+            now.date(), self.daily_at_in_utc, tzinfo=timezone.utc
+        )
+        if next_run <= now:
+            next_run += timedelta(days=1)
+
+        return (next_run - now).total_seconds()
+
+
+class JobRunner:
+    """Asyncio native job runner, with an in-memory queue as its broker.
+
+    Periodic jobs are put on the queue by their own scheduling task and
+    consumed by a fixed number of workers, each job gets a session from the
+    API's DatabaseSessionManager. A job that is already waiting in the queue
+    is not queued again, so a slow run can not pile up behind itself.
+
+    Exclusive jobs first take a Postgres advisory lock keyed by their name,
+    held until the job's transaction ends. When another process (an API
+    replica or a standalone worker) already holds it, the run is skipped.
+
+    The lock only keeps runs from overlapping. A replica whose tick comes
+    right after another replica finished the same job runs it again, and
+    every job also runs on startup. Jobs must therefore be idempotent: a
+    second run of the same tick has to find nothing left to do.
+    """
+
+    def __init__(self, concurrency: int = 1):
+        self.concurrency = concurrency
+
+        self._jobs: dict[str, Job] = {}
+        self._queue: asyncio.Queue | None = None
+        self._queued_job_names: set[str] = set()
+        self._tasks: list[asyncio.Task] = []
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self._tasks)
+
+    def add_job(
+        self,
+        name: str,
+        func: JobFunction,
+        interval_in_seconds: float | None = None,
+        daily_at_in_utc: time | None = None,
+        exclusive: bool = True,
+    ):
+        self._jobs[name] = Job(
+            name=name,
+            func=func,
+            interval_in_seconds=interval_in_seconds,
+            daily_at_in_utc=daily_at_in_utc,
+            exclusive=exclusive,
+        )
+
+    def enqueue(self, name: str):
+        """Queue a job to run as soon as a worker is free"""
+        if self._queue is None:
+            raise Exception("JobRunner is not running")
+
+        if name not in self._jobs:
+            raise Exception(f"Job {name} is not registered")
+
+        if name in self._queued_job_names:
+            return
+
+        self._queued_job_names.add(name)
+        self._queue.put_nowait(name)
+
+    async def start(self):
+        if self.is_running:
+            raise Exception("JobRunner is already running")
+
+        self._queue = asyncio.Queue()
+
+        for job in self._jobs.values():
+            if job.is_periodic:
+                self._tasks.append(asyncio.create_task(self._schedule(job)))
+
+        for _ in range(self.concurrency):
+            self._tasks.append(asyncio.create_task(self._consume()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+        self._tasks = []
+        self._queue = None
+        self._queued_job_names = set()
+
+    async def run_forever(self):
+        """Run standalone until SIGINT or SIGTERM"""
+        stop_event = asyncio.Event()
+
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop_event.set)
+
+        await self.start()
+        try:
+            await stop_event.wait()
+        finally:
+            await self.stop()
+
+    async def run_job(self, name: str):
+        """Run a job right away, in the current task"""
+        job = self._jobs[name]
+
+        instrument_engine(engine=sessionmanager._engine)
+
+        async with sessionmanager.session() as db:
+            if job.exclusive and not await self._try_lock(job=job, db=db):
+                return
+
+            job_run = JobRun(
+                job_name=job.name, budget_in_seconds=job.interval_in_seconds
+            )
+            token = current_job_run.set(job_run)
+            try:
+                await job.func(db)
+                job_run.finish(status="succeeded")
+            except Exception:
+                job_run.finish(status="failed")
+                logger.exception("Job %s failed", job.name)
+            finally:
+                current_job_run.reset(token)
+
+                if job.exclusive:
+                    # Commit or rollback, the lock went with the transaction
+                    await db.rollback()
+                    metrics.observe(
+                        f"jobs.{job.name}.lock_hold_seconds",
+                        job_run.wall_time_in_seconds,
+                    )
+
+            record_job_run(job_run=job_run)
+
+    async def _try_lock(self, job: Job, db: AsyncSession) -> bool:
+        """Take the job's transaction level advisory lock, without waiting
+
+    The try variant returns right away, the time observed is only the
+    round trip to Postgres.
+    """
+        started_at = perf_counter()
+        is_locked = await db.scalar(
+            select(func.pg_try_advisory_xact_lock(func.hashtext(job.name)))
+        )
+        metrics.observe(
+            f"jobs.{job.name}.lock_acquire_seconds",
+            perf_counter() - started_at,
+        )
+
+        if not is_locked:
+            metrics.increment(f"jobs.{job.name}.lock_skipped")
+            logger.info("Job %s is running elsewhere, skipping", job.name)
+
+        return is_locked
+
+    async def _schedule(self, job: Job):
+        # Run once on startup as well, to catch up on any downtime
+        self.enqueue(job.name)
+
+        while True:
+            await asyncio.sleep(
+                job.seconds_until_next_run(now=datetime.now(tz=timezone.utc))
+            )
+            self.enqueue(job.name)
+
+    async def _consume(self):
+        while True:
+            name = await self._queue.get()
+            self._queued_job_names.discard(name)
+
+            try:
+                await self.run_job(name)
+            except Exception:
+                # Failing to get a session or the lock, or to release them,
+                # skips this run only, the consumer has to keep going
+                metrics.increment(f"jobs.{name}.runs.errored")
+                logger.exception("Job %s could not run", name)
+            finally:
+                self._queue.task_done()
@@ -0,0 +1,444 @@
+from collections import defaultdict
+
+from datetime import datetime, date, timedelta, timezone
+
+from sqlalchemy import select, update, delete, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from secret import secret
+
+from sqlite.models import (
+    ScheduleModel,
+    ScheduleUserModel,
+    ScheduleInstanceModel,
+    ScheduleInstanceUserModel,
+)
+
+from sqlite.crud import schedules, schedule_instances
+from sqlite.schedule_instance_cache import schedule_instance_cache
+
+from jobs.instrumentation import job_phase, increment_job_counter
+
+from utils.date_utils import return_dates_in_range_for_day
+
+
+def return_materialize_until(now: datetime) -> date:
+    return now.date() + timedelta(days=secret.SCHEDULE_INSTANCES_HORIZON_DAYS)
+
+
+def return_schedule_instance_dates(
+    schedule, start_date: date, end_date: date
+) -> list[date]:
+    """Dates between start and end date (inclusive) a schedule takes place on"""
+    if schedule.is_reoccurring and schedule.date is None:
+        return return_dates_in_range_for_day(
+            day=schedule.day, start_date=start_date, end_date=end_date
+        )
+
+    if schedule.date and start_date <= schedule.date <= end_date:
+        return [schedule.date]
+
+    return []
+
+
+async def return_schedule_user_ids(
+    schedule_ids: set[int], db: AsyncSession
+) -> dict[int, set[int]]:
+    """Both students and the teacher of every schedule, in one query"""
+    result = await db.execute(
+        select(ScheduleUserModel.schedule_id, ScheduleUserModel.user_id).where(
+            ScheduleUserModel.schedule_id.in_(schedule_ids)
+        )
+    )
+
+    schedule_user_ids = defaultdict(set)
+    for schedule_id, user_id in result.all():
+        schedule_user_ids[schedule_id].add(user_id)
+
+    return schedule_user_ids
+
+
+def return_schedule_instance_to_create(
+    schedule, schedule_instance_date: date, now: datetime
+) -> dict:
+    return {
+        "schedule_id": schedule.id,
+        "teacher_id": schedule.teacher_id,
+        "location_id": schedule.location_id,
+        "date": schedule_instance_date,
+        "start_time_in_utc": schedule.start_time_in_utc,
+        "end_time_in_utc": schedule.end_time_in_utc,
+        "created_at_in_utc": now,
+    }
+
+
+async def create_schedule_instances(
+    schedule_instances_to_create: list[dict], db: AsyncSession
+) -> int:
+    """Upsert schedule instances and add academic users to the new ones
+
+    Returns the number of instances that did not exist yet.
+    """
+    if not schedule_instances_to_create:
+        return 0
+
+    with job_phase("upsert_schedule_instances"):
+        created_schedule_instances = (
+            await schedule_instances.upsert_schedule_instances(
+                schedule_instances=schedule_instances_to_create, db=db
+            )
+        )
+    increment_job_counter(
+        "schedule_instances_created", len(created_schedule_instances)
+    )
+
+    if not created_schedule_instances:
+        return 0
+
+    with job_phase("load_schedule_users"):
+        schedule_user_ids = await return_schedule_user_ids(
+            schedule_ids={
+                schedule_id for _, schedule_id in created_schedule_instances
+            },
+            db=db,
+        )
+
+    schedule_instance_users_to_create = [
+        {"user_id": user_id, "schedule_instance_id": schedule_instance_id}
+        for schedule_instance_id, schedule_id in created_schedule_instances
+        for user_id in schedule_user_ids[schedule_id]
+    ]
+
+    with job_phase("upsert_schedule_instance_users"):
+        await schedule_instances.upsert_schedule_instance_users(
+            schedule_instance_users=schedule_instance_users_to_create, db=db
+        )
+    increment_job_counter(
+        "schedule_instance_users_created",
+        len(schedule_instance_users_to_create),
+    )
+
+    return len(created_schedule_instances)
+
+
+async def materialize_schedule_instances(db: AsyncSession) -> None:
+    """Create missing schedule instances up to the configured horizon.
+
+    Every schedule keeps a high-water mark of the date its instances have
+    been created up to, so a run only creates the instances between that
+    mark and the horizon. Instances are written through the natural key
+    upsert, so concurrent workers can not create duplicates. All writes
+    happen in a single transaction.
+    """
+    now = datetime.now(tz=timezone.utc)
+    materialize_until = return_materialize_until(now=now)
+
+    with job_phase("load_schedules"):
+        result = await db.execute(
+            schedules.get_schedules_to_materialize_query(
+                materialize_until=materialize_until
+            )
+        )
+        db_schedules = result.all()
+    increment_job_counter("schedules_scanned", len(db_schedules))
+
+    if not db_schedules:
+        return
+
+    schedule_instances_to_create = []
+    for schedule in db_schedules:
+        start_date = now.date()
+        if schedule.instances_materialized_until is not None:
+            start_date = max(
+                start_date,
+                schedule.instances_materialized_until + timedelta(days=1),
+            )
+
+        for schedule_instance_date in return_schedule_instance_dates(
+            schedule=schedule, start_date=start_date, end_date=materialize_until
+        ):
+            schedule_instances_to_create.append(
+                return_schedule_instance_to_create(
+                    schedule=schedule,
+                    schedule_instance_date=schedule_instance_date,
+                    now=now,
+                )
+            )
+
+    await create_schedule_instances(
+        schedule_instances_to_create=schedule_instances_to_create, db=db
+    )
+
+    with job_phase("set_materialized_until"):
+        await db.execute(
+            schedules.set_schedules_materialized_until_query(
+                schedule_ids=[schedule.id for schedule in db_schedules],
+                materialized_until=materialize_until,
+            )
+        )
+
+    with job_phase("commit"):
+        await db.commit()
+
+
+async def materialize_schedule_instances_for_date_range(
+    db_schedules: list, start_date: date, end_date: date, db: AsyncSession
+) -> int:
+    """Create missing instances of the given schedules between two dates.
+
+    Used for backfills, so the high-water marks are left alone. Existing
+    instances are skipped by the upsert, which makes re-runs over the same
+    range a no-op. Returns the number of instances created.
+    """
+    now = datetime.now(tz=timezone.utc)
+
+    created_schedule_instances_count = await create_schedule_instances(
+        schedule_instances_to_create=[
+            return_schedule_instance_to_create(
+                schedule=schedule,
+                schedule_instance_date=schedule_instance_date,
+                now=now,
+            )
+            for schedule in db_schedules
+            for schedule_instance_date in return_schedule_instance_dates(
+                schedule=schedule, start_date=start_date, end_date=end_date
+            )
+        ],
+        db=db,
+    )
+
+    await db.commit()
+
+    return created_schedule_instances_count
+
+
+async def rebuild_upcoming_schedule_instances(
+    schedule_ids: set[int], now: datetime, db: AsyncSession
+) -> None:
+    """Bring the upcoming instances of the given schedules in line with them.
+
+    Only instances that have not started yet are touched. Instances whose
+    time slot is no longer part of the schedule are deleted, the remaining
+    ones get the schedule's teacher, location and academic users, and the
+    missing ones are created, up to the configured horizon. Instances whose
+    teacher and location were edited by hand keep them.
+    """
+    materialize_until = return_materialize_until(now=now)
+
+    with job_phase("load_schedules"):
+        result = await db.execute(
+            schedules.get_schedule_rows_query().where(
+                ScheduleModel.id.in_(schedule_ids)
+            )
+        )
+        db_schedules = {schedule.id: schedule for schedule in result.all()}
+
+        result = await db.execute(
+            schedule_instances.get_upcoming_schedule_instances_by_schedule_ids_query(  # noqa: E501
+                schedule_ids=schedule_ids, now=now
+            )
+        )
+        db_upcoming_schedule_instances = result.all()
+
+        schedule_user_ids = await return_schedule_user_ids(
+            schedule_ids=set(db_schedules), db=db
+        )
+    increment_job_counter("schedules_scanned", len(db_schedules))
+
+    schedule_instance_ids_to_delete = []
+    schedule_instances_to_update = []
+    schedule_instances_to_keep = {}
+    for schedule_instance in db_upcoming_schedule_instances:
+        schedule = db_schedules.get(schedule_instance.schedule_id)
+
+        if (
+            schedule is None
+            or schedule_instance.start_time_in_utc != schedule.start_time_in_utc
+            or schedule_instance.end_time_in_utc != schedule.end_time_in_utc
+            or not return_schedule_instance_dates(
+                schedule=schedule,
+                start_date=schedule_instance.date,
+                end_date=schedule_instance.date,
+            )
+        ):
+            schedule_instance_ids_to_delete.append(schedule_instance.id)
+            continue
+
+        schedule_instances_to_keep[schedule_instance.id] = schedule
+        if not schedule_instance.is_edited and (
+            schedule_instance.teacher_id != schedule.teacher_id
+            or schedule_instance.location_id != schedule.location_id
+        ):
+            schedule_instances_to_update.append(
+                {
+                    "id": schedule_instance.id,
+                    "teacher_id": schedule.teacher_id,
+                    "location_id": schedule.location_id,
+                    "updated_at_in_utc": now,
+                }
+            )
+
+    if schedule_instance_ids_to_delete:
+        with job_phase("delete_schedule_instances"):
+            for query in schedule_instances.delete_schedule_instances_queries(
+                schedule_instance_ids=schedule_instance_ids_to_delete
+            ):
+                await db.execute(query)
+        increment_job_counter(
+            "schedule_instances_deleted", len(schedule_instance_ids_to_delete)
+        )
+
+    if schedule_instances_to_update:
+        with job_phase("update_schedule_instances"):
+            await db.execute(
+                update(ScheduleInstanceModel), schedule_instances_to_update
+            )
+        increment_job_counter(
+            "schedule_instances_updated", len(schedule_instances_to_update)
+        )
+
+    # Sync academic users of the instances that are kept
+    if schedule_instances_to_keep:
+        result = await db.execute(
+            select(
+                ScheduleInstanceUserModel.schedule_instance_id,
+                ScheduleInstanceUserModel.user_id,
+            ).where(
+                ScheduleInstanceUserModel.schedule_instance_id.in_(
+                    schedule_instances_to_keep
+                )
+            )
+        )
+        existing_schedule_instance_users = set(
+            tuple(row) for row in result.all()
+        )
+        wanted_schedule_instance_users = set(
+            (schedule_instance_id, user_id)
+            for schedule_instance_id, schedule in (
+                schedule_instances_to_keep.items()
+            )
+            for user_id in schedule_user_ids[schedule.id]
+        )
+
+        schedule_instance_users_to_delete = (
+            existing_schedule_instance_users - wanted_schedule_instance_users
+        )
+        if schedule_instance_users_to_delete:
+            increment_job_counter(
+                "schedule_instance_users_deleted",
+                len(schedule_instance_users_to_delete),
+            )
+            await db.execute(
+                delete(ScheduleInstanceUserModel).where(
+                    tuple_(
+                        ScheduleInstanceUserModel.schedule_instance_id,
+                        ScheduleInstanceUserModel.user_id,
+                    ).in_(schedule_instance_users_to_delete)
+                )
+            )
+
+        schedule_instance_users_to_create = (
+            wanted_schedule_instance_users - existing_schedule_instance_users
+        )
+        increment_job_counter(
+            "schedule_instance_users_created",
+            len(schedule_instance_users_to_create),
+        )
+        await schedule_instances.upsert_schedule_instance_users(
+            schedule_instance_users=[
+                {
+                    "schedule_instance_id": schedule_instance_id,
+                    "user_id": user_id,
+                }
+                for schedule_instance_id, user_id in (
+                    schedule_instance_users_to_create
+                )
+            ],
+            db=db,
+        )
+
+    # Create the missing ones, existing time slots are skipped by the upsert
+    await create_schedule_instances(
+        schedule_instances_to_create=[
+            return_schedule_instance_to_create(
+                schedule=schedule,
+                schedule_instance_date=schedule_instance_date,
+                now=now,
+            )
+            for schedule in db_schedules.values()
+            for schedule_instance_date in return_schedule_instance_dates(
+                schedule=schedule,
+                start_date=now.date(),
+                end_date=materialize_until,
+            )
+            # Today's time slot is left alone once it has started
+            if schedule_instance_date > now.date()
+            or schedule.start_time_in_utc > now.time()
+        ],
+        db=db,
+    )
+
+    if db_schedules:
+        with job_phase("set_materialized_until"):
+            await db.execute(
+                schedules.set_schedules_materialized_until_query(
+                    schedule_ids=list(db_schedules),
+                    materialized_until=materialize_until,
+                )
+            )
+
+
+async def process_schedule_events(db: AsyncSession) -> None:
+    """Consume the schedule outbox and rebuild the affected schedules"""
+    now = datetime.now(tz=timezone.utc)
+
+    with job_phase("load_schedule_events"):
+        result = await db.execute(
+            schedules.get_unprocessed_schedule_events_query()
+        )
+        db_schedule_events = result.all()
+
+    if not db_schedule_events:
+        return
+
+    await rebuild_upcoming_schedule_instances(
+        schedule_ids={event.schedule_id for event in db_schedule_events},
+        now=now,
+        db=db,
+    )
+
+    await db.execute(
+        schedules.set_schedule_events_processed_query(
+            schedule_event_ids=[event.id for event in db_schedule_events],
+            processed_at_in_utc=now,
+        )
+    )
+    increment_job_counter("schedule_events_processed", len(db_schedule_events))
+
+    with job_phase("commit"):
+        await db.commit()
+
+    # Today's instances may have changed, when running inside the API
+    schedule_instance_cache.refresh_soon()
+
+
+async def prune_schedule_events(db: AsyncSession) -> None:
+    """Delete schedule events processed before the retention period.
+
+    Unprocessed events are never deleted. Recently processed ones are kept
+    around to look into what a rebuild was triggered by.
+    """
+    processed_before = datetime.now(tz=timezone.utc) - timedelta(
+        days=secret.SCHEDULE_EVENTS_RETENTION_DAYS
+    )
+
+    with job_phase("delete_schedule_events"):
+        result = await db.execute(
+            schedules.delete_processed_schedule_events_query(
+                processed_before=processed_before
+            )
+        )
+    increment_job_counter("schedule_events_deleted", result.rowcount)
+
+    with job_phase("commit"):
+        await db.commit()
@@ -6,6 +6,24 @@ from fastapi_pagination import add_pagination
 from contextlib import asynccontextmanager
 from sqlite.database import sessionmanager
 
+from secret import secret
+
+from sqlite.write_behind import attendance_tracking_buffer
+from sqlite.schedule_instance_cache import schedule_instance_cache
+from sqlite.prewarm import surge_prewarmer
+from sqlite.user_cache import user_cache
+from sqlite.token_versions import token_versions
+
+from utils.password import password_process_pool
+
+from utils.admission import (
+    AdmissionControlMiddleware,
+    write_admission_controller,
+    WRITE_ADMISSION_PATH_PREFIXES,
+)
+
+from jobs.registry import job_runner
+
 from routers import jwt_tokens, temporary
 from routers.admin import (
     users as admin_users,
@@ -105,11 +123,42 @@ origins = [
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    if secret.RUN_JOBS_IN_PROCESS:
+        await job_runner.start()
+
+    if secret.ATTENDANCE_TRACKING_WRITE_BEHIND:
+        await attendance_tracking_buffer.start()
+
+    if secret.SCHEDULE_INSTANCE_CACHE:
+        await schedule_instance_cache.start()
+
+    if secret.SURGE_PREWARM:
+        await surge_prewarmer.start()
+
+    if secret.USER_CACHE:
+        await user_cache.start()
+
+    # Every authenticated request checks its token against these
+    await token_versions.start()
+
     yield
 
+    await token_versions.stop()
+    await user_cache.stop()
+    await surge_prewarmer.stop()
+    await schedule_instance_cache.stop()
+
+    if job_runner.is_running:
+        await job_runner.stop()
+
+    # Flush queued pings while the database is still reachable
+    await attendance_tracking_buffer.stop()
+
     if sessionmanager._engine is not None:
         await sessionmanager.close()
 
+    password_process_pool.shutdown()
+
 
 app = FastAPI(
     lifespan=lifespan,
@@ -123,7 +172,12 @@ app = FastAPI(
     swagger_ui_parameters={"defaultModelsExpandDepth": -1},
 )
 
-# Middleware
+# Middleware, the last one added runs first
+app.add_middleware(
+    AdmissionControlMiddleware,
+    admission_controller=write_admission_controller,
+    path_prefixes=WRITE_ADMISSION_PATH_PREFIXES,
+)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
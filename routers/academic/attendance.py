@@ -6,16 +6,16 @@ from sqlite.dependency import get_db_session
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from sqlite.crud import attendance
+from sqlite.schedule_instance_cache import schedule_instance_cache
 from sqlite.crud.schedule_instances import (
-    get_schedule_instance_by_id,
-    get_all_academic_user_ids_against_a_schedule_instance,
+    get_schedule_instance_window_for_user,
 )
 
-from sqlite.schemas import Attendance, User
+from sqlite.schemas import Attendance, AttendanceMinimal, TokenData
 from sqlite.enums import AttendanceEnum
 
-from utils.auth import get_current_user, should_be_academic_user
-from utils.responses import common_responses
+from utils.auth import get_token_data, should_be_academic_user
+from utils.responses import common_responses, should_return_minimal_response
 
 router = APIRouter(
     prefix="/academic/attendance",
@@ -29,15 +29,20 @@ router = APIRouter(
 
 @router.post(
     "/mark/{schedule_instance_id}",
-    response_model=Attendance,
+    response_model=Attendance | AttendanceMinimal,
 )
 async def mark_attendance(
     schedule_instance_id: int,
-    current_user: User = Depends(get_current_user),
+    is_minimal_response: bool = Depends(should_return_minimal_response),
+    current_user: TokenData = Depends(get_token_data),
     db: AsyncSession = Depends(get_db_session),
 ):
-    db_schedule_instance = await get_schedule_instance_by_id(
-        schedule_instance_id=schedule_instance_id, db=db
+    db_schedule_instance = schedule_instance_cache.get(
+        schedule_instance_id=schedule_instance_id, user_id=current_user.id
+    ) or await get_schedule_instance_window_for_user(
+        schedule_instance_id=schedule_instance_id,
+        user_id=current_user.id,
+        db=db,
     )
 
     if not db_schedule_instance:
@@ -45,13 +50,7 @@ async def mark_attendance(
             status_code=403, detail="Schedule instance or class not found"
         )
 
-    schedule_instance_user_ids = (
-        await get_all_academic_user_ids_against_a_schedule_instance(
-            db_schedule_instance=db_schedule_instance, db=db
-        )
-    )
-
-    if current_user.id not in schedule_instance_user_ids:
+    if not db_schedule_instance.is_academic_user:
         raise HTTPException(
             status_code=403,
             detail="Can not mark attendance on a schedule instance or class "
@@ -122,6 +121,15 @@ async def mark_attendance(
     if midpoint_time <= now:
         attendance_status = AttendanceEnum.LATE
 
+    if is_minimal_response:
+        return await attendance.create_attendance_minimal(
+            schedule_instance_id=schedule_instance_id,
+            attendance_status=attendance_status,
+            user_id=current_user.id,
+            now=now,
+            db=db,
+        )
+
     return await attendance.create_attendance(
         schedule_instance_id=schedule_instance_id,
         attendance_status=attendance_status,
@@ -12,9 +12,9 @@ from sqlite.crud.schedule_instances import (
     get_all_schedule_instance_by_date_range_and_user_id_query,
 )
 
-from sqlite.schemas import AttendanceResult, AttendanceSearchClass, User
+from sqlite.schemas import AttendanceResult, AttendanceSearchClass, TokenData
 
-from utils.auth import get_current_user, should_be_academic_user
+from utils.auth import get_token_data, should_be_academic_user
 from utils.responses import common_responses
 
 router = APIRouter(
@@ -33,7 +33,7 @@ router = APIRouter(
 )
 async def get_attendance_for_duration(
     data: AttendanceSearchClass,
-    current_user: User = Depends(get_current_user),
+    current_user: TokenData = Depends(get_token_data),
     db: AsyncSession = Depends(get_db_session),
 ):
     schedule_instances_query = (
@@ -48,17 +48,13 @@ async def get_attendance_for_duration(
     schedule_instances_res = schedule_instances_res.fetchall()
     schedule_instances_res = [res[0] for res in schedule_instances_res]
 
-    attendance_list = await db.execute(
-        attendance.get_all_attendance_by_schedule_instance_ids_query(
-            schedule_ids=[x.id for x in schedule_instances_res]
+    attendance_dict = (
+        await attendance.get_attendances_by_schedule_instances_and_user_id(
+            schedule_instances=schedule_instances_res,
+            user_id=current_user.id,
+            db=db,
         )
     )
-    result = attendance_list.fetchall()
-    converted_result = [res[0] for res in result]
-
-    attendance_dict = {
-        obj.schedule_instance.id: obj for obj in converted_result
-    }
 
     return await paginate(
         db,
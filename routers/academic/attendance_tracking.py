@@ -1,20 +1,37 @@
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 
-from fastapi import Depends, HTTPException, APIRouter
+from fastapi import Depends, HTTPException, APIRouter, Response, status
 
 from sqlite.dependency import get_db_session
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from secret import secret
+
 from sqlite.crud import attendance_tracking
+from sqlite.write_behind import (
+    attendance_tracking_buffer,
+    WriteBehindBufferFullError,
+)
+from sqlite.schedule_instance_cache import schedule_instance_cache
 from sqlite.crud.schedule_instances import (
-    get_schedule_instance_by_id,
-    get_all_academic_user_ids_against_a_schedule_instance,
+    get_schedule_instance_window_for_user,
+    get_schedule_instance_windows_for_user_query,
 )
 
-from sqlite.schemas import AttendanceTracking, User
+from sqlite.enums import AttendanceTrackingStorageEnum
+from sqlite.schemas import (
+    AttendanceTracking,
+    AttendanceTrackingBatchCreateClass,
+    AttendanceTrackingBatchResult,
+    AttendanceTrackingMinimal,
+    TokenData,
+)
 
-from utils.auth import get_current_user, should_be_academic_user
-from utils.responses import common_responses
+from utils.auth import get_token_data, should_be_academic_user
+from utils.responses import common_responses, should_return_minimal_response
+from utils.date_utils import return_schedule_instance_window
+
+from constants import time_constants
 
 router = APIRouter(
     prefix="/academic/attendance-tracking",
@@ -28,15 +45,21 @@ router = APIRouter(
 
 @router.post(
     "/mark/{schedule_instance_id}",
-    response_model=AttendanceTracking,
+    response_model=AttendanceTracking | AttendanceTrackingMinimal,
 )
 async def mark_attendance_tracking(
     schedule_instance_id: int,
-    current_user: User = Depends(get_current_user),
+    response: Response,
+    is_minimal_response: bool = Depends(should_return_minimal_response),
+    current_user: TokenData = Depends(get_token_data),
     db: AsyncSession = Depends(get_db_session),
 ):
-    db_schedule_instance = await get_schedule_instance_by_id(
-        schedule_instance_id=schedule_instance_id, db=db
+    db_schedule_instance = schedule_instance_cache.get(
+        schedule_instance_id=schedule_instance_id, user_id=current_user.id
+    ) or await get_schedule_instance_window_for_user(
+        schedule_instance_id=schedule_instance_id,
+        user_id=current_user.id,
+        db=db,
     )
 
     if not db_schedule_instance:
@@ -44,13 +67,7 @@ async def mark_attendance_tracking(
             status_code=403, detail="Schedule instance or class not found"
         )
 
-    schedule_instance_user_ids = (
-        await get_all_academic_user_ids_against_a_schedule_instance(
-            db_schedule_instance=db_schedule_instance, db=db
-        )
-    )
-
-    if current_user.id not in schedule_instance_user_ids:
+    if not db_schedule_instance.is_academic_user:
         raise HTTPException(
             status_code=403,
             detail="Can not mark attendance on a schedule instance or class "
@@ -82,9 +99,165 @@ async def mark_attendance_tracking(
             + "after it ends",
         )
 
+    if attendance_tracking_buffer.is_running:
+        try:
+            await attendance_tracking_buffer.put(
+                {
+                    "schedule_instance_id": schedule_instance_id,
+                    "user_id": current_user.id,
+                    "created_at_in_utc": now,
+                }
+            )
+        except WriteBehindBufferFullError:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many attendance tracking requests, try again",
+                headers={"Retry-After": "1"},
+            )
+
+        # Inserted by the buffer in the background, there is no id yet
+        response.status_code = status.HTTP_202_ACCEPTED
+        return {
+            "schedule_instance_id": schedule_instance_id,
+            "status": "queued",
+            "created_at_in_utc": now,
+        }
+
+    # Pings are not stored as rows with bitmap storage, there is nothing
+    # to load back
+    if (
+        is_minimal_response
+        or secret.ATTENDANCE_TRACKING_STORAGE
+        == AttendanceTrackingStorageEnum.BITMAP
+    ):
+        return await attendance_tracking.create_attendance_tracking_minimal(
+            schedule_instance_id=schedule_instance_id,
+            user_id=current_user.id,
+            now=now,
+            db=db,
+        )
+
     return await attendance_tracking.create_attendance_tracking(
         schedule_instance_id=schedule_instance_id,
         user_id=current_user.id,
         now=now,
         db=db,
     )
+
+
+@router.post(
+    "/mark-batch",
+    response_model=AttendanceTrackingBatchResult,
+)
+async def mark_attendance_tracking_batch(
+    attendance_tracking_batch: AttendanceTrackingBatchCreateClass,
+    current_user: TokenData = Depends(get_token_data),
+    db: AsyncSession = Depends(get_db_session),
+):
+    """Mark many pings at once, including pings buffered while offline.
+
+    Every ping is validated against its schedule instance, the ones that
+    are not cached are all fetched with one query. Valid pings are inserted
+    with one statement, invalid ones are reported back by their index in
+    the request.
+    """
+    # Getting current datetime
+    now = datetime.now(tz=timezone.utc)
+    oldest_created_at_in_utc = (
+        attendance_tracking.return_oldest_attendance_tracking_created_at(
+            now=now
+        )
+    )
+
+    db_schedule_instances = {}
+    for schedule_instance_id in {
+        ping.schedule_instance_id for ping in attendance_tracking_batch.pings
+    }:
+        db_schedule_instance = schedule_instance_cache.get(
+            schedule_instance_id=schedule_instance_id, user_id=current_user.id
+        )
+        if db_schedule_instance:
+            db_schedule_instances[schedule_instance_id] = db_schedule_instance
+
+    # Only instances that are not cached are read from the database
+    schedule_instance_ids_to_load = {
+        ping.schedule_instance_id
+        for ping in attendance_tracking_batch.pings
+        if ping.schedule_instance_id not in db_schedule_instances
+    }
+    if schedule_instance_ids_to_load:
+        result = await db.execute(
+            get_schedule_instance_windows_for_user_query(
+                schedule_instance_ids=schedule_instance_ids_to_load,
+                user_id=current_user.id,
+            )
+        )
+        for schedule_instance in result.all():
+            db_schedule_instances[schedule_instance.id] = schedule_instance
+
+    attendance_trackings_to_create = []
+    seen_pings = set()
+    rejected = []
+    for index, ping in enumerate(attendance_tracking_batch.pings):
+        created_at_in_utc = ping.created_at_in_utc or now
+        if created_at_in_utc.tzinfo is None:
+            created_at_in_utc = created_at_in_utc.replace(tzinfo=timezone.utc)
+
+        db_schedule_instance = db_schedule_instances.get(
+            ping.schedule_instance_id
+        )
+
+        detail = None
+        if not db_schedule_instance:
+            detail = "Schedule instance or class not found"
+        elif not db_schedule_instance.is_academic_user:
+            detail = (
+                "Can not mark attendance on a schedule instance or class "
+                + "that you are not associated with"
+            )
+        elif created_at_in_utc > now + timedelta(
+            seconds=time_constants.MAX_CLIENT_CLOCK_SKEW_IN_SECONDS
+        ):
+            detail = "Can not mark attendance in the future"
+        elif created_at_in_utc < oldest_created_at_in_utc:
+            detail = "Can not mark attendance this far in the past"
+        else:
+            start, end = return_schedule_instance_window(
+                date=db_schedule_instance.date,
+                start_time_in_utc=db_schedule_instance.start_time_in_utc,
+                end_time_in_utc=db_schedule_instance.end_time_in_utc,
+            )
+            if not start <= created_at_in_utc <= end:
+                detail = (
+                    "Can not mark attendance outside of the schedule "
+                    + "instance or class"
+                )
+
+        if detail:
+            rejected.append(
+                {
+                    "index": index,
+                    "schedule_instance_id": ping.schedule_instance_id,
+                    "detail": detail,
+                }
+            )
+            continue
+
+        # Clients retrying a batch may send the same ping twice
+        if (ping.schedule_instance_id, created_at_in_utc) in seen_pings:
+            continue
+        seen_pings.add((ping.schedule_instance_id, created_at_in_utc))
+
+        attendance_trackings_to_create.append(
+            {
+                "schedule_instance_id": ping.schedule_instance_id,
+                "user_id": current_user.id,
+                "created_at_in_utc": created_at_in_utc,
+            }
+        )
+
+    accepted_count = await attendance_tracking.create_attendance_trackings(
+        attendance_trackings=attendance_trackings_to_create, db=db
+    )
+
+    return {"accepted_count": accepted_count, "rejected": rejected}
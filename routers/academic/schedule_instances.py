@@ -10,10 +10,10 @@ from sqlite.crud import schedule_instances
 
 from sqlite.schemas import (
     ScheduleInstance,
-    User,
+    TokenData,
 )
 
-from utils.auth import get_current_user, should_be_academic_user
+from utils.auth import get_token_data, should_be_academic_user
 from utils.responses import common_responses
 
 router = APIRouter(
@@ -33,7 +33,7 @@ router = APIRouter(
     response_model=Page[ScheduleInstance],
 )
 async def get_all_schedule_instances_for_current_user_for_today(
-    current_user: User = Depends(get_current_user),
+    current_user: TokenData = Depends(get_token_data),
     db: AsyncSession = Depends(get_db_session),
 ):
     return await paginate(
@@ -62,17 +62,13 @@ async def get_attendance_for_duration(
     schedule_instances_res = schedule_instances_res.fetchall()
     schedule_instances_res = [res[0] for res in schedule_instances_res]
 
-    attendance_list = await db.execute(
-        attendance.get_all_attendance_by_schedule_instance_ids_query(
-            schedule_ids=[x.id for x in schedule_instances_res]
+    attendance_dict = (
+        await attendance.get_attendances_by_schedule_instances_and_user_id(
+            schedule_instances=schedule_instances_res,
+            user_id=academic_user_id,
+            db=db,
         )
     )
-    result = attendance_list.fetchall()
-    converted_result = [res[0] for res in result]
-
-    attendance_dict = {
-        obj.schedule_instance.id: obj for obj in converted_result
-    }
 
     return await paginate(
         db,
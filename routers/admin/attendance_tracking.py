@@ -10,11 +10,13 @@ from sqlite.crud.schedule_instances import (
     get_schedule_instance_by_id,
 )
 
-from sqlite.schemas import AttendanceTracking, User
+from sqlite.schemas import AttendanceTracking
 
-from utils.auth import get_current_user, should_be_admin_user
+from utils.auth import should_be_admin_user
 from utils.responses import common_responses
 
+from constants import time_constants
+
 router = APIRouter(
     prefix="/admin/attendance-tracking",
     tags=["admin - attendance-tracking"],
@@ -31,7 +33,7 @@ router = APIRouter(
 )
 async def get_all_attendance_tracking_results(
     schedule_instance_id: int,
-    current_user: User = Depends(get_current_user),
+    include_timestamps: bool = False,
     db: AsyncSession = Depends(get_db_session),
 ):
     db_schedule_instance = await get_schedule_instance_by_id(
@@ -46,4 +48,31 @@ async def get_all_attendance_tracking_results(
     return await attendance_tracking.get_all_attendance_tracking_result_by_schedule_instance_id(
         schedule_instance_id=schedule_instance_id,
         db=db,
+        include_timestamps=include_timestamps,
+    )
+
+
+@router.get(
+    "/{schedule_instance_id}/presence",
+)
+async def get_all_attendance_tracking_presence(
+    schedule_instance_id: int,
+    gap_tolerance_in_seconds: int = (
+        time_constants.ATTENDANCE_TRACKING_GAP_TOLERANCE_IN_SECONDS
+    ),
+    db: AsyncSession = Depends(get_db_session),
+):
+    db_schedule_instance = await get_schedule_instance_by_id(
+        schedule_instance_id=schedule_instance_id, db=db
+    )
+
+    if not db_schedule_instance:
+        raise HTTPException(
+            status_code=403, detail="Schedule instance or class not found"
+        )
+
+    return await attendance_tracking.get_presence_by_schedule_instance_id(
+        schedule_instance_id=schedule_instance_id,
+        db=db,
+        gap_tolerance_in_seconds=gap_tolerance_in_seconds,
     )
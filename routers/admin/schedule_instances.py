@@ -9,6 +9,7 @@ from sqlite.dependency import get_db_session
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from sqlite.crud import schedule_instances
+from sqlite.schedule_instance_cache import schedule_instance_cache
 from sqlite.crud.users import get_user_by_id
 from sqlite.crud.locations import get_location_by_id
 
@@ -211,6 +212,12 @@ async def delete_schedule_instance(
         schedule_instance=db_schedule_instance, db=db
     )
 
-    return await schedule_instances.delete_schedule_instance(
+    response = await schedule_instances.delete_schedule_instance(
         db_schedule_instance=db_schedule_instance, db=db
     )
+
+    await schedule_instance_cache.refresh(
+        schedule_instance_ids={schedule_instance_id}, db=db
+    )
+
+    return response
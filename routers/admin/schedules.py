@@ -1,6 +1,8 @@
 from datetime import datetime, date, time, timezone
 
-from fastapi import Depends, status, HTTPException, APIRouter
+from fastapi import Depends, status, HTTPException, APIRouter, UploadFile
+
+from pydantic import ValidationError
 
 from fastapi_pagination import Page
 from fastapi_pagination.ext.sqlalchemy import paginate
@@ -9,6 +11,7 @@ from sqlite.dependency import get_db_session
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from sqlite.crud import schedules, schedule_instances
+from sqlite.schedule_instance_cache import schedule_instance_cache
 from sqlite.crud.users import get_user_by_id
 from sqlite.crud.locations import get_location_by_id
 
@@ -22,10 +25,16 @@ from sqlite.schemas import (
     # Search
     ScheduleReoccurringSearchClass,
     ScheduleNonReoccurringSearchClass,
+    # Import
+    ScheduleImportClass,
+    ScheduleImportBatchCreateClass,
+    ScheduleImportResult,
+    MAX_SCHEDULES_PER_IMPORT,
 )
 from sqlite.enums import DaysEnum
 
 from utils.auth import should_be_admin_user
+from utils.csv_files import read_csv_rows, return_validation_error_detail
 from utils.responses import common_responses
 
 router = APIRouter(
@@ -38,41 +47,81 @@ router = APIRouter(
 )
 
 
-def validate_schedule(
+def return_invalid_schedule_detail(
     schedule: (
         ScheduleReoccurringCreateClass
         | ScheduleNonReoccurringCreateClass
         | ScheduleReoccurringUpdateClass
         | ScheduleNonReoccurringUpdateClass
+        | ScheduleImportClass
     ),
-):
+) -> str | None:
+    """Why the schedule is not valid, None if it is"""
     # Check if start_time_in_utc is less than end_time_in_utc
     if schedule.start_time_in_utc >= schedule.end_time_in_utc:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Start time should be less than end time",
-        )
+        return "Start time should be less than end time"
 
     # Check if end_time_in_utc is not greater than 11:30PM
     if schedule.end_time_in_utc > time(
         23, 30, 0, tzinfo=schedule.end_time_in_utc.tzinfo
     ):
+        return "End time should not be greater than 11:30PM"
+
+    # Checks for non-reoccurring schedules, the only ones with a date
+    if getattr(schedule, "date", None) is not None:
+        # Should not be in past
+        if schedule.date <= datetime.now(tz=timezone.utc).date():
+            return "Date should not be today or in the past"
+
+    return None
+
+
+def validate_schedule(
+    schedule: (
+        ScheduleReoccurringCreateClass
+        | ScheduleNonReoccurringCreateClass
+        | ScheduleReoccurringUpdateClass
+        | ScheduleNonReoccurringUpdateClass
+    ),
+):
+    detail = return_invalid_schedule_detail(schedule=schedule)
+
+    if detail:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
-            detail="End time should not be greater than 11:30PM",
+            detail=detail,
         )
 
-    # Checks for non-reoccurring schedules
-    if isinstance(
-        schedule,
-        ScheduleNonReoccurringCreateClass | ScheduleNonReoccurringUpdateClass,
-    ):
-        # Should not be in past
-        if schedule.date <= datetime.now(tz=timezone.utc).date():
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Date should not be today or in the past",
-            )
+
+async def import_schedules_or_raise(
+    schedules_to_import: dict[int, ScheduleImportClass],
+    errors: list[dict],
+    db: AsyncSession,
+):
+    """Create every schedule, or none of them and report every error"""
+    for index, schedule in schedules_to_import.items():
+        detail = return_invalid_schedule_detail(schedule=schedule)
+        if detail:
+            errors.append({"index": index, "detail": detail})
+
+    schedules_to_create, import_errors = (
+        await schedules.resolve_schedule_import(
+            schedules=schedules_to_import, db=db
+        )
+    )
+    errors.extend(import_errors)
+
+    if errors:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=sorted(errors, key=lambda error: error["index"]),
+        )
+
+    schedule_ids = await schedules.create_imported_schedules(
+        schedules=schedules_to_create, db=db
+    )
+
+    return {"created_count": len(schedule_ids), "schedule_ids": schedule_ids}
 
 
 @router.get("", response_model=Page[Schedule])
@@ -231,6 +280,70 @@ async def create_non_reoccuring_schedule(
     return await schedules.create_schedule(schedule=schedule, db=db)
 
 
+@router.post(
+    "/import",
+    response_model=ScheduleImportResult,
+    status_code=status.HTTP_201_CREATED,
+)
+async def import_schedules(
+    schedule_import_batch: ScheduleImportBatchCreateClass,
+    db: AsyncSession = Depends(get_db_session),
+):
+    """Create a whole timetable at once, in one transaction.
+
+    Teachers and students are referred to by email, and locations by
+    title. Schedules with a day reoccur on it, the others happen once on
+    their date. If any schedule is not valid, none are created, and every
+    error is reported back by the index of its schedule in the request.
+    """
+    return await import_schedules_or_raise(
+        schedules_to_import=dict(enumerate(schedule_import_batch.schedules)),
+        errors=[],
+        db=db,
+    )
+
+
+@router.post(
+    "/import/csv",
+    response_model=ScheduleImportResult,
+    status_code=status.HTTP_201_CREATED,
+)
+async def import_schedules_from_csv(
+    file: UploadFile,
+    db: AsyncSession = Depends(get_db_session),
+):
+    """Create a whole timetable at once from a CSV file.
+
+    The header names the columns, title, teacher_email, location_title,
+    start_time_in_utc, end_time_in_utc and either day or date are required.
+    student_emails holds the roster, separated by spaces or semicolons.
+    Rows are reported back by their index, the first one after the header
+    being 0.
+    """
+    csv_rows = await read_csv_rows(
+        file=file, max_rows=MAX_SCHEDULES_PER_IMPORT
+    )
+
+    schedules_to_import = {}
+    errors = []
+    for index, values in enumerate(csv_rows):
+        try:
+            schedules_to_import[index] = ScheduleImportClass.model_validate(
+                values
+            )
+        except ValidationError as e:
+            errors.append(
+                {
+                    "index": index,
+                    "detail": return_validation_error_detail(error=e),
+                }
+            )
+
+    return await import_schedules_or_raise(
+        schedules_to_import=schedules_to_import, errors=errors, db=db
+    )
+
+
 @router.put(
     "/reoccurring/{schedule_id}",
     response_model=Schedule,
@@ -315,7 +428,8 @@ async def delete_schedule(
             status_code=status.HTTP_404_NOT_FOUND, detail="Schedule not found"
         )
 
-    db_schedule_instances_count = await schedule_instances.get_all_schedule_instances_count_by_schedule_id(
+    # Upcoming instances are removed along with the schedule
+    db_schedule_instances_count = await schedule_instances.get_started_schedule_instances_count_by_schedule_id(  # noqa: E501
         schedule_id=db_schedule.id, db=db
     )
 
@@ -325,7 +439,12 @@ async def delete_schedule(
             detail="Schedule you are trying to delete has schedule instances",
         )
 
-    return await schedules.delete_schedule(db_schedule=db_schedule, db=db)
+    response = await schedules.delete_schedule(db_schedule=db_schedule, db=db)
+
+    # Its instances of today that have not started yet are gone as well
+    schedule_instance_cache.refresh_soon()
+
+    return response
 
 
 @router.get("/students/{schedule_id}")
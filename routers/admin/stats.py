@@ -8,6 +8,7 @@ import sqlite.crud.stats as crud
 from sqlite.schemas import StatsBaseClass
 
 from utils.auth import should_be_admin_user
+from utils.metrics import metrics
 from utils.responses import common_responses
 
 router = APIRouter(
@@ -27,3 +28,11 @@ router = APIRouter(
 )
 async def get_all_stats(db: AsyncSession = Depends(get_db_session)):
     return await crud.get_all_stats(db=db)
+
+
+@router.get(
+    "/metrics",
+    summary="Get in-process metrics of this API process",
+)
+async def get_metrics():
+    return metrics.snapshot()
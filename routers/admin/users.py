@@ -1,6 +1,8 @@
 from typing import Literal
 
-from fastapi import Depends, status, HTTPException, APIRouter
+from fastapi import Depends, status, HTTPException, APIRouter, UploadFile
+
+from pydantic import ValidationError
 
 from fastapi_pagination import Page
 from fastapi_pagination.ext.sqlalchemy import paginate
@@ -14,11 +16,16 @@ from sqlite.schemas import (
     UserCreateClass,
     UserUpdateClass,
     UserPasswordUpdateClass,
+    UserImportClass,
+    UserImportBatchCreateClass,
+    UserImportResult,
     User,
+    MAX_USERS_PER_IMPORT,
 )
 
 from utils.common import are_object_to_edit_and_other_object_same
 from utils.auth import should_be_admin_user
+from utils.csv_files import read_csv_rows, return_validation_error_detail
 from utils.responses import common_responses
 
 router = APIRouter(
@@ -30,6 +37,19 @@ router = APIRouter(
     responses=common_responses(),
 )
 
+USER_IMPORT_ADDITIONAL_DETAILS_COLUMNS = ["phone", "department", "designation"]
+
+
+def return_user_import_result(rows: list[dict]) -> dict:
+    rows = sorted(rows, key=lambda row: row["index"])
+    created_count = sum(1 for row in rows if row.get("id") is not None)
+
+    return {
+        "created_count": created_count,
+        "rejected_count": len(rows) - created_count,
+        "rows": rows,
+    }
+
 
 @router.get("/admins", response_model=Page[User])
 async def get_all_admins(db: AsyncSession = Depends(get_db_session)):
@@ -89,6 +109,71 @@ async def create_user(
     return await users.get_user_by_email(user_email=user.email, db=db)
 
 
+@router.post(
+    "/import",
+    response_model=UserImportResult,
+)
+async def import_users(
+    user_import_batch: UserImportBatchCreateClass,
+    db: AsyncSession = Depends(get_db_session),
+):
+    """Create many users at once, like a term's intake of students.
+
+    Every user is reported back by its index in the request, with its id
+    once created, or why it was not. Rejected users do not stop the rest.
+    """
+    rows = await users.import_users(
+        users=dict(enumerate(user_import_batch.users)), db=db
+    )
+
+    return return_user_import_result(rows=rows)
+
+
+@router.post(
+    "/import/csv",
+    response_model=UserImportResult,
+)
+async def import_users_from_csv(
+    file: UploadFile,
+    db: AsyncSession = Depends(get_db_session),
+):
+    """Create many users at once from a CSV file.
+
+    The header names the columns, full_name, email and password are
+    required, is_admin, is_student, phone, department and designation are
+    optional, and empty cells are left out. Rows are reported back by their
+    index, the first one after the header being 0, and invalid rows are
+    rejected without stopping the rest.
+    """
+    csv_rows = await read_csv_rows(file=file, max_rows=MAX_USERS_PER_IMPORT)
+
+    users_to_import = {}
+    rows = []
+    for index, values in enumerate(csv_rows):
+        additional_details = {
+            column: values.pop(column)
+            for column in USER_IMPORT_ADDITIONAL_DETAILS_COLUMNS
+            if column in values
+        }
+        if additional_details:
+            values["additional_details"] = additional_details
+
+        try:
+            users_to_import[index] = UserImportClass.model_validate(values)
+        except ValidationError as e:
+            rows.append(
+                {
+                    "index": index,
+                    "email": values.get("email"),
+                    "detail": return_validation_error_detail(error=e),
+                }
+            )
+
+    rows.extend(await users.import_users(users=users_to_import, db=db))
+
+    return return_user_import_result(rows=rows)
+
+
 @router.put(
     "/{user_id}",
     response_model=User,
@@ -39,7 +39,7 @@ async def update_user(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db_session),
 ):
-    other_object = users.get_user_by_email(user_email=user.email, db=db)
+    other_object = await users.get_user_by_email(user_email=user.email, db=db)
     if other_object:
         if not are_object_to_edit_and_other_object_same(
             obj_to_edit=current_user,
@@ -61,7 +61,7 @@ async def update_user(
                 detail="You need to specify additional details while updating a user",
             )
         if user.additional_details.phone:
-            other_object = users.get_user_by_phone(
+            other_object = await users.get_user_by_phone(
                 user_phone=user.additional_details.phone, db=db
             )
             if other_object:
@@ -73,7 +73,12 @@ async def update_user(
                         status_code=403,
                         detail="This phone number is already in use",
                     )
-    return users.update_user(user=user, db_user=current_user, db=db)
+    # The current user may be a cached snapshot, update the row itself
+    db_user = await users.get_user_by_id(user_id=current_user.id, db=db)
+
+    await users.update_user(user=user, db_user=db_user, db=db)
+
+    return await users.get_user_by_email(user_email=user.email, db=db)
 
 
 @router.patch(
@@ -85,6 +90,10 @@ async def update_user_password(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db_session),
 ):
-    return users.update_user_password(
-        new_password=new_password, db_user=current_user, db=db
+    db_user = await users.get_user_by_id(user_id=current_user.id, db=db)
+
+    await users.update_user_password(
+        new_password=new_password, db_user=db_user, db=db
     )
+
+    return await users.get_user_by_id(user_id=current_user.id, db=db)
@@ -11,7 +11,10 @@ from secret import secret
 from sqlite.crud.passwords import authenticate_user
 
 from sqlite.schemas import Token
-from utils.jwt_tokens import create_access_token
+from utils.jwt_tokens import (
+    create_access_token,
+    return_access_token_claims,
+)
 
 
 router = APIRouter(
@@ -37,7 +40,7 @@ async def login_for_access_token(
 
     access_token_expires = timedelta(minutes=secret.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.email},
+        data=return_access_token_claims(user=user),
         expires_delta=access_token_expires,
         key=secret.SECRET_KEY,
         algorithm=secret.ALGORITHM,
@@ -2,6 +2,11 @@ import os
 
 from dotenv import load_dotenv
 
+from sqlite.enums import (
+    AttendanceTrackingStorageEnum,
+    AttendanceTrackingRetentionEnum,
+)
+
 # Load environment variables into memory
 load_dotenv()
 
@@ -11,6 +16,42 @@ class Secret:
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
     DATABASE_URL: str
+    SCHEDULE_INSTANCES_HORIZON_DAYS: int
+    SCHEDULE_EVENTS_RETENTION_DAYS: int
+    RUN_JOBS_IN_PROCESS: bool
+    METRICS_FILE: str | None
+    JOBS_BUDGET_WARNING_RATIO: float
+    ATTENDANCE_TRACKING_WRITE_BEHIND: bool
+    ATTENDANCE_TRACKING_WRITE_BEHIND_MAX_QUEUE_SIZE: int
+    ATTENDANCE_TRACKING_WRITE_BEHIND_FLUSH_ROWS: int
+    ATTENDANCE_TRACKING_WRITE_BEHIND_FLUSH_INTERVAL_IN_MS: int
+    ATTENDANCE_TRACKING_STORAGE: AttendanceTrackingStorageEnum
+    ATTENDANCE_TRACKING_PARTITIONS_AHEAD_MONTHS: int
+    ATTENDANCE_TRACKING_RETENTION_MONTHS: int
+    ATTENDANCE_TRACKING_RETENTION_ACTION: AttendanceTrackingRetentionEnum
+    ATTENDANCE_ARCHIVE_DIR: str
+    ATTENDANCE_ARCHIVE_AFTER_DAYS: int
+    ATTENDANCE_ARCHIVE_INCLUDE_ATTENDANCES: bool
+    ATTENDANCE_ARCHIVE_DELETE_BATCH_ROWS: int
+    SCHEDULE_INSTANCE_CACHE: bool
+    SCHEDULE_INSTANCE_CACHE_MAX_SIZE: int
+    SCHEDULE_INSTANCE_CACHE_REFRESH_INTERVAL_IN_SECONDS: float
+    DATABASE_POOL_SIZE: int
+    DATABASE_MAX_OVERFLOW: int
+    DATABASE_POOL_TIMEOUT_IN_SECONDS: float
+    SURGE_PREWARM: bool
+    SURGE_PREWARM_LEAD_TIME_IN_SECONDS: float
+    WRITE_ADMISSION_MAX_CONCURRENCY: int
+    WRITE_ADMISSION_MAX_QUEUE_SIZE: int
+    WRITE_ADMISSION_TIMEOUT_IN_MS: int
+    USER_CACHE: bool
+    USER_CACHE_MAX_SIZE: int
+    USER_CACHE_TTL_IN_SECONDS: float
+    USER_CACHE_REDIS_URL: str | None
+    ACCESS_TOKEN_CACHE_MAX_SIZE: int
+    TOKEN_VERSIONS_REFRESH_INTERVAL_IN_SECONDS: float
+    PASSWORD_POOL_MAX_WORKERS: int
+    USER_IMPORT_HASHING_PROCESSES: int
 
     def __init__(
         self,
@@ -18,12 +59,125 @@ class Secret:
         algorithm: str,
         access_token_expire_minutes: int | str,
         database_url: str,
+        schedule_instances_horizon_days: int | str,
+        schedule_events_retention_days: int | str,
+        run_jobs_in_process: bool | str,
+        metrics_file: str | None,
+        jobs_budget_warning_ratio: float | str,
+        attendance_tracking_write_behind: bool | str,
+        attendance_tracking_write_behind_max_queue_size: int | str,
+        attendance_tracking_write_behind_flush_rows: int | str,
+        attendance_tracking_write_behind_flush_interval_in_ms: int | str,
+        attendance_tracking_storage: str,
+        attendance_tracking_partitions_ahead_months: int | str,
+        attendance_tracking_retention_months: int | str,
+        attendance_tracking_retention_action: str,
+        attendance_archive_dir: str,
+        attendance_archive_after_days: int | str,
+        attendance_archive_include_attendances: bool | str,
+        attendance_archive_delete_batch_rows: int | str,
+        schedule_instance_cache: bool | str,
+        schedule_instance_cache_max_size: int | str,
+        schedule_instance_cache_refresh_interval_in_seconds: float | str,
+        database_pool_size: int | str,
+        database_max_overflow: int | str,
+        database_pool_timeout_in_seconds: float | str,
+        surge_prewarm: bool | str,
+        surge_prewarm_lead_time_in_seconds: float | str,
+        write_admission_max_concurrency: int | str,
+        write_admission_max_queue_size: int | str,
+        write_admission_timeout_in_ms: int | str,
+        user_cache: bool | str,
+        user_cache_max_size: int | str,
+        user_cache_ttl_in_seconds: float | str,
+        user_cache_redis_url: str | None,
+        access_token_cache_max_size: int | str,
+        token_versions_refresh_interval_in_seconds: float | str,
+        password_pool_max_workers: int | str,
+        user_import_hashing_processes: int | str,
     ) -> None:
         self.SECRET_KEY = secret_key
         self.ALGORITHM = algorithm
         self.ACCESS_TOKEN_EXPIRE_MINUTES = int(access_token_expire_minutes)
         self.DATABASE_URL = database_url
-        self.SYNC_DATABASE_URL = database_url.replace("+asyncpg", "")
+        self.SCHEDULE_INSTANCES_HORIZON_DAYS = int(
+            schedule_instances_horizon_days
+        )
+        self.SCHEDULE_EVENTS_RETENTION_DAYS = int(
+            schedule_events_retention_days
+        )
+        self.RUN_JOBS_IN_PROCESS = str(run_jobs_in_process).lower() == "true"
+        self.METRICS_FILE = metrics_file or None
+        self.JOBS_BUDGET_WARNING_RATIO = float(jobs_budget_warning_ratio)
+        self.ATTENDANCE_TRACKING_WRITE_BEHIND = (
+            str(attendance_tracking_write_behind).lower() == "true"
+        )
+        self.ATTENDANCE_TRACKING_WRITE_BEHIND_MAX_QUEUE_SIZE = int(
+            attendance_tracking_write_behind_max_queue_size
+        )
+        self.ATTENDANCE_TRACKING_WRITE_BEHIND_FLUSH_ROWS = int(
+            attendance_tracking_write_behind_flush_rows
+        )
+        self.ATTENDANCE_TRACKING_WRITE_BEHIND_FLUSH_INTERVAL_IN_MS = int(
+            attendance_tracking_write_behind_flush_interval_in_ms
+        )
+        self.ATTENDANCE_TRACKING_STORAGE = AttendanceTrackingStorageEnum(
+            attendance_tracking_storage
+        )
+        self.ATTENDANCE_TRACKING_PARTITIONS_AHEAD_MONTHS = int(
+            attendance_tracking_partitions_ahead_months
+        )
+        self.ATTENDANCE_TRACKING_RETENTION_MONTHS = int(
+            attendance_tracking_retention_months
+        )
+        self.ATTENDANCE_TRACKING_RETENTION_ACTION = (
+            AttendanceTrackingRetentionEnum(
+                attendance_tracking_retention_action
+            )
+        )
+        self.ATTENDANCE_ARCHIVE_DIR = attendance_archive_dir
+        self.ATTENDANCE_ARCHIVE_AFTER_DAYS = int(attendance_archive_after_days)
+        self.ATTENDANCE_ARCHIVE_INCLUDE_ATTENDANCES = (
+            str(attendance_archive_include_attendances).lower() == "true"
+        )
+        self.ATTENDANCE_ARCHIVE_DELETE_BATCH_ROWS = int(
+            attendance_archive_delete_batch_rows
+        )
+        self.SCHEDULE_INSTANCE_CACHE = (
+            str(schedule_instance_cache).lower() == "true"
+        )
+        self.SCHEDULE_INSTANCE_CACHE_MAX_SIZE = int(
+            schedule_instance_cache_max_size
+        )
+        self.SCHEDULE_INSTANCE_CACHE_REFRESH_INTERVAL_IN_SECONDS = float(
+            schedule_instance_cache_refresh_interval_in_seconds
+        )
+        self.DATABASE_POOL_SIZE = int(database_pool_size)
+        self.DATABASE_MAX_OVERFLOW = int(database_max_overflow)
+        self.DATABASE_POOL_TIMEOUT_IN_SECONDS = float(
+            database_pool_timeout_in_seconds
+        )
+        self.SURGE_PREWARM = str(surge_prewarm).lower() == "true"
+        self.SURGE_PREWARM_LEAD_TIME_IN_SECONDS = float(
+            surge_prewarm_lead_time_in_seconds
+        )
+        self.WRITE_ADMISSION_MAX_CONCURRENCY = int(
+            write_admission_max_concurrency
+        )
+        self.WRITE_ADMISSION_MAX_QUEUE_SIZE = int(
+            write_admission_max_queue_size
+        )
+        self.WRITE_ADMISSION_TIMEOUT_IN_MS = int(write_admission_timeout_in_ms)
+        self.USER_CACHE = str(user_cache).lower() == "true"
+        self.USER_CACHE_MAX_SIZE = int(user_cache_max_size)
+        self.USER_CACHE_TTL_IN_SECONDS = float(user_cache_ttl_in_seconds)
+        self.USER_CACHE_REDIS_URL = user_cache_redis_url or None
+        self.ACCESS_TOKEN_CACHE_MAX_SIZE = int(access_token_cache_max_size)
+        self.TOKEN_VERSIONS_REFRESH_INTERVAL_IN_SECONDS = float(
+            token_versions_refresh_interval_in_seconds
+        )
+        self.PASSWORD_POOL_MAX_WORKERS = int(password_pool_max_workers)
+        self.USER_IMPORT_HASHING_PROCESSES = int(user_import_hashing_processes)
 
 
 secret = Secret(
@@ -31,4 +185,87 @@ secret = Secret(
     algorithm=os.getenv("ALGORITHM"),
     access_token_expire_minutes=os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"),
     database_url=os.getenv("DATABASE_URL"),
+    schedule_instances_horizon_days=os.getenv(
+        "SCHEDULE_INSTANCES_HORIZON_DAYS", 14
+    ),
+    schedule_events_retention_days=os.getenv(
+        "SCHEDULE_EVENTS_RETENTION_DAYS", 7
+    ),
+    run_jobs_in_process=os.getenv("RUN_JOBS_IN_PROCESS", False),
+    metrics_file=os.getenv("METRICS_FILE"),
+    jobs_budget_warning_ratio=os.getenv("JOBS_BUDGET_WARNING_RATIO", 0.8),
+    attendance_tracking_write_behind=os.getenv(
+        "ATTENDANCE_TRACKING_WRITE_BEHIND", False
+    ),
+    attendance_tracking_write_behind_max_queue_size=os.getenv(
+        "ATTENDANCE_TRACKING_WRITE_BEHIND_MAX_QUEUE_SIZE", 10000
+    ),
+    attendance_tracking_write_behind_flush_rows=os.getenv(
+        "ATTENDANCE_TRACKING_WRITE_BEHIND_FLUSH_ROWS", 500
+    ),
+    attendance_tracking_write_behind_flush_interval_in_ms=os.getenv(
+        "ATTENDANCE_TRACKING_WRITE_BEHIND_FLUSH_INTERVAL_IN_MS", 200
+    ),
+    attendance_tracking_storage=os.getenv(
+        "ATTENDANCE_TRACKING_STORAGE", AttendanceTrackingStorageEnum.ROWS
+    ),
+    attendance_tracking_partitions_ahead_months=os.getenv(
+        "ATTENDANCE_TRACKING_PARTITIONS_AHEAD_MONTHS", 2
+    ),
+    attendance_tracking_retention_months=os.getenv(
+        "ATTENDANCE_TRACKING_RETENTION_MONTHS", 0
+    ),
+    attendance_tracking_retention_action=os.getenv(
+        "ATTENDANCE_TRACKING_RETENTION_ACTION",
+        AttendanceTrackingRetentionEnum.DETACH,
+    ),
+    attendance_archive_dir=os.getenv("ATTENDANCE_ARCHIVE_DIR", "archive"),
+    attendance_archive_after_days=os.getenv(
+        "ATTENDANCE_ARCHIVE_AFTER_DAYS", 0
+    ),
+    attendance_archive_include_attendances=os.getenv(
+        "ATTENDANCE_ARCHIVE_INCLUDE_ATTENDANCES", False
+    ),
+    attendance_archive_delete_batch_rows=os.getenv(
+        "ATTENDANCE_ARCHIVE_DELETE_BATCH_ROWS", 5000
+    ),
+    schedule_instance_cache=os.getenv("SCHEDULE_INSTANCE_CACHE", False),
+    schedule_instance_cache_max_size=os.getenv(
+        "SCHEDULE_INSTANCE_CACHE_MAX_SIZE", 2000
+    ),
+    schedule_instance_cache_refresh_interval_in_seconds=os.getenv(
+        "SCHEDULE_INSTANCE_CACHE_REFRESH_INTERVAL_IN_SECONDS", 60
+    ),
+    database_pool_size=os.getenv("DATABASE_POOL_SIZE", 5),
+    database_max_overflow=os.getenv("DATABASE_MAX_OVERFLOW", 10),
+    database_pool_timeout_in_seconds=os.getenv(
+        "DATABASE_POOL_TIMEOUT_IN_SECONDS", 30
+    ),
+    surge_prewarm=os.getenv("SURGE_PREWARM", False),
+    surge_prewarm_lead_time_in_seconds=os.getenv(
+        "SURGE_PREWARM_LEAD_TIME_IN_SECONDS", 300
+    ),
+    write_admission_max_concurrency=os.getenv(
+        "WRITE_ADMISSION_MAX_CONCURRENCY", 0
+    ),
+    write_admission_max_queue_size=os.getenv(
+        "WRITE_ADMISSION_MAX_QUEUE_SIZE", 200
+    ),
+    write_admission_timeout_in_ms=os.getenv(
+        "WRITE_ADMISSION_TIMEOUT_IN_MS", 2000
+    ),
+    user_cache=os.getenv("USER_CACHE", False),
+    user_cache_max_size=os.getenv("USER_CACHE_MAX_SIZE", 10000),
+    user_cache_ttl_in_seconds=os.getenv("USER_CACHE_TTL_IN_SECONDS", 60),
+    user_cache_redis_url=os.getenv("USER_CACHE_REDIS_URL"),
+    access_token_cache_max_size=os.getenv(
+        "ACCESS_TOKEN_CACHE_MAX_SIZE", 10000
+    ),
+    token_versions_refresh_interval_in_seconds=os.getenv(
+        "TOKEN_VERSIONS_REFRESH_INTERVAL_IN_SECONDS", 30
+    ),
+    password_pool_max_workers=os.getenv("PASSWORD_POOL_MAX_WORKERS", 2),
+    user_import_hashing_processes=os.getenv(
+        "USER_IMPORT_HASHING_PROCESSES", 0
+    ),
 )
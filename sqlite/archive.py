@@ -0,0 +1,92 @@
+import asyncio
+import gzip
+import json
+import os
+
+from datetime import date
+from typing import IO, AsyncIterator
+
+from secret import secret
+
+
+ATTENDANCE_TRACKING_ARCHIVE = "attendance_tracking"
+ATTENDANCES_ARCHIVE = "attendances"
+
+# Rows compressed and written per thread hop
+WRITE_CHUNK_ROWS = 1000
+
+
+def return_archive_path(
+    archive_name: str, date: date, schedule_instance_id: int
+) -> str:
+    """Gzipped NDJSON file of a class, in a directory per class date"""
+    return os.path.join(
+        secret.ATTENDANCE_ARCHIVE_DIR,
+        archive_name,
+        date.isoformat(),
+        f"{schedule_instance_id}.ndjson.gz",
+    )
+
+
+def read_archive(path: str) -> list[dict] | None:
+    """Every row of an archive file, None when there is no such file"""
+    if not os.path.exists(path):
+        return None
+
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+async def write_archive(path: str, rows: AsyncIterator[dict]) -> int:
+    """Stream rows into an archive file, returns the number of rows in it
+
+    Rows already in the file are kept and not written twice, going by their
+    id, so a run that died before deleting what it archived can be repeated.
+    The file is only replaced once it is complete and flushed to disk.
+    Compression and disk IO run on a thread, a chunk of rows at a time, so
+    the event loop keeps serving requests meanwhile.
+    """
+    archived_rows = await asyncio.to_thread(read_archive, path=path) or []
+    archived_row_ids = {row["id"] for row in archived_rows}
+
+    temporary_path = f"{path}.tmp"
+    f = await asyncio.to_thread(open_temporary_archive, path=temporary_path)
+    try:
+        await asyncio.to_thread(write_lines, f=f, rows=archived_rows)
+
+        row_count = len(archived_rows)
+        chunk = []
+        async for row in rows:
+            if row["id"] in archived_row_ids:
+                continue
+
+            chunk.append(row)
+            row_count += 1
+            if len(chunk) >= WRITE_CHUNK_ROWS:
+                await asyncio.to_thread(write_lines, f=f, rows=chunk)
+                chunk = []
+
+        await asyncio.to_thread(write_lines, f=f, rows=chunk)
+    finally:
+        await asyncio.to_thread(f.close)
+
+    await asyncio.to_thread(
+        replace_archive, temporary_path=temporary_path, path=path
+    )
+
+    return row_count
+
+
+def open_temporary_archive(path: str) -> IO[str]:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return gzip.open(path, "wt", encoding="utf-8")
+
+
+def write_lines(f: IO[str], rows: list[dict]):
+    f.writelines(json.dumps(row) + "\n" for row in rows)
+
+
+def replace_archive(temporary_path: str, path: str):
+    with open(temporary_path, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(temporary_path, path)
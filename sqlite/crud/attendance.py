@@ -1,9 +1,13 @@
+import asyncio
+
+from datetime import datetime, timezone
+
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from sqlalchemy import select
+from sqlalchemy import select, insert, delete
 from sqlalchemy.orm import joinedload
 
-from sqlite import models
+from sqlite import models, archive
 from sqlite.enums import AttendanceEnum
 
 
@@ -65,3 +69,151 @@ async def create_attendance(
     db_attendance = result.scalar_one()
 
     return db_attendance
+
+
+async def create_attendance_minimal(
+    schedule_instance_id: int,
+    attendance_status: AttendanceEnum,
+    user_id: int,
+    now: datetime,
+    db: AsyncSession,
+):
+    """Insert attendance without loading it and its relationships back"""
+    result = await db.execute(
+        insert(models.AttendanceModel)
+        .values(
+            schedule_instance_id=schedule_instance_id,
+            attendance_status=attendance_status,
+            user_id=user_id,
+            created_at_in_utc=now,
+        )
+        .returning(
+            models.AttendanceModel.id,
+            models.AttendanceModel.schedule_instance_id,
+            models.AttendanceModel.attendance_status,
+            models.AttendanceModel.created_at_in_utc,
+        )
+    )
+    db_attendance = result.one()
+
+    await db.commit()
+
+    return db_attendance
+
+
+def get_schedule_instance_ids_to_archive_query(cutoff: datetime, limit: int):
+    """Classes that still have attendances marked before the cutoff"""
+    return (
+        select(models.AttendanceModel.schedule_instance_id)
+        .where(models.AttendanceModel.created_at_in_utc < cutoff)
+        .distinct()
+        .limit(limit)
+    )
+
+
+def get_attendances_to_archive_query(schedule_instance_id: int):
+    return (
+        select(
+            models.AttendanceModel.id,
+            models.AttendanceModel.user_id,
+            models.AttendanceModel.schedule_instance_id,
+            models.AttendanceModel.attendance_status,
+            models.AttendanceModel.created_at_in_utc,
+        )
+        .where(
+            models.AttendanceModel.schedule_instance_id == schedule_instance_id
+        )
+        .order_by(models.AttendanceModel.id)
+    )
+
+
+def delete_archived_attendances_query(
+    schedule_instance_id: int, batch_rows: int
+):
+    return delete(models.AttendanceModel).where(
+        models.AttendanceModel.id.in_(
+            select(models.AttendanceModel.id)
+            .where(
+                models.AttendanceModel.schedule_instance_id
+                == schedule_instance_id
+            )
+            .limit(batch_rows)
+        )
+    )
+
+
+def read_archived_attendances(
+    schedule_instances: list[models.ScheduleInstanceModel], user_id: int
+) -> dict[int, models.AttendanceModel]:
+    """Attendances of a user in archived classes, by schedule instance id
+
+    Classes that have no archive file are left out, their attendances are
+    still in Postgres, if any. The models returned are not in a session.
+    """
+    archived_attendances = {}
+    for schedule_instance in schedule_instances:
+        archived_rows = archive.read_archive(
+            path=archive.return_archive_path(
+                archive_name=archive.ATTENDANCES_ARCHIVE,
+                date=schedule_instance.date,
+                schedule_instance_id=schedule_instance.id,
+            )
+        )
+
+        for row in archived_rows or []:
+            if row["user_id"] != user_id:
+                continue
+
+            archived_attendances[schedule_instance.id] = (
+                models.AttendanceModel(
+                    id=row["id"],
+                    user_id=row["user_id"],
+                    schedule_instance_id=row["schedule_instance_id"],
+                    attendance_status=AttendanceEnum(
+                        row["attendance_status"]
+                    ),
+                    created_at_in_utc=datetime.fromisoformat(
+                        row["created_at_in_utc"]
+                    ),
+                )
+            )
+
+    return archived_attendances
+
+
+async def get_attendances_by_schedule_instances_and_user_id(
+    schedule_instances: list[models.ScheduleInstanceModel],
+    user_id: int,
+    db: AsyncSession,
+) -> dict[int, models.AttendanceModel]:
+    """Attendances of a user in the classes, by schedule instance id
+
+    Attendances of past classes that are not in Postgres anymore are read
+    from their archive file, off the event loop.
+    """
+    result = await db.execute(
+        get_all_attendance_by_schedule_instance_ids_query(
+            schedule_ids=[x.id for x in schedule_instances]
+        ).where(models.AttendanceModel.user_id == user_id)
+    )
+    attendances = {
+        obj.schedule_instance_id: obj for obj in result.scalars().all()
+    }
+
+    # Classes are archived a day after they took place at the earliest
+    today = datetime.now(tz=timezone.utc).date()
+    missing_schedule_instances = [
+        x
+        for x in schedule_instances
+        if x.id not in attendances and x.date < today
+    ]
+    if missing_schedule_instances:
+        attendances.update(
+            await asyncio.to_thread(
+                read_archived_attendances,
+                schedule_instances=missing_schedule_instances,
+                user_id=user_id,
+            )
+        )
+
+    return attendances
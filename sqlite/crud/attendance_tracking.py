@@ -1,11 +1,38 @@
-from datetime import datetime, timedelta
+import asyncio
+import math
+import re
+
+from datetime import date, datetime, time, timedelta, timezone
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from sqlalchemy import select
+from sqlalchemy import (
+    select,
+    func,
+    null,
+    cast,
+    case,
+    or_,
+    bindparam,
+    delete,
+    text,
+    tuple_,
+    String,
+)
+from sqlalchemy.dialects.postgresql import insert, BIT
 from sqlalchemy.orm import joinedload
 
-from sqlite import models
+from secret import secret
+
+from sqlite import models, archive
+from sqlite.enums import AttendanceTrackingStorageEnum
+
+from utils.date_utils import (
+    return_schedule_instance_window,
+    return_first_day_of_month,
+)
+
+from constants import time_constants
 
 from collections import defaultdict
 
@@ -28,6 +55,385 @@ async def get_all_attendance_tracking_by_schedule_instance_id(
     return result.scalars().all()
 
 
+ATTENDANCE_TRACKING_PARTITION_NAME_PATTERN = re.compile(
+    r"^attendance_tracking_y(\d{4})m(\d{2})$"
+)
+
+
+def return_attendance_tracking_partition_name(month: date) -> str:
+    return f"attendance_tracking_y{month.year}m{month.month:02d}"
+
+
+async def get_attendance_tracking_partition_months(
+    db: AsyncSession,
+) -> list[date]:
+    """First day of the month of every attached partition, oldest first"""
+    result = await db.execute(
+        text(
+            """
+            SELECT pg_class.relname
+            FROM pg_inherits
+            JOIN pg_class ON pg_class.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = 'attendance_tracking'::regclass
+            """
+        )
+    )
+
+    months = []
+    for (partition_name,) in result.all():
+        match = ATTENDANCE_TRACKING_PARTITION_NAME_PATTERN.match(
+            partition_name
+        )
+        if match:
+            months.append(date(int(match[1]), int(match[2]), 1))
+
+    return sorted(months)
+
+
+async def create_attendance_tracking_partition(
+    month: date, db: AsyncSession
+):
+    # Bounds can not be bind parameters in DDL, both come from a date
+    await db.execute(
+        text(
+            "CREATE TABLE IF NOT EXISTS "
+            + return_attendance_tracking_partition_name(month=month)
+            + " PARTITION OF attendance_tracking FOR VALUES FROM ('"
+            + month.isoformat()
+            + " 00:00:00+00') TO ('"
+            + return_first_day_of_month(date=month, months=1).isoformat()
+            + " 00:00:00+00')"
+        )
+    )
+
+
+async def detach_attendance_tracking_partition(
+    month: date, db: AsyncSession
+):
+    await db.execute(
+        text(
+            "ALTER TABLE attendance_tracking DETACH PARTITION "
+            + return_attendance_tracking_partition_name(month=month)
+        )
+    )
+
+
+async def drop_attendance_tracking_partition(month: date, db: AsyncSession):
+    await db.execute(
+        text(
+            "DROP TABLE IF EXISTS "
+            + return_attendance_tracking_partition_name(month=month)
+        )
+    )
+
+
+def return_oldest_attendance_tracking_created_at(now: datetime) -> datetime:
+    """Oldest ping that can still be stored
+
+    Older pings would land on a partition that was detached or dropped, or
+    on a class whose pings were archived already.
+    """
+    oldest = now - timedelta(
+        days=time_constants.MAX_ATTENDANCE_TRACKING_PING_AGE_IN_DAYS
+    )
+
+    if secret.ATTENDANCE_TRACKING_RETENTION_MONTHS > 0:
+        retain_from = return_first_day_of_month(
+            date=now.date(),
+            months=-secret.ATTENDANCE_TRACKING_RETENTION_MONTHS,
+        )
+        oldest = max(
+            oldest,
+            datetime.combine(retain_from, time(0, 0), tzinfo=timezone.utc),
+        )
+
+    # Same cutoff as archive_attendance_tracking
+    if secret.ATTENDANCE_ARCHIVE_AFTER_DAYS > 0:
+        archive_from = now.date() - timedelta(
+            days=secret.ATTENDANCE_ARCHIVE_AFTER_DAYS
+        )
+        oldest = max(
+            oldest,
+            datetime.combine(archive_from, time(0, 0), tzinfo=timezone.utc),
+        )
+
+    return oldest
+
+
+def get_schedule_instance_ids_to_archive_query(cutoff: datetime, limit: int):
+    """Classes that still have pings from before the cutoff"""
+    return (
+        select(models.AttendanceTrackingModel.schedule_instance_id)
+        .where(models.AttendanceTrackingModel.created_at_in_utc < cutoff)
+        .distinct()
+        .limit(limit)
+    )
+
+
+def get_attendance_trackings_to_archive_query(schedule_instance_id: int):
+    return (
+        select(
+            models.AttendanceTrackingModel.id,
+            models.AttendanceTrackingModel.user_id,
+            models.AttendanceTrackingModel.schedule_instance_id,
+            models.AttendanceTrackingModel.created_at_in_utc,
+        )
+        .where(
+            models.AttendanceTrackingModel.schedule_instance_id
+            == schedule_instance_id
+        )
+        .order_by(
+            models.AttendanceTrackingModel.user_id,
+            models.AttendanceTrackingModel.created_at_in_utc,
+        )
+    )
+
+
+def delete_archived_attendance_trackings_query(
+    schedule_instance_id: int, batch_rows: int
+):
+    return delete(models.AttendanceTrackingModel).where(
+        tuple_(
+            models.AttendanceTrackingModel.id,
+            models.AttendanceTrackingModel.created_at_in_utc,
+        ).in_(
+            select(
+                models.AttendanceTrackingModel.id,
+                models.AttendanceTrackingModel.created_at_in_utc,
+            )
+            .where(
+                models.AttendanceTrackingModel.schedule_instance_id
+                == schedule_instance_id
+            )
+            .limit(batch_rows)
+        )
+    )
+
+
+async def get_archived_created_at_lists(
+    schedule_instance_id: int, date: date
+) -> dict[int, list[datetime]] | None:
+    """Sorted ping timestamps per user of an archived class
+
+    None when the class has not been archived, its pings are then still in
+    attendance tracking. Once archived, the file has all of them.
+    """
+    archived_rows = await asyncio.to_thread(
+        archive.read_archive,
+        path=archive.return_archive_path(
+            archive_name=archive.ATTENDANCE_TRACKING_ARCHIVE,
+            date=date,
+            schedule_instance_id=schedule_instance_id,
+        ),
+    )
+    if archived_rows is None:
+        return None
+
+    created_at_lists = defaultdict(list)
+    for row in archived_rows:
+        created_at_lists[row["user_id"]].append(
+            datetime.fromisoformat(row["created_at_in_utc"])
+        )
+
+    for created_at_list in created_at_lists.values():
+        created_at_list.sort()
+
+    return created_at_lists
+
+
+def get_schedule_instance_window_filter(start: datetime, end: datetime):
+    """Pings of a class lie in its window, lets Postgres prune partitions"""
+    return models.AttendanceTrackingModel.created_at_in_utc.between(
+        start, end
+    )
+
+
+def return_presence_slot_count(start: datetime, end: datetime) -> int:
+    """Number of ping intervals in a class, the length of its bitmap"""
+    return max(
+        1,
+        math.ceil(
+            (end - start).total_seconds()
+            / time_constants.ATTENDANCE_TRACKING_PING_INTERVAL_IN_SECONDS
+        ),
+    )
+
+
+def return_presence_slot(
+    created_at_in_utc: datetime, start: datetime, slot_count: int
+) -> int:
+    """Ping interval a ping falls in, clamped to the class"""
+    slot = int(
+        (created_at_in_utc - start).total_seconds()
+        // time_constants.ATTENDANCE_TRACKING_PING_INTERVAL_IN_SECONDS
+    )
+
+    return min(max(slot, 0), slot_count - 1)
+
+
+def return_presence_slots_mask(slots: set[int], slot_count: int) -> str:
+    """Bit string with the given slots set, slot 0 is the leftmost bit"""
+    return "".join("1" if slot in slots else "0" for slot in range(slot_count))
+
+
+def return_presence_slots_datetimes(
+    presence_slots: str, start: datetime
+) -> list[datetime]:
+    """Start of every ping interval that is set in a bitmap"""
+    return [
+        start
+        + timedelta(
+            seconds=slot
+            * time_constants.ATTENDANCE_TRACKING_PING_INTERVAL_IN_SECONDS
+        )
+        for slot, bit in enumerate(presence_slots)
+        if bit == "1"
+    ]
+
+
+def get_presence_slots_count_column():
+    """Number of set bits in a summary's bitmap, NULL when it has none"""
+    return func.length(
+        func.replace(
+            cast(models.AttendanceTrackingSummaryModel.presence_slots, String),
+            "0",
+            "",
+        )
+    )
+
+
+def upsert_attendance_tracking_summaries_query():
+    summary = models.AttendanceTrackingSummaryModel.__table__.c
+    query = insert(models.AttendanceTrackingSummaryModel).values(
+        # Sent as text, bit strings have no native asyncpg parameter type
+        presence_slots=cast(
+            bindparam("presence_slots_mask", type_=String),
+            BIT(varying=True),
+        )
+    )
+
+    return query.on_conflict_do_update(
+        index_elements=[summary.schedule_instance_id, summary.user_id],
+        set_={
+            "ping_count": summary.ping_count + query.excluded.ping_count,
+            "first_seen_at_in_utc": func.least(
+                summary.first_seen_at_in_utc,
+                query.excluded.first_seen_at_in_utc,
+            ),
+            "last_seen_at_in_utc": func.greatest(
+                summary.last_seen_at_in_utc,
+                query.excluded.last_seen_at_in_utc,
+            ),
+            # Setting a bit twice is a no-op, duplicate pings are free
+            "presence_slots": func.coalesce(
+                summary.presence_slots.op("|")(query.excluded.presence_slots),
+                query.excluded.presence_slots,
+            ),
+        },
+    )
+
+
+async def get_schedule_instance_windows(
+    schedule_instance_ids: set[int], db: AsyncSession
+) -> dict[int, tuple[datetime, datetime]]:
+    result = await db.execute(
+        select(
+            models.ScheduleInstanceModel.id,
+            models.ScheduleInstanceModel.date,
+            models.ScheduleInstanceModel.start_time_in_utc,
+            models.ScheduleInstanceModel.end_time_in_utc,
+        ).where(models.ScheduleInstanceModel.id.in_(schedule_instance_ids))
+    )
+
+    return {
+        schedule_instance.id: return_schedule_instance_window(
+            date=schedule_instance.date,
+            start_time_in_utc=schedule_instance.start_time_in_utc,
+            end_time_in_utc=schedule_instance.end_time_in_utc,
+        )
+        for schedule_instance in result.all()
+    }
+
+
+async def upsert_attendance_tracking_summaries(
+    attendance_trackings: list[dict],
+    db: AsyncSession,
+    schedule_instance_windows: dict[int, tuple[datetime, datetime]]
+    | None = None,
+):
+    """Fold pings into the summaries, in the caller's transaction
+
+    Pings of schedule instances that do not exist anymore are skipped.
+    """
+    summaries = {}
+    summaries_slots = defaultdict(set)
+
+    if schedule_instance_windows is None:
+        schedule_instance_windows = await get_schedule_instance_windows(
+            schedule_instance_ids={
+                attendance_tracking["schedule_instance_id"]
+                for attendance_tracking in attendance_trackings
+            },
+            db=db,
+        )
+
+    for attendance_tracking in attendance_trackings:
+        key = (
+            attendance_tracking["schedule_instance_id"],
+            attendance_tracking["user_id"],
+        )
+        created_at_in_utc = attendance_tracking["created_at_in_utc"]
+
+        schedule_instance_window = schedule_instance_windows.get(key[0])
+        if schedule_instance_window is None:
+            continue
+
+        start, end = schedule_instance_window
+        slot_count = return_presence_slot_count(start=start, end=end)
+        summaries_slots[key].add(
+            return_presence_slot(
+                created_at_in_utc=created_at_in_utc,
+                start=start,
+                slot_count=slot_count,
+            )
+        )
+
+        summary = summaries.get(key)
+        if summary is None:
+            summaries[key] = {
+                "schedule_instance_id": key[0],
+                "user_id": key[1],
+                "ping_count": 1,
+                "first_seen_at_in_utc": created_at_in_utc,
+                "last_seen_at_in_utc": created_at_in_utc,
+                "slot_count": slot_count,
+            }
+            continue
+
+        summary["ping_count"] += 1
+        summary["first_seen_at_in_utc"] = min(
+            summary["first_seen_at_in_utc"], created_at_in_utc
+        )
+        summary["last_seen_at_in_utc"] = max(
+            summary["last_seen_at_in_utc"], created_at_in_utc
+        )
+
+    if not summaries:
+        return
+
+    for key, summary in summaries.items():
+        summary["presence_slots_mask"] = return_presence_slots_mask(
+            slots=summaries_slots[key], slot_count=summary.pop("slot_count")
+        )
+
+    # Same lock order in every transaction, so concurrent batches can not
+    # deadlock on each other's summary rows
+    await db.execute(
+        upsert_attendance_tracking_summaries_query(),
+        [summaries[key] for key in sorted(summaries)],
+    )
+
+
 async def create_attendance_tracking(
     schedule_instance_id: int,
     user_id: int,
@@ -42,6 +448,17 @@ async def create_attendance_tracking(
 
     db.add(db_attendance_tracking)
 
+    await upsert_attendance_tracking_summaries(
+        attendance_trackings=[
+            {
+                "schedule_instance_id": schedule_instance_id,
+                "user_id": user_id,
+                "created_at_in_utc": now,
+            }
+        ],
+        db=db,
+    )
+
     await db.commit()
     await db.refresh(db_attendance_tracking)
 
@@ -54,117 +471,474 @@ async def create_attendance_tracking(
             .joinedload(models.ScheduleInstanceModel.teacher)
             .joinedload(models.UserModel.additional_details),
         )
-        .where(models.AttendanceTrackingModel.id == db_attendance_tracking.id)
+        .where(
+            models.AttendanceTrackingModel.id == db_attendance_tracking.id,
+            models.AttendanceTrackingModel.created_at_in_utc == now,
+        )
     )
     db_attendance = result.scalar_one()
 
     return db_attendance
 
 
+async def create_attendance_tracking_minimal(
+    schedule_instance_id: int,
+    user_id: int,
+    now: datetime,
+    db: AsyncSession,
+):
+    """Insert a ping without loading it and its relationships back
+
+    With bitmap storage only the summary is written and there is no id.
+    """
+    attendance_tracking_id = None
+    if secret.ATTENDANCE_TRACKING_STORAGE == AttendanceTrackingStorageEnum.ROWS:
+        attendance_tracking_id = await db.scalar(
+            insert(models.AttendanceTrackingModel)
+            .values(
+                schedule_instance_id=schedule_instance_id,
+                user_id=user_id,
+                created_at_in_utc=now,
+            )
+            .returning(models.AttendanceTrackingModel.id)
+        )
+
+    await upsert_attendance_tracking_summaries(
+        attendance_trackings=[
+            {
+                "schedule_instance_id": schedule_instance_id,
+                "user_id": user_id,
+                "created_at_in_utc": now,
+            }
+        ],
+        db=db,
+    )
+
+    await db.commit()
+
+    return {
+        "id": attendance_tracking_id,
+        "schedule_instance_id": schedule_instance_id,
+        "status": "created" if attendance_tracking_id else "recorded",
+        "created_at_in_utc": now,
+    }
+
+
+async def create_attendance_trackings(
+    attendance_trackings: list[dict], db: AsyncSession
+) -> int:
+    """Insert many pings with a single multi-row INSERT
+
+    Pings of schedule instances deleted since they were validated are
+    skipped. Returns the number of pings that were inserted.
+    """
+    if not attendance_trackings:
+        return 0
+
+    schedule_instance_windows = await get_schedule_instance_windows(
+        schedule_instance_ids={
+            attendance_tracking["schedule_instance_id"]
+            for attendance_tracking in attendance_trackings
+        },
+        db=db,
+    )
+    attendance_trackings = [
+        attendance_tracking
+        for attendance_tracking in attendance_trackings
+        if attendance_tracking["schedule_instance_id"]
+        in schedule_instance_windows
+    ]
+    if not attendance_trackings:
+        return 0
+
+    if secret.ATTENDANCE_TRACKING_STORAGE == AttendanceTrackingStorageEnum.ROWS:
+        await db.execute(
+            insert(models.AttendanceTrackingModel).values(attendance_trackings)
+        )
+
+    await upsert_attendance_tracking_summaries(
+        attendance_trackings=attendance_trackings,
+        db=db,
+        schedule_instance_windows=schedule_instance_windows,
+    )
+
+    await db.commit()
+
+    return len(attendance_trackings)
+
+
 async def get_all_attendance_tracking_result_by_schedule_instance_id(
-    schedule_instance_id: int, db: AsyncSession
+    schedule_instance_id: int,
+    db: AsyncSession,
+    include_timestamps: bool = False,
 ):
+    """Per user ping count, first entry and attendance percentage
+
+    Read from the attendance tracking summaries. Time in class counts the
+    ping intervals that got at least one ping, so duplicates do not add up.
+    When asked for, the raw ping timestamps are loaded from attendance
+    tracking or the archive, or with bitmap storage, the start of every
+    pinged interval.
+    """
     # Fetch the schedule instance to get class duration
     schedule_instance = await db.get(
         models.ScheduleInstanceModel, schedule_instance_id
     )
-    class_duration_ms = None
 
-    if (
-        schedule_instance
-        and schedule_instance.start_time_in_utc
-        and schedule_instance.end_time_in_utc
-        and hasattr(schedule_instance, "date")  # Ensure you have a date field
-    ):
-        start_dt = datetime.combine(
-            schedule_instance.date, schedule_instance.start_time_in_utc
+    start = None
+    class_duration_minutes = None
+    if schedule_instance:
+        start, end = return_schedule_instance_window(
+            date=schedule_instance.date,
+            start_time_in_utc=schedule_instance.start_time_in_utc,
+            end_time_in_utc=schedule_instance.end_time_in_utc,
         )
-        end_dt = datetime.combine(
-            schedule_instance.date, schedule_instance.end_time_in_utc
+        class_duration_minutes = (end - start).total_seconds() / 60
+
+    # Summaries from before the bitmap only have a ping count
+    total_minutes = (
+        func.coalesce(
+            get_presence_slots_count_column(),
+            models.AttendanceTrackingSummaryModel.ping_count,
         )
-        # If end time is past midnight, adjust date
-        if end_dt < start_dt:
-            end_dt += timedelta(days=1)
-        class_duration_ms = (end_dt - start_dt).total_seconds() * 1000
-    else:
-        class_duration_ms = None
+        * time_constants.ATTENDANCE_TRACKING_PING_INTERVAL_IN_SECONDS
+        / 60.0
+    )
+
+    percentage = null()
+    if class_duration_minutes:
+        percentage = total_minutes / class_duration_minutes * 100
 
     result = await db.execute(
         select(
-            models.AttendanceTrackingModel.user_id,
+            models.AttendanceTrackingSummaryModel.user_id,
             models.UserModel.full_name,
             models.UserModel.email,
             models.UserModel.is_student,
-            models.AttendanceTrackingModel.created_at_in_utc,
+            models.AttendanceTrackingSummaryModel.first_seen_at_in_utc.label(
+                "first_entry"
+            ),
+            models.AttendanceTrackingSummaryModel.last_seen_at_in_utc.label(
+                "last_entry"
+            ),
+            total_minutes.label("total_time_in_class_minutes"),
+            percentage.label("attendance_percentage"),
         )
         .join(
             models.UserModel,
-            models.AttendanceTrackingModel.user_id == models.UserModel.id,
+            models.AttendanceTrackingSummaryModel.user_id
+            == models.UserModel.id,
         )
         .where(
-            models.AttendanceTrackingModel.schedule_instance_id
+            models.AttendanceTrackingSummaryModel.schedule_instance_id
             == schedule_instance_id
         )
-        .order_by(
-            models.UserModel.email,
+        .order_by(models.UserModel.email)
+    )
+
+    summary = [dict(row._mapping) for row in result.all()]
+
+    if (
+        include_timestamps
+        and secret.ATTENDANCE_TRACKING_STORAGE
+        == AttendanceTrackingStorageEnum.BITMAP
+    ):
+        result = await db.execute(
+            select(
+                models.AttendanceTrackingSummaryModel.user_id,
+                cast(
+                    models.AttendanceTrackingSummaryModel.presence_slots,
+                    String,
+                ),
+            ).where(
+                models.AttendanceTrackingSummaryModel.schedule_instance_id
+                == schedule_instance_id
+            )
+        )
+        presence_slots = dict(result.all())
+
+        for data in summary:
+            data["created_at_list"] = (
+                return_presence_slots_datetimes(
+                    presence_slots=presence_slots[data["user_id"]],
+                    start=start,
+                )
+                if presence_slots.get(data["user_id"]) and start
+                else []
+            )
+
+    elif include_timestamps and start:
+        created_at_lists = await get_archived_created_at_lists(
+            schedule_instance_id=schedule_instance_id,
+            date=schedule_instance.date,
+        )
+
+        if created_at_lists is None:
+            result = await db.execute(
+                select(
+                    models.AttendanceTrackingModel.user_id,
+                    models.AttendanceTrackingModel.created_at_in_utc,
+                )
+                .where(
+                    models.AttendanceTrackingModel.schedule_instance_id
+                    == schedule_instance_id,
+                    get_schedule_instance_window_filter(start=start, end=end),
+                )
+                .order_by(
+                    models.AttendanceTrackingModel.user_id,
+                    models.AttendanceTrackingModel.created_at_in_utc,
+                )
+            )
+
+            created_at_lists = defaultdict(list)
+            for user_id, created_at in result.all():
+                created_at_lists[user_id].append(created_at)
+
+        for data in summary:
+            data["created_at_list"] = created_at_lists.get(data["user_id"], [])
+
+    return summary
+
+
+def return_merged_presence_intervals(
+    created_at_list: list[datetime],
+    start: datetime,
+    end: datetime,
+    gap_tolerance_in_seconds: float,
+) -> list[tuple[datetime, datetime]]:
+    """Merge sorted ping timestamps into presence intervals
+
+    A ping covers one ping interval from when it arrived. Pings no more than
+    the gap tolerance apart are merged, and intervals are clipped to the
+    class. Same rules as get_presence_intervals_query, for bitmap storage.
+    """
+    ping_interval = timedelta(
+        seconds=time_constants.ATTENDANCE_TRACKING_PING_INTERVAL_IN_SECONDS
+    )
+    gap_tolerance = max(
+        timedelta(seconds=gap_tolerance_in_seconds), ping_interval
+    )
+
+    intervals = []
+    for created_at in created_at_list:
+        if intervals and created_at - intervals[-1][1] <= gap_tolerance:
+            intervals[-1][1] = created_at
+        else:
+            intervals.append([created_at, created_at])
+
+    return [
+        (max(first, start), min(last + ping_interval, end))
+        for first, last in intervals
+        if max(first, start) < min(last + ping_interval, end)
+    ]
+
+
+def get_presence_intervals_query(
+    schedule_instance_id: int,
+    start: datetime,
+    end: datetime,
+    gap_tolerance_in_seconds: float,
+):
+    """Merged presence intervals of every user, as gaps and islands in SQL
+
+    Every ping more than the gap tolerance after the previous ping of its
+    user starts a new island, the running count of those is the island
+    number. Each island becomes one interval, from its first ping to one
+    ping interval after its last, clipped to the class.
+    """
+    ping_interval = timedelta(
+        seconds=time_constants.ATTENDANCE_TRACKING_PING_INTERVAL_IN_SECONDS
+    )
+    gap_tolerance = max(
+        timedelta(seconds=gap_tolerance_in_seconds), ping_interval
+    )
+
+    pings = (
+        select(
+            models.AttendanceTrackingModel.user_id,
             models.AttendanceTrackingModel.created_at_in_utc,
+            func.lag(models.AttendanceTrackingModel.created_at_in_utc)
+            .over(
+                partition_by=models.AttendanceTrackingModel.user_id,
+                order_by=models.AttendanceTrackingModel.created_at_in_utc,
+            )
+            .label("previous_created_at_in_utc"),
+        )
+        .where(
+            models.AttendanceTrackingModel.schedule_instance_id
+            == schedule_instance_id,
+            get_schedule_instance_window_filter(start=start, end=end),
+        )
+        .subquery()
+    )
+
+    is_new_island = case(
+        (
+            or_(
+                pings.c.previous_created_at_in_utc.is_(None),
+                pings.c.created_at_in_utc - pings.c.previous_created_at_in_utc
+                > gap_tolerance,
+            ),
+            1,
+        ),
+        else_=0,
+    )
+    islands = select(
+        pings.c.user_id,
+        pings.c.created_at_in_utc,
+        func.sum(is_new_island)
+        .over(
+            partition_by=pings.c.user_id,
+            order_by=pings.c.created_at_in_utc,
+        )
+        .label("island"),
+    ).subquery()
+
+    intervals = (
+        select(
+            islands.c.user_id,
+            func.greatest(func.min(islands.c.created_at_in_utc), start).label(
+                "start"
+            ),
+            func.least(
+                func.max(islands.c.created_at_in_utc) + ping_interval, end
+            ).label("end"),
         )
+        .group_by(islands.c.user_id, islands.c.island)
+        .subquery()
     )
-    rows = result.all()
 
-    # Group by user email
-    user_data = defaultdict(
-        lambda: {
-            "user_id": None,
-            "full_name": None,
-            "email": None,
-            "is_student": None,
-            "created_at_list": [],
-        }
+    return (
+        select(intervals.c.user_id, intervals.c.start, intervals.c.end)
+        .where(intervals.c.start < intervals.c.end)
+        .order_by(intervals.c.user_id, intervals.c.start)
+    )
+
+
+async def get_presence_by_schedule_instance_id(
+    schedule_instance_id: int,
+    db: AsyncSession,
+    gap_tolerance_in_seconds: float = (
+        time_constants.ATTENDANCE_TRACKING_GAP_TOLERANCE_IN_SECONDS
+    ),
+):
+    """Presence intervals and minutes present of every user of a class
+
+    Intervals are merged in SQL over the whole class at once, Python only
+    sees one row per interval. With bitmap storage there are no raw pings,
+    so the pinged slots of every summary are merged instead, as are the
+    pings of an archived class.
+    """
+    schedule_instance = await db.get(
+        models.ScheduleInstanceModel, schedule_instance_id
     )
+    if not schedule_instance:
+        return []
 
-    for user_id, name, email, is_student, created_at in rows:
-        data = user_data[email]
-        data["user_id"] = user_id
-        data["full_name"] = name
-        data["email"] = email
-        data["is_student"] = is_student
-        data["created_at_list"].append(created_at)
+    start, end = return_schedule_instance_window(
+        date=schedule_instance.date,
+        start_time_in_utc=schedule_instance.start_time_in_utc,
+        end_time_in_utc=schedule_instance.end_time_in_utc,
+    )
+    class_duration_minutes = (end - start).total_seconds() / 60
 
-    # Prepare summary
-    summary = []
-    SECONDS_PER_PING = 30
+    archived_created_at_lists = None
+    if secret.ATTENDANCE_TRACKING_STORAGE == AttendanceTrackingStorageEnum.ROWS:
+        archived_created_at_lists = await get_archived_created_at_lists(
+            schedule_instance_id=schedule_instance_id,
+            date=schedule_instance.date,
+        )
 
-    for email, data in user_data.items():
-        created_ats = sorted(
-            [dt for dt in data["created_at_list"] if dt is not None]
+    user_intervals = defaultdict(list)
+    if archived_created_at_lists is not None:
+        for user_id, created_at_list in archived_created_at_lists.items():
+            user_intervals[user_id] = return_merged_presence_intervals(
+                created_at_list=created_at_list,
+                start=start,
+                end=end,
+                gap_tolerance_in_seconds=gap_tolerance_in_seconds,
+            )
+    elif (
+        secret.ATTENDANCE_TRACKING_STORAGE == AttendanceTrackingStorageEnum.ROWS
+    ):
+        result = await db.execute(
+            get_presence_intervals_query(
+                schedule_instance_id=schedule_instance_id,
+                start=start,
+                end=end,
+                gap_tolerance_in_seconds=gap_tolerance_in_seconds,
+            )
+        )
+        for user_id, interval_start, interval_end in result.all():
+            user_intervals[user_id].append((interval_start, interval_end))
+    else:
+        result = await db.execute(
+            select(
+                models.AttendanceTrackingSummaryModel.user_id,
+                cast(
+                    models.AttendanceTrackingSummaryModel.presence_slots,
+                    String,
+                ),
+            ).where(
+                models.AttendanceTrackingSummaryModel.schedule_instance_id
+                == schedule_instance_id,
+                models.AttendanceTrackingSummaryModel.presence_slots.is_not(
+                    None
+                ),
+            )
         )
-        num_pings = len(created_ats)
-        total_seconds = num_pings * SECONDS_PER_PING
-        total_minutes = total_seconds / 60
+        for user_id, presence_slots in result.all():
+            user_intervals[user_id] = return_merged_presence_intervals(
+                created_at_list=return_presence_slots_datetimes(
+                    presence_slots=presence_slots, start=start
+                ),
+                start=start,
+                end=end,
+                gap_tolerance_in_seconds=gap_tolerance_in_seconds,
+            )
+
+    if not user_intervals:
+        return []
 
-        # Class duration in minutes
-        class_duration_minutes = (
-            class_duration_ms / (1000 * 60) if class_duration_ms else None
+    result = await db.execute(
+        select(
+            models.UserModel.id,
+            models.UserModel.full_name,
+            models.UserModel.email,
+            models.UserModel.is_student,
         )
+        .where(models.UserModel.id.in_(user_intervals))
+        .order_by(models.UserModel.email)
+    )
 
-        percentage = (
-            (total_minutes / class_duration_minutes) * 100
-            if class_duration_minutes and class_duration_minutes > 0
-            else None
+    presence = []
+    for user_id, full_name, email, is_student in result.all():
+        intervals = user_intervals[user_id]
+        minutes_present = (
+            sum(
+                (interval_end - interval_start).total_seconds()
+                for interval_start, interval_end in intervals
+            )
+            / 60
         )
 
-        summary.append(
+        presence.append(
             {
-                "user_id": data["user_id"],
-                "full_name": data["full_name"],
-                "email": data["email"],
-                "is_student": data["is_student"],
-                "created_at_list": created_ats,
-                "first_entry": created_ats[0] if created_ats else None,
-                "total_time_in_class_minutes": total_minutes,
-                "attendance_percentage": percentage,
+                "user_id": user_id,
+                "full_name": full_name,
+                "email": email,
+                "is_student": is_student,
+                "intervals": [
+                    {"start": interval_start, "end": interval_end}
+                    for interval_start, interval_end in intervals
+                ],
+                "minutes_present": minutes_present,
+                "attendance_percentage": (
+                    minutes_present / class_duration_minutes * 100
+                    if class_duration_minutes > 0
+                    else None
+                ),
             }
         )
 
-    return summary
+    return presence
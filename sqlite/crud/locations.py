@@ -25,6 +25,12 @@ async def get_location_by_title(location_title: str, db: AsyncSession):
     )
 
 
+def get_location_ids_by_titles_query(location_titles: set[str]):
+    return select(models.LocationModel.title, models.LocationModel.id).where(
+        models.LocationModel.title.in_(location_titles)
+    )
+
+
 async def get_location_by_bluetooth_address(
     bluetooth_address: str, db: AsyncSession
 ):
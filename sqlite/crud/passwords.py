@@ -2,7 +2,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from sqlite.crud.users import get_user_by_email
 
-from utils.password import verify_password
+from utils.password import password_pool
 
 
 async def authenticate_user(email: str, password: str, db: AsyncSession):
@@ -12,7 +12,7 @@ async def authenticate_user(email: str, password: str, db: AsyncSession):
     if not user:
         return False
 
-    if not verify_password(
+    if not await password_pool.verify(
         plain_password=password, hashed_password=user.password
     ):
         return False
@@ -1,6 +1,7 @@
 from datetime import datetime, date, timezone
 
-from sqlalchemy import select, and_, or_
+from sqlalchemy import select, delete, func, and_, or_, not_
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import joinedload
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -8,6 +9,15 @@ from sqlite import models
 from sqlite.schemas import ScheduleInstanceUpdateClass
 
 
+# Columns covered by ix_schedule_instances_natural_key
+SCHEDULE_INSTANCE_NATURAL_KEY = (
+    "schedule_id",
+    "date",
+    "start_time_in_utc",
+    "end_time_in_utc",
+)
+
+
 def get_all_schedule_instances_query():
     return select(models.ScheduleInstanceModel).options(
         joinedload(models.ScheduleInstanceModel.teacher).joinedload(
@@ -161,13 +171,184 @@ async def get_all_academic_user_ids_against_a_schedule_instance(
     return user_ids
 
 
-async def get_all_schedule_instances_count_by_schedule_id(
-    schedule_id: int, db: AsyncSession
+def get_schedule_instance_windows_for_user_query(
+    schedule_instance_ids: set[int], user_id: int
+):
+    """Time window of each instance, and whether the user belongs to it"""
+    return select(
+        models.ScheduleInstanceModel.id,
+        models.ScheduleInstanceModel.date,
+        models.ScheduleInstanceModel.start_time_in_utc,
+        models.ScheduleInstanceModel.end_time_in_utc,
+        select(models.ScheduleInstanceUserModel.user_id)
+        .where(
+            models.ScheduleInstanceUserModel.schedule_instance_id
+            == models.ScheduleInstanceModel.id,
+            models.ScheduleInstanceUserModel.user_id == user_id,
+        )
+        .exists()
+        .label("is_academic_user"),
+    ).where(models.ScheduleInstanceModel.id.in_(schedule_instance_ids))
+
+
+async def get_schedule_instance_window_for_user(
+    schedule_instance_id: int, user_id: int, db: AsyncSession
 ):
+    """Only what marking needs to validate, in a single round trip"""
     result = await db.execute(
-        select(models.ScheduleInstanceModel.id).where(
-            models.ScheduleInstanceModel.schedule_id == schedule_id
+        get_schedule_instance_windows_for_user_query(
+            schedule_instance_ids={schedule_instance_id}, user_id=user_id
         )
     )
 
-    return len(result.scalars().all())
+    return result.one_or_none()
+
+
+def get_schedule_instance_windows_by_date_query(date: date, limit: int):
+    """Time window of the instances on a date, soonest first"""
+    return (
+        select(
+            models.ScheduleInstanceModel.id,
+            models.ScheduleInstanceModel.date,
+            models.ScheduleInstanceModel.start_time_in_utc,
+            models.ScheduleInstanceModel.end_time_in_utc,
+        )
+        .where(models.ScheduleInstanceModel.date == date)
+        .order_by(
+            models.ScheduleInstanceModel.start_time_in_utc,
+            models.ScheduleInstanceModel.id,
+        )
+        .limit(limit)
+    )
+
+
+def get_schedule_instance_user_ids_query(schedule_instance_ids):
+    """(schedule instance id, user id) of every academic user of them"""
+    return select(
+        models.ScheduleInstanceUserModel.schedule_instance_id,
+        models.ScheduleInstanceUserModel.user_id,
+    ).where(
+        models.ScheduleInstanceUserModel.schedule_instance_id.in_(
+            schedule_instance_ids
+        )
+    )
+
+
+async def get_started_schedule_instances_count_by_schedule_id(
+    schedule_id: int, db: AsyncSession
+):
+    now = datetime.now(tz=timezone.utc)
+
+    return await db.scalar(
+        select(func.count())
+        .select_from(models.ScheduleInstanceModel)
+        .where(
+            models.ScheduleInstanceModel.schedule_id == schedule_id,
+            get_started_schedule_instances_filter(now=now),
+        )
+    )
+
+
+def upsert_schedule_instances_query():
+    """Insert schedule instances, skipping the ones that already exist.
+
+    Only the newly created rows are returned, as (id, schedule_id).
+    """
+    return (
+        insert(models.ScheduleInstanceModel)
+        .on_conflict_do_nothing(index_elements=SCHEDULE_INSTANCE_NATURAL_KEY)
+        .returning(
+            models.ScheduleInstanceModel.id,
+            models.ScheduleInstanceModel.schedule_id,
+        )
+    )
+
+
+def upsert_schedule_instance_users_query():
+    return insert(models.ScheduleInstanceUserModel).on_conflict_do_nothing()
+
+
+async def upsert_schedule_instances(
+    schedule_instances: list[dict], db: AsyncSession
+):
+    if not schedule_instances:
+        return []
+
+    result = await db.execute(
+        upsert_schedule_instances_query(), schedule_instances
+    )
+
+    return result.all()
+
+
+async def upsert_schedule_instance_users(
+    schedule_instance_users: list[dict], db: AsyncSession
+):
+    if not schedule_instance_users:
+        return
+
+    await db.execute(
+        upsert_schedule_instance_users_query(), schedule_instance_users
+    )
+
+
+def get_started_schedule_instances_filter(now: datetime):
+    return or_(
+        models.ScheduleInstanceModel.date < now.date(),
+        and_(
+            models.ScheduleInstanceModel.date == now.date(),
+            models.ScheduleInstanceModel.start_time_in_utc <= now.time(),
+        ),
+    )
+
+
+def get_upcoming_schedule_instances_by_schedule_ids_query(
+    schedule_ids: list[int], now: datetime
+):
+    """Plain column rows for instances that have not started yet"""
+    return select(
+        models.ScheduleInstanceModel.id,
+        models.ScheduleInstanceModel.schedule_id,
+        models.ScheduleInstanceModel.teacher_id,
+        models.ScheduleInstanceModel.location_id,
+        models.ScheduleInstanceModel.date,
+        models.ScheduleInstanceModel.start_time_in_utc,
+        models.ScheduleInstanceModel.end_time_in_utc,
+        models.ScheduleInstanceModel.is_edited,
+    ).where(
+        models.ScheduleInstanceModel.schedule_id.in_(schedule_ids),
+        not_(get_started_schedule_instances_filter(now=now)),
+    )
+
+
+def delete_schedule_instances_queries(schedule_instance_ids):
+    """Statements to delete instances along with their academic users
+
+    Takes either a list of ids or a select of ids.
+    """
+    return [
+        delete(models.ScheduleInstanceUserModel).where(
+            models.ScheduleInstanceUserModel.schedule_instance_id.in_(
+                schedule_instance_ids
+            )
+        ),
+        delete(models.ScheduleInstanceModel).where(
+            models.ScheduleInstanceModel.id.in_(schedule_instance_ids)
+        ),
+    ]
+
+
+async def delete_upcoming_schedule_instances_by_schedule_id(
+    schedule_id: int, now: datetime, db: AsyncSession
+):
+    upcoming_schedule_instance_ids = select(
+        models.ScheduleInstanceModel.id
+    ).where(
+        models.ScheduleInstanceModel.schedule_id == schedule_id,
+        not_(get_started_schedule_instances_filter(now=now)),
+    )
+
+    for query in delete_schedule_instances_queries(
+        schedule_instance_ids=upcoming_schedule_instance_ids
+    ):
+        await db.execute(query)
@@ -1,6 +1,6 @@
 from datetime import datetime, date, timezone
 
-from sqlalchemy import select, delete, or_, and_
+from sqlalchemy import select, insert, update, delete, or_, and_, tuple_
 from sqlalchemy.orm import joinedload
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -13,8 +13,15 @@ from sqlite.schemas import (
     # Search
     ScheduleReoccurringSearchClass,
     ScheduleNonReoccurringSearchClass,
+    # Import
+    ScheduleImportClass,
 )
-from sqlite.enums import DaysEnum
+from sqlite.enums import DaysEnum, ScheduleEventEnum
+from sqlite.crud.schedule_instances import (
+    delete_upcoming_schedule_instances_by_schedule_id,
+)
+from sqlite.crud.users import get_academic_user_ids_by_emails_query
+from sqlite.crud.locations import get_location_ids_by_titles_query
 
 from utils.date_utils import return_day_of_week_name
 
@@ -51,6 +58,21 @@ def get_all_schedules_by_day_query(day: DaysEnum):
     )
 
 
+def get_today_schedules_filter(now: datetime):
+    return or_(
+        and_(
+            models.ScheduleModel.is_reoccurring.is_(True),
+            models.ScheduleModel.date.is_(None),
+            models.ScheduleModel.day == return_day_of_week_name(date=now),
+        ),
+        and_(
+            ~models.ScheduleModel.is_reoccurring.is_(False),
+            models.ScheduleModel.date == now.date(),
+            models.ScheduleModel.day == return_day_of_week_name(date=now),
+        ),
+    )
+
+
 def get_today_schedules_query():
     now = datetime.now(tz=timezone.utc)
 
@@ -61,22 +83,41 @@ def get_today_schedules_query():
                 models.UserModel.additional_details
             ),
         )
-        .where(
-            or_(
-                and_(
-                    models.ScheduleModel.is_reoccurring.is_(True),
-                    models.ScheduleModel.date.is_(None),
-                    models.ScheduleModel.day
-                    == return_day_of_week_name(date=now),
-                ),
-                and_(
-                    ~models.ScheduleModel.is_reoccurring.is_(False),
-                    models.ScheduleModel.date == now.date(),
-                    models.ScheduleModel.day
-                    == return_day_of_week_name(date=now),
-                ),
-            )
-        )
+        .where(get_today_schedules_filter(now=now))
+    )
+
+
+def get_schedule_rows_query():
+    """Plain column rows for schedules, without any eager loads"""
+    return select(
+        models.ScheduleModel.id,
+        models.ScheduleModel.teacher_id,
+        models.ScheduleModel.location_id,
+        models.ScheduleModel.is_reoccurring,
+        models.ScheduleModel.date,
+        models.ScheduleModel.day,
+        models.ScheduleModel.start_time_in_utc,
+        models.ScheduleModel.end_time_in_utc,
+        models.ScheduleModel.instances_materialized_until,
+    )
+
+
+def get_schedules_to_materialize_query(materialize_until: date):
+    """Schedules whose instances are behind the horizon"""
+    high_water_mark = models.ScheduleModel.instances_materialized_until
+
+    return get_schedule_rows_query().where(
+        or_(high_water_mark.is_(None), high_water_mark < materialize_until)
+    )
+
+
+def set_schedules_materialized_until_query(
+    schedule_ids: list[int], materialized_until: date
+):
+    return (
+        update(models.ScheduleModel)
+        .where(models.ScheduleModel.id.in_(schedule_ids))
+        .values(instances_materialized_until=materialized_until)
     )
 
 
@@ -147,6 +188,285 @@ async def get_non_reoccurring_schedule(
     )
 
 
+def get_existing_schedule_keys_query(
+    reoccurring_keys: list[tuple], non_reoccurring_keys: list[tuple]
+):
+    """Schedules an import would duplicate, as (teacher_id, location_id,
+    start_time_in_utc, end_time_in_utc, day, date) rows
+
+    Matched like get_reoccurring_schedule does by day, and like
+    get_non_reoccurring_schedule does by date.
+    """
+    key_columns = (
+        models.ScheduleModel.teacher_id,
+        models.ScheduleModel.location_id,
+        models.ScheduleModel.start_time_in_utc,
+        models.ScheduleModel.end_time_in_utc,
+    )
+
+    return select(
+        *key_columns, models.ScheduleModel.day, models.ScheduleModel.date
+    ).where(
+        or_(
+            tuple_(*key_columns, models.ScheduleModel.day).in_(
+                reoccurring_keys
+            ),
+            tuple_(*key_columns, models.ScheduleModel.date).in_(
+                non_reoccurring_keys
+            ),
+        )
+    )
+
+
+def insert_schedules_query():
+    return insert(models.ScheduleModel).returning(
+        models.ScheduleModel.id, sort_by_parameter_order=True
+    )
+
+
+async def resolve_schedule_import(
+    schedules: dict[int, ScheduleImportClass], db: AsyncSession
+) -> tuple[list[dict], list[dict]]:
+    """Validate a timetable as a whole, and resolve it into rows to insert.
+
+    Schedules are keyed by their index in the import. Teachers, locations,
+    students and existing duplicates are each found with one query for the
+    whole import. Returns the schedules to insert, with the ids of their
+    users, and the errors of every schedule that can not be.
+    """
+    teacher_emails = {
+        schedule.teacher_email for schedule in schedules.values()
+    }
+    location_titles = {
+        schedule.location_title for schedule in schedules.values()
+    }
+    student_emails = {
+        student_email
+        for schedule in schedules.values()
+        for student_email in schedule.student_emails
+    }
+
+    result = await db.execute(
+        get_academic_user_ids_by_emails_query(
+            user_emails=teacher_emails, only_students=False
+        )
+    )
+    teacher_ids = dict(result.tuples().all())
+
+    result = await db.execute(
+        get_location_ids_by_titles_query(location_titles=location_titles)
+    )
+    location_ids = dict(result.tuples().all())
+
+    result = await db.execute(
+        get_academic_user_ids_by_emails_query(
+            user_emails=student_emails, only_students=True
+        )
+    )
+    student_ids = dict(result.tuples().all())
+
+    errors = []
+    resolved = {}
+    for index, schedule in schedules.items():
+        details = []
+
+        teacher_id = teacher_ids.get(schedule.teacher_email)
+        if teacher_id is None:
+            details.append(
+                f"Academic user {schedule.teacher_email} does not exist"
+            )
+
+        location_id = location_ids.get(schedule.location_title)
+        if location_id is None:
+            details.append(
+                f"Location {schedule.location_title} does not exist"
+            )
+
+        missing_student_emails = [
+            student_email
+            for student_email in schedule.student_emails
+            if student_email not in student_ids
+        ]
+        if missing_student_emails:
+            details.append(
+                "Students do not exist: " + ", ".join(missing_student_emails)
+            )
+
+        if details:
+            errors.extend({"index": index, "detail": d} for d in details)
+            continue
+
+        resolved[index] = {
+            "schedule": {
+                "title": schedule.title,
+                "teacher_id": teacher_id,
+                "location_id": location_id,
+                "is_reoccurring": schedule.date is None,
+                "date": schedule.date,
+                "day": schedule.day
+                or return_day_of_week_name(date=schedule.date),
+                # Naive like the columns, so keys compare equal to them
+                "start_time_in_utc": schedule.start_time_in_utc.replace(
+                    tzinfo=None
+                ),
+                "end_time_in_utc": schedule.end_time_in_utc.replace(
+                    tzinfo=None
+                ),
+            },
+            # The teacher is part of the bridge table as well
+            "user_ids": {teacher_id}
+            | {
+                student_ids[student_email]
+                for student_email in schedule.student_emails
+            },
+        }
+
+    # Reoccurring schedules are duplicated by day, the others by date
+    def return_schedule_key(schedule: dict) -> tuple:
+        return (
+            schedule["teacher_id"],
+            schedule["location_id"],
+            schedule["start_time_in_utc"],
+            schedule["end_time_in_utc"],
+            (
+                schedule["day"]
+                if schedule["is_reoccurring"]
+                else schedule["date"]
+            ),
+        )
+
+    existing_keys = set()
+    if resolved:
+        result = await db.execute(
+            get_existing_schedule_keys_query(
+                reoccurring_keys=[
+                    return_schedule_key(schedule=r["schedule"])
+                    for r in resolved.values()
+                    if r["schedule"]["is_reoccurring"]
+                ],
+                non_reoccurring_keys=[
+                    return_schedule_key(schedule=r["schedule"])
+                    for r in resolved.values()
+                    if not r["schedule"]["is_reoccurring"]
+                ],
+            )
+        )
+        for *key_columns, existing_day, existing_date in (
+            result.tuples().all()
+        ):
+            existing_keys.add((*key_columns, existing_day))
+            if existing_date is not None:
+                existing_keys.add((*key_columns, existing_date))
+
+    schedules_to_create = []
+    seen_keys = set()
+    for index, r in resolved.items():
+        key = return_schedule_key(schedule=r["schedule"])
+
+        if key in existing_keys:
+            errors.append(
+                {"index": index, "detail": "Schedule already exists"}
+            )
+            continue
+        if key in seen_keys:
+            errors.append(
+                {
+                    "index": index,
+                    "detail": "Schedule is already part of the import",
+                }
+            )
+            continue
+
+        seen_keys.add(key)
+        schedules_to_create.append(r)
+
+    return schedules_to_create, errors
+
+
+async def create_imported_schedules(
+    schedules: list[dict], db: AsyncSession
+) -> list[int]:
+    """Insert resolved schedules, their users and their outbox events.
+
+    Every table gets a single bulk insert, and everything is committed in
+    one transaction.
+    """
+    result = await db.execute(
+        insert_schedules_query(),
+        [schedule["schedule"] for schedule in schedules],
+    )
+    schedule_ids = list(result.scalars().all())
+
+    await db.execute(
+        insert(models.ScheduleUserModel),
+        [
+            {"user_id": user_id, "schedule_id": schedule_id}
+            for schedule_id, schedule in zip(schedule_ids, schedules)
+            for user_id in schedule["user_ids"]
+        ],
+    )
+
+    # Like add_schedule_event, so the worker materializes their instances
+    now = datetime.now(tz=timezone.utc)
+    await db.execute(
+        insert(models.ScheduleEventModel),
+        [
+            {
+                "schedule_id": schedule_id,
+                "event_type": ScheduleEventEnum.CREATED,
+                "created_at_in_utc": now,
+            }
+            for schedule_id in schedule_ids
+        ],
+    )
+
+    await db.commit()
+
+    return schedule_ids
+
+
+def add_schedule_event(
+    schedule_id: int, event_type: ScheduleEventEnum, db: AsyncSession
+):
+    """Add an outbox event, committed along with the schedule change"""
+    db.add(
+        models.ScheduleEventModel(
+            schedule_id=schedule_id,
+            event_type=event_type,
+            created_at_in_utc=datetime.now(tz=timezone.utc),
+        )
+    )
+
+
+def get_unprocessed_schedule_events_query():
+    # Skip events another worker is already processing
+    return (
+        select(
+            models.ScheduleEventModel.id,
+            models.ScheduleEventModel.schedule_id,
+        )
+        .where(models.ScheduleEventModel.processed_at_in_utc.is_(None))
+        .order_by(models.ScheduleEventModel.id)
+        .with_for_update(skip_locked=True)
+    )
+
+
+def set_schedule_events_processed_query(
+    schedule_event_ids: list[int], processed_at_in_utc: datetime
+):
+    return (
+        update(models.ScheduleEventModel)
+        .where(models.ScheduleEventModel.id.in_(schedule_event_ids))
+        .values(processed_at_in_utc=processed_at_in_utc)
+    )
+
+
+def delete_processed_schedule_events_query(processed_before: datetime):
+    return delete(models.ScheduleEventModel).where(
+        models.ScheduleEventModel.processed_at_in_utc < processed_before
+    )
+
+
 async def get_schedule_by_id(schedule_id: int, db: AsyncSession):
     return await db.scalar(
         select(models.ScheduleModel)
@@ -181,8 +501,8 @@ async def create_schedule(
 
     db.add(db_schedule)
 
-    await db.commit()
-    await db.refresh(db_schedule)
+    # Flush to get an id, everything below is committed in one transaction
+    await db.flush()
 
     # Add teacher id as user_id in ScheduleUser Model
     db.add(
@@ -191,8 +511,6 @@ async def create_schedule(
             schedule_id=db_schedule.id,
         )
     )
-    await db.commit()
-    await db.refresh(db_schedule)
 
     # Add all students to the bridge table
     if students:
@@ -213,8 +531,14 @@ async def create_schedule(
                 )
             )
 
-        await db.commit()
-        await db.refresh(db_schedule)
+    add_schedule_event(
+        schedule_id=db_schedule.id,
+        event_type=ScheduleEventEnum.CREATED,
+        db=db,
+    )
+
+    await db.commit()
+    await db.refresh(db_schedule)
 
     # Eagerly load nested relationships
     result = await db.execute(
@@ -248,17 +572,22 @@ async def update_schedule(
             schedule=schedule, day=return_day_of_week_name(date=schedule.date)
         )
 
-    await db.commit()
-    await db.refresh(db_schedule)
-
-    # 1. Remove all existing students
+    # 1. Remove all existing students and the teacher
     await db.execute(
         delete(models.ScheduleUserModel).where(
             models.ScheduleUserModel.schedule_id == db_schedule.id
         )
     )
 
-    # 2. Add new students
+    # 2. Add the teacher back, it might have changed as well
+    db.add(
+        models.ScheduleUserModel(
+            user_id=db_schedule.teacher_id,
+            schedule_id=db_schedule.id,
+        )
+    )
+
+    # 3. Add new students
     if students:
         user_result = await db.execute(
             select(models.UserModel).where(
@@ -277,6 +606,12 @@ async def update_schedule(
                 )
             )
 
+    add_schedule_event(
+        schedule_id=db_schedule.id,
+        event_type=ScheduleEventEnum.UPDATED,
+        db=db,
+    )
+
     await db.commit()
     await db.refresh(db_schedule)
 
@@ -296,6 +631,19 @@ async def update_schedule(
 
 
 async def delete_schedule(db_schedule: models.ScheduleModel, db: AsyncSession):
+    # Instances that have not started yet only exist because of the horizon
+    await delete_upcoming_schedule_instances_by_schedule_id(
+        schedule_id=db_schedule.id,
+        now=datetime.now(tz=timezone.utc),
+        db=db,
+    )
+
+    add_schedule_event(
+        schedule_id=db_schedule.id,
+        event_type=ScheduleEventEnum.DELETED,
+        db=db,
+    )
+
     await db.delete(db_schedule)
 
     await db.commit()
@@ -1,16 +1,24 @@
 from datetime import datetime, timezone
 
-from sqlalchemy import select
+from sqlalchemy import delete, literal, select
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import joinedload
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from sqlite import models
+from sqlite.user_cache import user_cache
+from sqlite.token_versions import token_versions
 from sqlite.schemas import (
     UserCreateClass,
     UserUpdateClass,
     UserPasswordUpdateClass,
+    UserImportClass,
 )
-from utils.password import get_password_hash
+from utils.password import password_pool, password_process_pool
+
+
+# Users inserted per statement by an import
+IMPORT_USERS_BATCH_ROWS = 1000
 
 
 def get_all_admin_users_query():
@@ -32,6 +40,16 @@ def get_all_academic_users_query(only_students: bool):
     )
 
 
+def get_academic_user_ids_by_emails_query(
+    user_emails: set[str], only_students: bool
+):
+    return select(models.UserModel.email, models.UserModel.id).where(
+        models.UserModel.email.in_(user_emails),
+        models.UserModel.is_admin.is_(False),
+        models.UserModel.is_student == only_students,
+    )
+
+
 async def get_user_by_id(user_id: int, db: AsyncSession):
     return await db.scalar(
         select(models.UserModel)
@@ -57,8 +75,213 @@ async def get_user_by_phone(user_phone: str, db: AsyncSession):
     )
 
 
+def get_existing_emails_and_phones_query(emails: set[str], phones: set[str]):
+    """Which of the emails and phones are taken, as (field, value) rows"""
+    return select(
+        literal("email").label("field"),
+        models.UserModel.email.label("value"),
+    ).where(models.UserModel.email.in_(emails)).union_all(
+        select(
+            literal("phone"),
+            models.UserAdditionalDetailModel.phone,
+        ).where(models.UserAdditionalDetailModel.phone.in_(phones))
+    )
+
+
+def insert_users_query():
+    # Emails taken since they were checked are not returned
+    return (
+        insert(models.UserModel)
+        .on_conflict_do_nothing(index_elements=[models.UserModel.email])
+        .returning(models.UserModel.id, models.UserModel.email)
+    )
+
+
+def insert_user_additional_details_query():
+    # Phone numbers taken since they were checked are not returned
+    return (
+        insert(models.UserAdditionalDetailModel)
+        .on_conflict_do_nothing(
+            index_elements=[models.UserAdditionalDetailModel.phone]
+        )
+        .returning(models.UserAdditionalDetailModel.user_id)
+    )
+
+
+async def import_users(
+    users: dict[int, UserImportClass], db: AsyncSession
+) -> list[dict]:
+    """Create many users at once, and report on every one of them.
+
+    Users are keyed by their index in the import. An email or phone used
+    by an earlier user of the import, or by an existing user, rejects the
+    user, all existing ones are found with a single query. Only the
+    passwords of the remaining users are hashed, across worker processes,
+    then users and their additional details are inserted a batch at a
+    time, in a single transaction. Emails and phones claimed by someone
+    else while hashing reject their user as well, instead of the import.
+    """
+    rows = []
+
+    users_to_create = {}
+    seen = set()
+    for index, user in users.items():
+        phone = user.additional_details and user.additional_details.phone
+
+        if ("email", user.email) in seen:
+            rows.append(
+                {
+                    "index": index,
+                    "email": user.email,
+                    "detail": "User is already part of the import",
+                }
+            )
+            continue
+        if phone and ("phone", phone) in seen:
+            rows.append(
+                {
+                    "index": index,
+                    "email": user.email,
+                    "detail": "Phone number is already part of the import",
+                }
+            )
+            continue
+
+        seen.add(("email", user.email))
+        if phone:
+            seen.add(("phone", phone))
+        users_to_create[index] = user
+
+    result = await db.execute(
+        get_existing_emails_and_phones_query(
+            emails={user.email for user in users_to_create.values()},
+            phones={
+                user.additional_details.phone
+                for user in users_to_create.values()
+                if user.additional_details and user.additional_details.phone
+            },
+        )
+    )
+    existing = set(result.tuples().all())
+    # Nothing is written yet, the connection goes back to the pool instead
+    # of idling in a transaction while the passwords are hashed
+    await db.rollback()
+
+    users_to_hash = []
+    for index, user in users_to_create.items():
+        phone = user.additional_details and user.additional_details.phone
+
+        detail = None
+        if ("email", user.email) in existing:
+            detail = "User already exists"
+        elif phone and ("phone", phone) in existing:
+            detail = "This phone number is already in use"
+
+        if detail:
+            rows.append(
+                {"index": index, "email": user.email, "detail": detail}
+            )
+            continue
+
+        users_to_hash.append((index, user))
+
+    password_hashes = await password_process_pool.hash_many(
+        passwords=[user.password for _, user in users_to_hash]
+    )
+    users_to_insert = [
+        (index, user, password_hash)
+        for (index, user), password_hash in zip(users_to_hash, password_hashes)
+    ]
+
+    batch_rows = IMPORT_USERS_BATCH_ROWS
+    for batch_start in range(0, len(users_to_insert), batch_rows):
+        batch = users_to_insert[batch_start : batch_start + batch_rows]
+
+        result = await db.execute(
+            insert_users_query(),
+            [
+                {
+                    "full_name": user.full_name,
+                    "email": user.email,
+                    "password": password_hash,
+                    "is_admin": user.is_admin,
+                    "is_student": user.is_student,
+                }
+                for _, user, password_hash in batch
+            ],
+        )
+        user_ids = {email: user_id for user_id, email in result.all()}
+
+        # Like create_user, every academic user gets additional details
+        user_additional_details = [
+            {
+                "user_id": user_ids[user.email],
+                "phone": user.additional_details.phone,
+                "department": user.additional_details.department,
+                "designation": user.additional_details.designation,
+            }
+            if user.additional_details
+            else {
+                "user_id": user_ids[user.email],
+                "phone": None,
+                "department": None,
+                "designation": None,
+            }
+            for _, user, _ in batch
+            if not user.is_admin and user.email in user_ids
+        ]
+        user_ids_with_additional_details = set()
+        if user_additional_details:
+            result = await db.execute(
+                insert_user_additional_details_query(),
+                user_additional_details,
+            )
+            user_ids_with_additional_details = set(result.scalars().all())
+
+        user_ids_to_delete = []
+        for index, user, _ in batch:
+            user_id = user_ids.get(user.email)
+
+            if user_id is None:
+                rows.append(
+                    {
+                        "index": index,
+                        "email": user.email,
+                        "detail": "User already exists",
+                    }
+                )
+            elif (
+                not user.is_admin
+                and user_id not in user_ids_with_additional_details
+            ):
+                user_ids_to_delete.append(user_id)
+                rows.append(
+                    {
+                        "index": index,
+                        "email": user.email,
+                        "detail": "This phone number is already in use",
+                    }
+                )
+            else:
+                rows.append(
+                    {"index": index, "email": user.email, "id": user_id}
+                )
+
+        # Users whose phone number was taken in the meantime
+        if user_ids_to_delete:
+            await db.execute(
+                delete(models.UserModel).where(
+                    models.UserModel.id.in_(user_ids_to_delete)
+                )
+            )
+
+    await db.commit()
+
+    return rows
+
+
 async def create_user(user: UserCreateClass, db: AsyncSession):
-    user.password = get_password_hash(user.password)
+    user.password = await password_pool.hash(password=user.password)
 
     db_user = models.UserModel(**user.__dict__)
 
@@ -76,6 +299,8 @@ async def create_user(user: UserCreateClass, db: AsyncSession):
 async def update_user(
     user: UserUpdateClass, db_user: models.UserModel, db: AsyncSession
 ):
+    previous_email = db_user.email
+
     db_user.update(user)
 
     if db_user.additional_details:
@@ -88,22 +313,39 @@ async def update_user(
 
     await db.commit()
 
+    await user_cache.invalidate(previous_email, user.email)
+
 
 async def update_user_password(
     new_password: UserPasswordUpdateClass,
     db_user: models.UserModel,
     db: AsyncSession,
 ):
-    new_password.new_password = get_password_hash(
+    new_password.new_password = await password_pool.hash(
         password=new_password.new_password
     )
     db_user.update_password(new_password=new_password.new_password)
+    # Revokes every token issued with the previous password
+    db_user.token_version += 1
+    user_id, email, token_version = (
+        db_user.id,
+        db_user.email,
+        db_user.token_version,
+    )
 
     await db.commit()
 
+    token_versions.set(user_id=user_id, token_version=token_version)
+    await user_cache.invalidate(email)
+
 
 async def delete_user(db_user: models.UserModel, db: AsyncSession):
+    user_id, email = db_user.id, db_user.email
+
     await db.delete(db_user)
     # UserAssociationDetails is on cascade, it will be deleted automatically
 
     await db.commit()
+
+    token_versions.discard(user_id=user_id)
+    await user_cache.invalidate(email)
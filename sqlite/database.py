@@ -62,6 +62,9 @@ sessionmanager = DatabaseSessionManager(
     secret.DATABASE_URL,
     {
         "echo": False,
+        "pool_size": secret.DATABASE_POOL_SIZE,
+        "max_overflow": secret.DATABASE_MAX_OVERFLOW,
+        "pool_timeout": secret.DATABASE_POOL_TIMEOUT_IN_SECONDS,
     },
 )
 
@@ -33,3 +33,28 @@ class DaysEnum(str, enum.Enum):
 class AttendanceEnum(str, enum.Enum):
     PRESENT = "present"
     LATE = "late"
+
+
+class ScheduleEventEnum(str, enum.Enum):
+    CREATED = "created"
+    UPDATED = "updated"
+    DELETED = "deleted"
+
+
+class AttendanceTrackingStorageEnum(str, enum.Enum):
+    # A row per ping in attendance tracking, plus the summary bitmap
+    ROWS = "rows"
+    # Only the summary bitmap, one bit per ping interval of the class
+    BITMAP = "bitmap"
+
+
+class AttendanceTrackingRetentionEnum(str, enum.Enum):
+    # Expired partitions become standalone tables, to be archived or dropped
+    DETACH = "detach"
+    DROP = "drop"
+
+
+class UserRoleEnum(str, enum.Enum):
+    ADMIN = "admin"
+    TEACHER = "teacher"
+    STUDENT = "student"
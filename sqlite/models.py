@@ -3,8 +3,16 @@ from typing import Optional
 from datetime import datetime, time, timezone
 from datetime import date as dtdate
 
-from sqlalchemy import DateTime, Enum, ForeignKey, UniqueConstraint
+from sqlalchemy import (
+    DateTime,
+    Enum,
+    ForeignKey,
+    Index,
+    UniqueConstraint,
+    text,
+)
 
+from sqlalchemy.dialects.postgresql import BIT
 from sqlalchemy.orm import relationship, mapped_column, Mapped
 
 from sqlite.database import Base
@@ -21,6 +29,8 @@ from sqlite.enums import (
     DesignationsEnum,
     DaysEnum,
     AttendanceEnum,
+    ScheduleEventEnum,
+    UserRoleEnum,
 )
 
 
@@ -51,6 +61,10 @@ class UserModel(TimestampBaseModel):
     password: Mapped[str]
     is_admin: Mapped[bool] = mapped_column(default=False)
     is_student: Mapped[bool] = mapped_column(default=False)
+    # Part of every access token, bumping it revokes the user's tokens
+    token_version: Mapped[int] = mapped_column(
+        default=0, server_default=text("0")
+    )
 
     # Define the one-to-one relationship with UserAdditionalDetailModel
     additional_details = relationship(
@@ -73,6 +87,16 @@ class UserModel(TimestampBaseModel):
     def update_password(self, new_password: str, **kwargs):
         self.password = new_password
 
+    @property
+    def role(self) -> UserRoleEnum:
+        if self.is_admin:
+            return UserRoleEnum.ADMIN
+
+        if self.is_student:
+            return UserRoleEnum.STUDENT
+
+        return UserRoleEnum.TEACHER
+
 
 class UserAdditionalDetailModel(Base):
     __tablename__ = "user_additional_details"
@@ -185,6 +209,12 @@ class ScheduleModel(TimestampBaseModel):
     start_time_in_utc: Mapped[time]
     end_time_in_utc: Mapped[time]
 
+    # High-water mark of the materializer, instances exist up to this date
+    # Null for new or edited schedules that still need to be materialized
+    instances_materialized_until: Mapped[Optional[dtdate]] = mapped_column(
+        default=None
+    )
+
     def update_reoccurring(
         self, schedule: ScheduleReoccurringUpdateClass, **kwargs
     ):
@@ -205,10 +235,48 @@ class ScheduleModel(TimestampBaseModel):
         self.end_time_in_utc = schedule.end_time_in_utc
 
 
+# Outbox of schedule changes, written in the same transaction as the change
+# and consumed by the worker to rebuild upcoming schedule instances
+class ScheduleEventModel(TimestampCreateOnlyBaseModel):
+    __tablename__ = "schedule_events"
+    __table_args__ = (
+        Index(
+            "ix_schedule_events_unprocessed",
+            "id",
+            postgresql_where=text("processed_at_in_utc IS NULL"),
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+
+    # Not a foreign key, events outlive deleted schedules
+    schedule_id: Mapped[int]
+
+    event_type: Mapped[ScheduleEventEnum] = mapped_column(
+        Enum(
+            ScheduleEventEnum,
+            name="schedule_event_type",
+            validate_strings=True,
+        ),
+    )
+
+    processed_at_in_utc: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), default=None
+    )
+
+
 # Bridge table for many-to-many relationship
 # between ScheduleInstanceModel and UserModel
 class ScheduleInstanceUserModel(Base):
     __tablename__ = "schedule_instance_users"
+    __table_args__ = (
+        # Membership checks of a user in a schedule instance
+        Index(
+            "ix_schedule_instance_users_schedule_instance_user",
+            "schedule_instance_id",
+            "user_id",
+        ),
+    )
 
     user_id: Mapped[int] = mapped_column(
         ForeignKey("users.id"), primary_key=True
@@ -222,6 +290,17 @@ class ScheduleInstanceUserModel(Base):
 # ScheduleInstance (Class)
 class ScheduleInstanceModel(TimestampBaseModel):
     __tablename__ = "schedule_instances"
+    __table_args__ = (
+        # Natural key, a schedule can only have one instance per time slot
+        Index(
+            "ix_schedule_instances_natural_key",
+            "schedule_id",
+            "date",
+            "start_time_in_utc",
+            "end_time_in_utc",
+            unique=True,
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
 
@@ -272,9 +351,15 @@ class ScheduleInstanceModel(TimestampBaseModel):
     start_time_in_utc: Mapped[time]
     end_time_in_utc: Mapped[time]
 
+    # Teacher and location were set by hand, schedule changes leave them be
+    is_edited: Mapped[bool] = mapped_column(
+        default=False, server_default=text("false")
+    )
+
     def update(self, schedule_instance: ScheduleInstanceUpdateClass, **kwargs):
         self.teacher_id = schedule_instance.teacher_id
         self.location_id = schedule_instance.location_id
+        self.is_edited = True
 
 
 class AttendanceModel(TimestampCreateOnlyBaseModel):
@@ -324,10 +409,24 @@ class TemporaryModel(Base):
         self.status = False if self.status else True
 
 
+# Range partitioned by month on created_at_in_utc, the partitions are created
+# ahead of time and retired by the manage_attendance_tracking_partitions job
 class AttendanceTrackingModel(Base):
     __tablename__ = "attendance_tracking"
+    __table_args__ = (
+        # Covers the per user summary of a schedule instance
+        Index(
+            "ix_attendance_tracking_schedule_instance_user",
+            "schedule_instance_id",
+            "user_id",
+            "created_at_in_utc",
+        ),
+        {"postgresql_partition_by": "RANGE (created_at_in_utc)"},
+    )
 
-    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(
+        primary_key=True, autoincrement=True, index=True
+    )
 
     user_id: Mapped[int] = mapped_column(
         ForeignKey("users.id"),
@@ -352,6 +451,31 @@ class AttendanceTrackingModel(Base):
         cascade="none",
     )
 
-    created_at_in_utc: Mapped[Optional[datetime]] = mapped_column(
-        DateTime(timezone=True),
+    # Part of the primary key, as it is the partition key
+    created_at_in_utc: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), primary_key=True
+    )
+
+
+# Rollup of attendance tracking per academic user of a schedule instance,
+# kept up to date by every ping so summaries do not scan the raw pings
+class AttendanceTrackingSummaryModel(Base):
+    __tablename__ = "attendance_tracking_summaries"
+
+    schedule_instance_id: Mapped[int] = mapped_column(
+        ForeignKey("schedule_instances.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id"), primary_key=True
+    )
+
+    ping_count: Mapped[int]
+    first_seen_at_in_utc: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True)
+    )
+    last_seen_at_in_utc: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True)
     )
+    # Bit i is set once a ping arrived in the i-th ping interval of the class
+    presence_slots: Mapped[Optional[str]] = mapped_column(BIT(varying=True))
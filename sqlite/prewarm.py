@@ -0,0 +1,228 @@
+import asyncio
+import itertools
+import logging
+
+from datetime import datetime, time, timedelta, timezone
+from time import perf_counter
+
+from sqlalchemy import select, func
+
+from secret import secret
+
+from sqlite import models
+from sqlite.database import sessionmanager
+from sqlite.schedule_instance_cache import schedule_instance_cache
+from sqlite.crud.attendance import (
+    get_attendance_by_schedule_instance_id_and_user_id,
+)
+from sqlite.crud.schedule_instances import (
+    get_schedule_instance_window_for_user,
+)
+
+from utils.metrics import metrics
+
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on any sleep, so instances created in the meantime are seen
+MAX_SLEEP_IN_SECONDS = 600.0
+# Rounds of concurrent warmers, each one picks up connections missed before
+PREWARM_ROUNDS = 3
+PREWARMED_CONNECTION_ID_KEY = "surge_prewarmed_connection_id"
+
+
+class SurgePrewarmer:
+    """Gets the API ready a little before classes start
+
+    `lead_time_in_seconds` before the next start time of today's classes,
+    the classes starting then are loaded into the schedule instance cache,
+    and up to `connections` pooled connections are opened at the same time.
+    Each of them runs the queries marking runs, so asyncpg has them prepared
+    on every connection once the cohort arrives. Keep `connections` below
+    the pool size, so live traffic always has connections left.
+    """
+
+    def __init__(self, lead_time_in_seconds: float, connections: int):
+        self.lead_time_in_seconds = lead_time_in_seconds
+        self.connections = connections
+
+        self._task: asyncio.Task | None = None
+        self._connection_ids = itertools.count()
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None
+
+    async def start(self):
+        if self._task is not None:
+            return
+
+        self._task = asyncio.create_task(self._run(), name="surge_prewarmer")
+
+    async def stop(self):
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+
+        self._task = None
+
+    async def prewarm(self, schedule_instance_ids: set[int]):
+        started_at = perf_counter()
+
+        if schedule_instance_cache.is_running:
+            async with sessionmanager.session() as db:
+                await schedule_instance_cache.refresh(
+                    schedule_instance_ids=schedule_instance_ids, db=db
+                )
+
+        # Warmed connections are told apart by a marker in their info, which
+        # stays with the pooled connection across checkouts
+        schedule_instance_id = min(schedule_instance_ids)
+        warmed_connection_ids = set()
+
+        async def warm_connection():
+            async with sessionmanager.session() as db:
+                connection = await db.connection()
+                connection_id = connection.info.setdefault(
+                    PREWARMED_CONNECTION_ID_KEY, next(self._connection_ids)
+                )
+                if connection_id not in warmed_connection_ids:
+                    # The user id matches nobody, only the statements are
+                    # of interest
+                    await get_schedule_instance_window_for_user(
+                        schedule_instance_id=schedule_instance_id,
+                        user_id=0,
+                        db=db,
+                    )
+                    await get_attendance_by_schedule_instance_id_and_user_id(
+                        schedule_instance_id=schedule_instance_id,
+                        user_id=0,
+                        db=db,
+                    )
+                    warmed_connection_ids.add(connection_id)
+
+        # Connections go back to the pool right after their queries, the
+        # warmers of a round only overlap so the pool opens new ones. A
+        # warmer that can not get a connection is tried again next round.
+        async def warm_connections():
+            for _ in range(PREWARM_ROUNDS):
+                missing_count = self.connections - len(warmed_connection_ids)
+                if missing_count <= 0:
+                    break
+
+                await asyncio.gather(
+                    *[warm_connection() for _ in range(missing_count)],
+                    return_exceptions=True,
+                )
+
+        try:
+            await asyncio.wait_for(
+                warm_connections(), timeout=self.lead_time_in_seconds
+            )
+        except asyncio.TimeoutError:
+            pass
+
+        warmed_count = len(warmed_connection_ids)
+        if warmed_count < self.connections:
+            logger.warning(
+                "Only warmed %s of %s connections",
+                warmed_count,
+                self.connections,
+            )
+
+        metrics.increment("surge.prewarmed")
+        metrics.observe("surge.prewarm_seconds", perf_counter() - started_at)
+        logger.info(
+            "Prewarmed %s connections for %s schedule instances",
+            warmed_count,
+            len(schedule_instance_ids),
+        )
+
+    async def _get_next_schedule_instances(
+        self, now: datetime
+    ) -> tuple[datetime | None, set[int]]:
+        """Start of the next classes of today, and their ids"""
+        async with sessionmanager.session() as db:
+            start_time_in_utc = await db.scalar(
+                select(
+                    func.min(models.ScheduleInstanceModel.start_time_in_utc)
+                ).where(
+                    models.ScheduleInstanceModel.date == now.date(),
+                    models.ScheduleInstanceModel.start_time_in_utc
+                    > now.time(),
+                )
+            )
+            if start_time_in_utc is None:
+                return None, set()
+
+            result = await db.execute(
+                select(models.ScheduleInstanceModel.id).where(
+                    models.ScheduleInstanceModel.date == now.date(),
+                    models.ScheduleInstanceModel.start_time_in_utc
+                    == start_time_in_utc,
+                )
+            )
+            schedule_instance_ids = set(result.scalars().all())
+
+        return (
+            datetime.combine(
+                now.date(), start_time_in_utc, tzinfo=timezone.utc
+            ),
+            schedule_instance_ids,
+        )
+
+    async def _run(self):
+        while True:
+            now = datetime.now(tz=timezone.utc)
+            next_midnight = datetime.combine(
+                now.date() + timedelta(days=1), time(0, 0), tzinfo=timezone.utc
+            )
+
+            try:
+                start, schedule_instance_ids = (
+                    await self._get_next_schedule_instances(now=now)
+                )
+            except Exception:
+                logger.exception("Could not load the next schedule instances")
+                start, schedule_instance_ids = None, set()
+
+            if start is None:
+                await asyncio.sleep(
+                    min(
+                        (next_midnight - now).total_seconds(),
+                        MAX_SLEEP_IN_SECONDS,
+                    )
+                )
+                continue
+
+            prewarm_at = start - timedelta(seconds=self.lead_time_in_seconds)
+            if prewarm_at > now:
+                await asyncio.sleep(
+                    min(
+                        (prewarm_at - now).total_seconds(),
+                        MAX_SLEEP_IN_SECONDS,
+                    )
+                )
+                continue
+
+            try:
+                await self.prewarm(schedule_instance_ids=schedule_instance_ids)
+            except Exception:
+                logger.exception("Could not prewarm for %s", start)
+
+            # Once these classes have started, look for the next ones
+            await asyncio.sleep(
+                max(
+                    (start - datetime.now(tz=timezone.utc)).total_seconds(), 0
+                )
+                + 1
+            )
+
+
+surge_prewarmer = SurgePrewarmer(
+    lead_time_in_seconds=secret.SURGE_PREWARM_LEAD_TIME_IN_SECONDS,
+    # Half of the pool, the rest is left to requests during the warm-up
+    connections=max(secret.DATABASE_POOL_SIZE // 2, 1),
+)
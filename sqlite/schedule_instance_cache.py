@@ -0,0 +1,231 @@
+import asyncio
+import logging
+
+from datetime import datetime, date, time, timedelta, timezone
+from typing import NamedTuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from secret import secret
+
+from sqlite import models
+from sqlite.database import sessionmanager
+from sqlite.crud.schedule_instances import (
+    get_schedule_instance_windows_by_date_query,
+    get_schedule_instance_user_ids_query,
+)
+
+from utils.metrics import metrics
+
+
+logger = logging.getLogger(__name__)
+
+
+class ScheduleInstanceWindow(NamedTuple):
+    """Same fields as a row of get_schedule_instance_windows_for_user_query"""
+
+    id: int
+    date: date
+    start_time_in_utc: time
+    end_time_in_utc: time
+    is_academic_user: bool
+
+
+class ScheduleInstanceCache:
+    """Process-local copy of today's schedule instance windows and rosters
+
+    Marking validates against these instead of Postgres. The cache is
+    loaded in full on start, at every UTC midnight, every
+    `refresh_interval_in_seconds` and whenever `refresh_soon` is called,
+    which picks up changes made by other processes. Changes made by this
+    process are applied right away with `refresh`.
+
+    At most `max_size` instances are kept, the ones starting soonest.
+    Anything that is not cached is a miss, and is read from Postgres.
+    """
+
+    def __init__(self, max_size: int, refresh_interval_in_seconds: float):
+        self.max_size = max_size
+        self.refresh_interval_in_seconds = refresh_interval_in_seconds
+
+        self.date: date | None = None
+        self._windows: dict[int, tuple[date, time, time]] = {}
+        self._user_ids: dict[int, frozenset[int]] = {}
+        self._refresh_event: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None
+
+    async def start(self):
+        if self._task is not None:
+            return
+
+        self._refresh_event = asyncio.Event()
+        # Warm before serving requests, later loads happen in the background
+        await self.load()
+        self._task = asyncio.create_task(
+            self._run(), name="schedule_instance_cache"
+        )
+
+    async def stop(self):
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+
+        self._task = None
+        self._refresh_event = None
+        self.date = None
+        self._windows = {}
+        self._user_ids = {}
+
+    def get(
+        self, schedule_instance_id: int, user_id: int
+    ) -> ScheduleInstanceWindow | None:
+        """Window of a cached instance and whether the user belongs to it"""
+        window = self._windows.get(schedule_instance_id)
+        if window is None:
+            metrics.increment("schedule_instance_cache.misses")
+            return None
+
+        metrics.increment("schedule_instance_cache.hits")
+        return ScheduleInstanceWindow(
+            schedule_instance_id,
+            *window,
+            user_id in self._user_ids[schedule_instance_id],
+        )
+
+    def refresh_soon(self):
+        """Reload everything in the background, without waiting for it"""
+        if self._refresh_event is not None:
+            self._refresh_event.set()
+
+    async def load(self):
+        """Replace the cache with today's instances"""
+        today = datetime.now(tz=timezone.utc).date()
+
+        async with sessionmanager.session() as db:
+            result = await db.execute(
+                get_schedule_instance_windows_by_date_query(
+                    date=today, limit=self.max_size
+                )
+            )
+            windows = {
+                schedule_instance.id: (
+                    schedule_instance.date,
+                    schedule_instance.start_time_in_utc,
+                    schedule_instance.end_time_in_utc,
+                )
+                for schedule_instance in result.all()
+            }
+            user_ids = await self._load_user_ids(
+                schedule_instance_ids=set(windows), db=db
+            )
+
+        # Swapped at once, so a lookup never sees half of a load
+        self.date, self._windows, self._user_ids = today, windows, user_ids
+        metrics.set_last(
+            "schedule_instance_cache",
+            {"date": today.isoformat(), "size": len(windows)},
+        )
+
+    async def refresh(self, schedule_instance_ids: set[int], db: AsyncSession):
+        """Reload the given instances after this process changed them"""
+        if not self.is_running or not schedule_instance_ids:
+            return
+
+        result = await db.execute(
+            select(
+                models.ScheduleInstanceModel.id,
+                models.ScheduleInstanceModel.date,
+                models.ScheduleInstanceModel.start_time_in_utc,
+                models.ScheduleInstanceModel.end_time_in_utc,
+            ).where(models.ScheduleInstanceModel.id.in_(schedule_instance_ids))
+        )
+        windows = {
+            schedule_instance.id: (
+                schedule_instance.date,
+                schedule_instance.start_time_in_utc,
+                schedule_instance.end_time_in_utc,
+            )
+            for schedule_instance in result.all()
+            if schedule_instance.date == self.date
+        }
+        user_ids = await self._load_user_ids(
+            schedule_instance_ids=set(windows), db=db
+        )
+
+        for schedule_instance_id in schedule_instance_ids:
+            if schedule_instance_id not in windows:
+                self._windows.pop(schedule_instance_id, None)
+                self._user_ids.pop(schedule_instance_id, None)
+                continue
+
+            if (
+                schedule_instance_id not in self._windows
+                and len(self._windows) >= self.max_size
+            ):
+                continue
+
+            self._user_ids[schedule_instance_id] = user_ids[
+                schedule_instance_id
+            ]
+            self._windows[schedule_instance_id] = windows[schedule_instance_id]
+
+    async def _load_user_ids(
+        self, schedule_instance_ids: set[int], db: AsyncSession
+    ) -> dict[int, frozenset[int]]:
+        user_ids = {
+            schedule_instance_id: set()
+            for schedule_instance_id in schedule_instance_ids
+        }
+        if schedule_instance_ids:
+            result = await db.execute(
+                get_schedule_instance_user_ids_query(
+                    schedule_instance_ids=schedule_instance_ids
+                )
+            )
+            for schedule_instance_id, user_id in result.all():
+                user_ids[schedule_instance_id].add(user_id)
+
+        return {
+            schedule_instance_id: frozenset(schedule_instance_user_ids)
+            for schedule_instance_id, schedule_instance_user_ids in (
+                user_ids.items()
+            )
+        }
+
+    async def _run(self):
+        while True:
+            now = datetime.now(tz=timezone.utc)
+            next_midnight = datetime.combine(
+                now.date() + timedelta(days=1), time(0, 0), tzinfo=timezone.utc
+            )
+            timeout = min(
+                self.refresh_interval_in_seconds,
+                (next_midnight - now).total_seconds(),
+            )
+
+            try:
+                await asyncio.wait_for(self._refresh_event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._refresh_event.clear()
+
+            try:
+                await self.load()
+            except Exception:
+                # Keep serving what is cached, the next load may succeed
+                logger.exception("Could not load the schedule instance cache")
+
+
+schedule_instance_cache = ScheduleInstanceCache(
+    max_size=secret.SCHEDULE_INSTANCE_CACHE_MAX_SIZE,
+    refresh_interval_in_seconds=(
+        secret.SCHEDULE_INSTANCE_CACHE_REFRESH_INTERVAL_IN_SECONDS
+    ),
+)
@@ -9,6 +9,7 @@ from sqlite.enums import (
     DesignationsEnum,
     DaysEnum,
     AttendanceEnum,
+    UserRoleEnum,
 )
 
 from utils.date_utils import (
@@ -21,6 +22,14 @@ from utils.date_utils import (
 from constants import time_constants
 
 
+# A 3 hour class pinged every 30 seconds, with room to spare
+MAX_ATTENDANCE_TRACKING_PINGS_PER_BATCH = 1000
+# A term's intake of students at once
+MAX_USERS_PER_IMPORT = 10000
+# A whole timetable at once
+MAX_SCHEDULES_PER_IMPORT = 2000
+
+
 def replace_empty_strings_with_null(cls, value):
     if isinstance(value, str):
         if value == "string" or value.strip() == "":
@@ -35,7 +44,20 @@ class Token(BaseModel):
 
 
 class TokenData(BaseModel):
-    email: str | None = None
+    """Claims of a verified access token, enough to authorize a request"""
+
+    id: int
+    email: str
+    role: UserRoleEnum
+    token_version: int
+
+    @property
+    def is_admin(self) -> bool:
+        return self.role == UserRoleEnum.ADMIN
+
+    @property
+    def is_student(self) -> bool:
+        return self.role == UserRoleEnum.STUDENT
 
 
 class CommonResponseClass(BaseModel):
@@ -85,6 +107,53 @@ class UserCreateClass(UserBaseClass):
     is_student: bool = False
 
 
+class UserImportClass(UserCreateClass):
+    additional_details: UserAdditionalDetailCreateOrUpdateClass | None = None
+
+    @model_validator(mode="after")
+    def check_is_not_admin_and_student(self) -> "UserImportClass":
+        if self.is_admin and self.is_student:
+            raise ValueError("Can not be admin and student at the same time")
+
+        if self.is_admin and self.additional_details is not None:
+            raise ValueError(
+                "Admins do not need to specify additional details"
+            )
+
+        return self
+
+
+class UserImportBatchCreateClass(BaseModel):
+    users: list[UserImportClass]
+
+    @field_validator("users")
+    @classmethod
+    def users_validator(
+        cls, v: list[UserImportClass]
+    ) -> list[UserImportClass]:
+        if not v:
+            raise ValueError("must contain at least one user")
+        if len(v) > MAX_USERS_PER_IMPORT:
+            raise ValueError(
+                f"must not contain more than {MAX_USERS_PER_IMPORT} users"
+            )
+        return v
+
+
+class UserImportRow(BaseModel):
+    index: int
+    email: str | None
+    # Only set once the user is created
+    id: int | None = None
+    detail: str | None = None
+
+
+class UserImportResult(BaseModel):
+    created_count: int
+    rejected_count: int
+    rows: list[UserImportRow]
+
+
 class UserUpdateClass(UserBaseClass):
     additional_details: UserAdditionalDetailCreateOrUpdateClass | None
 
@@ -232,6 +301,65 @@ class ScheduleNonReoccurringSearchClass(ScheduleSearchBaseClass):
     date: date
 
 
+# Schedule Import
+class ScheduleImportClass(BaseModel):
+    """A schedule of a timetable, users and locations by unique fields
+
+    Reoccurring on `day`, or else once on `date`.
+    """
+
+    title: str
+    teacher_email: str
+    location_title: str
+    start_time_in_utc: time
+    end_time_in_utc: time
+    student_emails: list[str] = []
+    day: DaysEnum | None = None
+    date: date | None = None
+
+    @field_validator("student_emails", mode="before")
+    @classmethod
+    def student_emails_validator(cls, v):
+        # A CSV cell holds all of them, separated by spaces or semicolons
+        if isinstance(v, str):
+            return [
+                student_email
+                for student_email in re.split(r"[\s;]+", v)
+                if student_email
+            ]
+        return v
+
+    @model_validator(mode="after")
+    def check_is_either_reoccurring_or_not(self) -> "ScheduleImportClass":
+        if (self.day is None) == (self.date is None):
+            raise ValueError("Either day or date should be specified")
+
+        return self
+
+
+class ScheduleImportBatchCreateClass(BaseModel):
+    schedules: list[ScheduleImportClass]
+
+    @field_validator("schedules")
+    @classmethod
+    def schedules_validator(
+        cls, v: list[ScheduleImportClass]
+    ) -> list[ScheduleImportClass]:
+        if not v:
+            raise ValueError("must contain at least one schedule")
+        if len(v) > MAX_SCHEDULES_PER_IMPORT:
+            raise ValueError(
+                "must not contain more than "
+                + f"{MAX_SCHEDULES_PER_IMPORT} schedules"
+            )
+        return v
+
+
+class ScheduleImportResult(BaseModel):
+    created_count: int
+    schedule_ids: list[int]
+
+
 # Schedule Instance / Class
 class ScheduleInstanceBaseClass(BaseModel):
     pass
@@ -292,6 +420,17 @@ class Attendance(AttendanceBaseClass):
     )
 
 
+class AttendanceMinimal(AttendanceBaseClass):
+    model_config = ConfigDict(
+        json_encoders={datetime: convert_datetime_to_iso_8601_with_z_suffix},
+    )
+
+    id: int
+    schedule_instance_id: int
+    attendance_status: AttendanceEnum
+    created_at_in_utc: datetime
+
+
 # Attendance Result
 class AttendanceResult(AttendanceBaseClass):
     model_config = ConfigDict(
@@ -342,6 +481,53 @@ class AttendanceTrackingCreateClass(AttendanceBaseClass):
     schedule_instance_id: int
 
 
+class AttendanceTrackingPingClass(AttendanceTrackingBaseClass):
+    schedule_instance_id: int
+    # Set by clients that buffered the ping while offline
+    created_at_in_utc: datetime | None = None
+
+
+class AttendanceTrackingBatchCreateClass(AttendanceTrackingBaseClass):
+    pings: list[AttendanceTrackingPingClass]
+
+    @field_validator("pings")
+    @classmethod
+    def pings_validator(
+        cls, v: list[AttendanceTrackingPingClass]
+    ) -> list[AttendanceTrackingPingClass]:
+        if not v:
+            raise ValueError("must contain at least one ping")
+        if len(v) > MAX_ATTENDANCE_TRACKING_PINGS_PER_BATCH:
+            raise ValueError(
+                "must not contain more than "
+                + f"{MAX_ATTENDANCE_TRACKING_PINGS_PER_BATCH} pings"
+            )
+        return v
+
+
+class AttendanceTrackingRejectedPing(AttendanceTrackingBaseClass):
+    index: int
+    schedule_instance_id: int
+    detail: str
+
+
+class AttendanceTrackingBatchResult(AttendanceTrackingBaseClass):
+    accepted_count: int
+    rejected: list[AttendanceTrackingRejectedPing]
+
+
+class AttendanceTrackingMinimal(AttendanceTrackingBaseClass):
+    model_config = ConfigDict(
+        json_encoders={datetime: convert_datetime_to_iso_8601_with_z_suffix},
+    )
+
+    # Not known yet while the ping is queued by the write-behind buffer
+    id: int | None = None
+    schedule_instance_id: int
+    status: str
+    created_at_in_utc: datetime
+
+
 class AttendanceTracking(AttendanceTrackingBaseClass):
     model_config = ConfigDict(
         from_attributes=True,
@@ -0,0 +1,111 @@
+import asyncio
+import logging
+
+from sqlalchemy import select
+
+from secret import secret
+
+from sqlite import models
+from sqlite.database import sessionmanager
+
+from utils.metrics import metrics
+
+
+logger = logging.getLogger(__name__)
+
+
+class TokenVersions:
+    """Process-local map of every user id to its current token version
+
+    Access tokens carry the version their user had when they were issued,
+    and are revoked by bumping it. Checking a token is a dictionary lookup
+    instead of a query. The map is loaded in full on start and every
+    `refresh_interval_in_seconds`, which picks up bumps made by other
+    processes. Bumps made by this process are applied right away.
+
+    A user that is not in the map, created since the last load, is read
+    from Postgres on its own. Without `start`, every lookup is.
+    """
+
+    def __init__(self, refresh_interval_in_seconds: float):
+        self.refresh_interval_in_seconds = refresh_interval_in_seconds
+
+        self._versions: dict[int, int] = {}
+        self._task: asyncio.Task | None = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None
+
+    async def start(self):
+        if self._task is not None:
+            return
+
+        # Loaded before serving requests, later loads happen in the background
+        await self.load()
+        self._task = asyncio.create_task(self._run(), name="token_versions")
+
+    async def stop(self):
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+
+        self._task = None
+        self._versions = {}
+
+    async def get(self, user_id: int) -> int | None:
+        """Current token version of the user, None if it does not exist"""
+        token_version = self._versions.get(user_id)
+        if token_version is not None:
+            metrics.increment("token_versions.hits")
+            return token_version
+
+        metrics.increment("token_versions.misses")
+        async with sessionmanager.session() as db:
+            token_version = await db.scalar(
+                select(models.UserModel.token_version).where(
+                    models.UserModel.id == user_id
+                )
+            )
+
+        if token_version is not None and self.is_running:
+            self._versions[user_id] = token_version
+
+        return token_version
+
+    def set(self, user_id: int, token_version: int):
+        if self.is_running:
+            self._versions[user_id] = token_version
+
+    def discard(self, user_id: int):
+        self._versions.pop(user_id, None)
+
+    async def load(self):
+        """Replace the map with the versions of every user"""
+        async with sessionmanager.session() as db:
+            result = await db.execute(
+                select(models.UserModel.id, models.UserModel.token_version)
+            )
+            versions = dict(result.tuples().all())
+
+        self._versions = versions
+        metrics.set_last("token_versions", {"size": len(versions)})
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval_in_seconds)
+
+            try:
+                await self.load()
+            except Exception:
+                # Keep serving what is loaded, the next load may succeed
+                logger.exception("Could not load the token versions")
+
+
+token_versions = TokenVersions(
+    refresh_interval_in_seconds=(
+        secret.TOKEN_VERSIONS_REFRESH_INTERVAL_IN_SECONDS
+    ),
+)
@@ -0,0 +1,134 @@
+import asyncio
+import logging
+
+from collections import OrderedDict
+from time import monotonic
+
+from redis import asyncio as aioredis
+
+from secret import secret
+
+from sqlite.schemas import User
+
+from utils.metrics import metrics
+
+
+logger = logging.getLogger(__name__)
+
+INVALIDATIONS_CHANNEL = "user_cache_invalidations"
+
+
+class UserCache:
+    """Snapshots of authenticated users, keyed by their token subject
+
+    Bounded to `max_size` entries, the least recently used is evicted first,
+    and every entry expires `ttl_in_seconds` after it was loaded. The users
+    crud invalidates an entry whenever it changes or deletes its user.
+
+    With a `redis_url`, invalidations are also published to every other API
+    process, and theirs are applied here. Without one, other processes only
+    see a change once their entry expires.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl_in_seconds: float,
+        redis_url: str | None = None,
+    ):
+        self.max_size = max_size
+        self.ttl_in_seconds = ttl_in_seconds
+        self.redis_url = redis_url
+
+        self._users: OrderedDict[str, tuple[float, User]] = OrderedDict()
+        self._redis: aioredis.Redis | None = None
+        self._task: asyncio.Task | None = None
+        self._is_running = False
+
+    @property
+    def is_running(self) -> bool:
+        return self._is_running
+
+    async def start(self):
+        if self._is_running:
+            return
+
+        if self.redis_url:
+            self._redis = aioredis.from_url(self.redis_url)
+            pubsub = self._redis.pubsub()
+            await pubsub.subscribe(INVALIDATIONS_CHANNEL)
+            self._task = asyncio.create_task(
+                self._listen(pubsub=pubsub), name="user_cache"
+            )
+
+        self._is_running = True
+
+    async def stop(self):
+        if not self._is_running:
+            return
+
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+        self._is_running = False
+        self._users.clear()
+
+    def get(self, subject: str) -> User | None:
+        entry = self._users.get(subject)
+        if entry is None or entry[0] <= monotonic():
+            metrics.increment("user_cache.misses")
+            return None
+
+        self._users.move_to_end(subject)
+        metrics.increment("user_cache.hits")
+        return entry[1]
+
+    def set(self, subject: str, user: User):
+        self._users[subject] = (monotonic() + self.ttl_in_seconds, user)
+        self._users.move_to_end(subject)
+
+        while len(self._users) > self.max_size:
+            self._users.popitem(last=False)
+
+    async def invalidate(self, *subjects: str):
+        """Drop the users here, and in every other process with Redis"""
+        if not self._is_running:
+            return
+
+        for subject in subjects:
+            self._users.pop(subject, None)
+
+            if self._redis is not None:
+                try:
+                    await self._redis.publish(INVALIDATIONS_CHANNEL, subject)
+                except Exception:
+                    # The other processes still drop it once it expires
+                    logger.exception("Could not publish a user invalidation")
+
+    async def _listen(self, pubsub):
+        while True:
+            try:
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self._users.pop(message["data"].decode(), None)
+            except asyncio.CancelledError:
+                await pubsub.aclose()
+                raise
+            except Exception:
+                # Entries may have missed an invalidation while disconnected
+                logger.exception("Lost the user invalidations channel")
+                self._users.clear()
+                await asyncio.sleep(1)
+
+
+user_cache = UserCache(
+    max_size=secret.USER_CACHE_MAX_SIZE,
+    ttl_in_seconds=secret.USER_CACHE_TTL_IN_SECONDS,
+    redis_url=secret.USER_CACHE_REDIS_URL,
+)
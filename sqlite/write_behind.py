@@ -0,0 +1,217 @@
+import asyncio
+import logging
+
+from time import perf_counter
+from typing import Awaitable, Callable
+
+from secret import secret
+
+from sqlite.database import sessionmanager
+from sqlite.crud.attendance_tracking import create_attendance_trackings
+
+from utils.metrics import metrics
+
+
+logger = logging.getLogger(__name__)
+
+# Returns how many of the rows were written, the rest were skipped
+FlushFunction = Callable[[list[dict]], Awaitable[int]]
+
+# How long a request waits for room in a full queue before giving up
+PUT_TIMEOUT_IN_SECONDS = 1.0
+# Tries of a whole batch, doubling the wait between them, before splitting
+FLUSH_ATTEMPTS = 3
+FLUSH_RETRY_BACKOFF_IN_SECONDS = 0.5
+
+
+class WriteBehindBufferFullError(Exception):
+    pass
+
+
+class WriteBehindBuffer:
+    """Bounded in-process queue of rows, inserted in batches in the background
+
+    Rows are flushed once `flush_rows` of them are queued, or when the oldest
+    queued row has waited `flush_interval_in_seconds`, whichever is first.
+    When the queue is full, `put` waits for the flusher to make room and
+    raises `WriteBehindBufferFullError` if it does not in time.
+
+    A batch that fails is retried with backoff, then split in halves until
+    the rows that keep failing are isolated. Only those are dropped.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        flush_func: FlushFunction,
+        max_queue_size: int,
+        flush_rows: int,
+        flush_interval_in_seconds: float,
+    ):
+        self.name = name
+        self.flush_func = flush_func
+        self.max_queue_size = max_queue_size
+        self.flush_rows = flush_rows
+        self.flush_interval_in_seconds = flush_interval_in_seconds
+
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self._is_stopping = False
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._is_stopping
+
+    @property
+    def queue_size(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self):
+        if self._task is not None:
+            return
+
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._is_stopping = False
+        self._task = asyncio.create_task(self._run(), name=self.name)
+
+    async def stop(self):
+        """Stop accepting rows and flush everything that is queued"""
+        if self._task is None:
+            return
+
+        self._is_stopping = True
+        # Wakes up the flusher, it exits once the queue is drained
+        await self._queue.put(None)
+        await self._task
+
+        self._task = None
+        self._queue = None
+
+    async def put(self, row: dict):
+        if not self.is_running:
+            raise WriteBehindBufferFullError(f"{self.name} is not running")
+
+        try:
+            self._queue.put_nowait(row)
+        except asyncio.QueueFull:
+            metrics.increment(f"write_behind.{self.name}.backpressure")
+            try:
+                await asyncio.wait_for(
+                    self._queue.put(row), timeout=PUT_TIMEOUT_IN_SECONDS
+                )
+            except asyncio.TimeoutError:
+                metrics.increment(f"write_behind.{self.name}.rejected")
+                raise WriteBehindBufferFullError(f"{self.name} is full")
+
+    async def _run(self):
+        is_stopped = False
+        while not is_stopped:
+            rows, is_stopped = await self._collect()
+            if rows:
+                await self._flush(rows=rows)
+
+        # Rows of puts that were already waiting for room when stopped
+        rows = []
+        while not self._queue.empty():
+            row = self._queue.get_nowait()
+            if row is not None:
+                rows.append(row)
+        for i in range(0, len(rows), self.flush_rows):
+            await self._flush(rows=rows[i : i + self.flush_rows])
+
+    async def _collect(self) -> tuple[list[dict], bool]:
+        """Wait for the next batch, returns it and whether to stop after it"""
+        row = await self._queue.get()
+        if row is None:
+            return [], True
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval_in_seconds
+
+        rows = [row]
+        while len(rows) < self.flush_rows:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+
+            try:
+                row = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+
+            if row is None:
+                return rows, True
+            rows.append(row)
+
+        return rows, False
+
+    async def _flush(self, rows: list[dict]):
+        started_at = perf_counter()
+        try:
+            for attempt in range(FLUSH_ATTEMPTS):
+                if attempt > 0:
+                    metrics.increment(f"write_behind.{self.name}.retried")
+                    await asyncio.sleep(
+                        FLUSH_RETRY_BACKOFF_IN_SECONDS * 2 ** (attempt - 1)
+                    )
+
+                try:
+                    await self._flush_once(rows=rows)
+                    return
+                except Exception:
+                    logger.warning(
+                        "Could not flush %s rows of %s, attempt %s of %s",
+                        len(rows),
+                        self.name,
+                        attempt + 1,
+                        FLUSH_ATTEMPTS,
+                        exc_info=True,
+                    )
+
+            await self._flush_split(rows=rows)
+        finally:
+            metrics.observe(
+                f"write_behind.{self.name}.flush_seconds",
+                perf_counter() - started_at,
+            )
+
+    async def _flush_split(self, rows: list[dict]):
+        """Flush both halves on their own, down to the rows that fail"""
+        if len(rows) == 1:
+            metrics.increment(f"write_behind.{self.name}.dropped")
+            logger.error("Dropped a row of %s: %r", self.name, rows[0])
+            return
+
+        middle = len(rows) // 2
+        for half in (rows[:middle], rows[middle:]):
+            try:
+                await self._flush_once(rows=half)
+            except Exception:
+                await self._flush_split(rows=half)
+
+    async def _flush_once(self, rows: list[dict]):
+        written_count = await self.flush_func(rows)
+
+        metrics.increment(f"write_behind.{self.name}.flushed", written_count)
+        if written_count < len(rows):
+            metrics.increment(
+                f"write_behind.{self.name}.skipped", len(rows) - written_count
+            )
+
+
+async def flush_attendance_trackings(attendance_trackings: list[dict]) -> int:
+    async with sessionmanager.session() as db:
+        return await create_attendance_trackings(
+            attendance_trackings=attendance_trackings, db=db
+        )
+
+
+attendance_tracking_buffer = WriteBehindBuffer(
+    name="attendance_tracking",
+    flush_func=flush_attendance_trackings,
+    max_queue_size=secret.ATTENDANCE_TRACKING_WRITE_BEHIND_MAX_QUEUE_SIZE,
+    flush_rows=secret.ATTENDANCE_TRACKING_WRITE_BEHIND_FLUSH_ROWS,
+    flush_interval_in_seconds=(
+        secret.ATTENDANCE_TRACKING_WRITE_BEHIND_FLUSH_INTERVAL_IN_MS / 1000
+    ),
+)
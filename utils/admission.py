@@ -0,0 +1,148 @@
+import asyncio
+import json
+
+from time import perf_counter
+
+from secret import secret
+
+from utils.metrics import metrics
+
+
+class AdmissionRejectedError(Exception):
+    pass
+
+
+class AdmissionController:
+    """Bounded concurrency with a bounded, time limited wait for a slot
+
+    At most `max_concurrency` callers hold a slot at once. Up to
+    `max_queue_size` more wait for one, for at most `timeout_in_seconds`.
+    Anyone beyond that, or waiting longer, gets `AdmissionRejectedError`.
+    A `max_concurrency` of 0 admits everyone.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int,
+        max_queue_size: int,
+        timeout_in_seconds: float,
+    ):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue_size = max_queue_size
+        self.timeout_in_seconds = timeout_in_seconds
+
+        self._semaphore = asyncio.Semaphore(max(max_concurrency, 1))
+        self._queue_size = 0
+
+    @property
+    def is_enabled(self) -> bool:
+        return self.max_concurrency > 0
+
+    async def acquire(self):
+        if not self.is_enabled:
+            return
+
+        is_queue_full = self._queue_size >= self.max_queue_size
+        if self._semaphore.locked() and is_queue_full:
+            metrics.increment(f"admission.{self.name}.rejected")
+            raise AdmissionRejectedError(f"{self.name} queue is full")
+
+        started_at = perf_counter()
+        self._queue_size += 1
+        try:
+            await asyncio.wait_for(
+                self._semaphore.acquire(), timeout=self.timeout_in_seconds
+            )
+        except asyncio.TimeoutError:
+            metrics.increment(f"admission.{self.name}.rejected")
+            raise AdmissionRejectedError(f"{self.name} timed out")
+        finally:
+            self._queue_size -= 1
+            metrics.observe(
+                f"admission.{self.name}.wait_seconds",
+                perf_counter() - started_at,
+            )
+
+        metrics.increment(f"admission.{self.name}.admitted")
+
+    def release(self):
+        if self.is_enabled:
+            self._semaphore.release()
+
+
+class AdmissionControlMiddleware:
+    """Admit POST requests under the given path prefixes one slot at a time
+
+    Runs before any dependency, so a request that has to wait does not hold
+    a database connection, and one that is rejected never opens one. The
+    slot is held until the response has been sent.
+    """
+
+    def __init__(
+        self,
+        app,
+        admission_controller: AdmissionController,
+        path_prefixes: list[str],
+        retry_after_in_seconds: int = 1,
+    ):
+        self.app = app
+        self.admission_controller = admission_controller
+        self.path_prefixes = tuple(path_prefixes)
+        self.retry_after_in_seconds = retry_after_in_seconds
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or not scope["path"].startswith(self.path_prefixes)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await self.admission_controller.acquire()
+        except AdmissionRejectedError:
+            await self._send_service_unavailable(send=send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.admission_controller.release()
+
+    async def _send_service_unavailable(self, send):
+        body = json.dumps(
+            {"detail": "Too many attendance requests, try again"}
+        ).encode()
+
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (
+                        b"retry-after",
+                        str(self.retry_after_in_seconds).encode(),
+                    ),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+
+# Marking attendance and pings, the routes every cohort hits at class start
+WRITE_ADMISSION_PATH_PREFIXES = [
+    "/academic/attendance/mark",
+    "/academic/attendance-tracking/mark",
+]
+
+write_admission_controller = AdmissionController(
+    name="writes",
+    max_concurrency=secret.WRITE_ADMISSION_MAX_CONCURRENCY,
+    max_queue_size=secret.WRITE_ADMISSION_MAX_QUEUE_SIZE,
+    timeout_in_seconds=secret.WRITE_ADMISSION_TIMEOUT_IN_MS / 1000,
+)
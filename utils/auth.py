@@ -5,53 +5,84 @@ from sqlite.dependency import get_db_session
 from sqlalchemy.orm import Session
 
 from typing import Annotated
-from jose import JWTError, jwt
+from jose import JWTError
 
-from secret import secret
+from pydantic import ValidationError
 
-from sqlite.models import UserModel
+from secret import secret
 
 import sqlite.crud.users as users
-from sqlite.schemas import TokenData
+from sqlite.schemas import TokenData, User
+from sqlite.user_cache import user_cache
+from sqlite.token_versions import token_versions
+
+from utils.jwt_tokens import access_token_cache
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 
-async def get_current_user(
-    token: Annotated[str, Depends(oauth2_scheme)],
-    db: Session = Depends(get_db_session),
-):
-    credentials_exception = HTTPException(
+def return_credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+async def get_token_data(
+    token: Annotated[str, Depends(oauth2_scheme)],
+) -> TokenData:
+    """Claims of the access token, without loading the user"""
     try:
-        payload = jwt.decode(
-            token, secret.SECRET_KEY, algorithms=[secret.ALGORITHM]
+        payload = access_token_cache.decode(
+            token=token, key=secret.SECRET_KEY, algorithm=secret.ALGORITHM
+        )
+        token_data = TokenData(
+            id=payload.get("uid"),
+            email=payload.get("sub"),
+            role=payload.get("role"),
+            token_version=payload.get("ver"),
         )
-        email: str = payload.get("sub")
+    except (JWTError, ValidationError):
+        # Tokens issued before the claims existed are refused as well
+        raise return_credentials_exception()
+
+    token_version = await token_versions.get(user_id=token_data.id)
+    if token_version != token_data.token_version:
+        raise return_credentials_exception()
 
-        if email is None:
-            raise credentials_exception
+    return token_data
+
+
+async def get_current_user(
+    token_data: Annotated[TokenData, Depends(get_token_data)],
+    db: Session = Depends(get_db_session),
+):
+    """The user of the access token, for routes that need more than claims"""
+    if user_cache.is_running:
+        user = user_cache.get(subject=token_data.email)
+        if user is not None:
+            return user
 
-        token_data = TokenData(email=email)
-    except JWTError:
-        raise credentials_exception
     user = await users.get_user_by_email(user_email=token_data.email, db=db)
 
     if user is None:
-        raise credentials_exception
+        raise return_credentials_exception()
+
+    if user_cache.is_running:
+        # A snapshot, so it can outlive this request's session
+        user = User.model_validate(user)
+        user_cache.set(subject=token_data.email, user=user)
 
     return user
 
 
 async def should_be_admin_user(
-    current_user: Annotated[UserModel, Depends(get_current_user)],
+    token_data: Annotated[TokenData, Depends(get_token_data)],
 ):
-    if current_user.is_admin:
-        return current_user
+    if token_data.is_admin:
+        return token_data
 
     raise HTTPException(
         status_code=status.HTTP_403_FORBIDDEN,
@@ -60,10 +91,10 @@ async def should_be_admin_user(
 
 
 async def should_be_academic_user(
-    current_user: Annotated[UserModel, Depends(get_current_user)],
+    token_data: Annotated[TokenData, Depends(get_token_data)],
 ):
-    if not current_user.is_admin:
-        return current_user
+    if not token_data.is_admin:
+        return token_data
 
     raise HTTPException(
         status_code=status.HTTP_403_FORBIDDEN,
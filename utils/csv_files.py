@@ -0,0 +1,51 @@
+import csv
+import io
+
+from fastapi import HTTPException, UploadFile, status
+
+from pydantic import ValidationError
+
+
+async def read_csv_rows(file: UploadFile, max_rows: int) -> list[dict]:
+    """Rows of an uploaded CSV file, keyed by the columns of its header
+
+    Values are stripped, and empty cells are left out of their row.
+    """
+    try:
+        content = (await file.read()).decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="File must be a UTF-8 encoded CSV",
+        )
+
+    csv_rows = list(csv.DictReader(io.StringIO(content)))
+    if not csv_rows:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="File must contain at least one row",
+        )
+    if len(csv_rows) > max_rows:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"File must not contain more than {max_rows} rows",
+        )
+
+    return [
+        {
+            column: value.strip()
+            for column, value in csv_row.items()
+            if column and value and value.strip()
+        }
+        for csv_row in csv_rows
+    ]
+
+
+def return_validation_error_detail(error: ValidationError) -> str:
+    """All errors of a row that failed validation, in one line"""
+    return "; ".join(
+        ".".join(str(loc) for loc in e["loc"]) + f": {e['msg']}"
+        if e["loc"]
+        else e["msg"]
+        for e in error.errors()
+    )
@@ -1,4 +1,4 @@
-from datetime import datetime, date, timedelta, timezone
+from datetime import datetime, date, time, timedelta, timezone
 
 from sqlite.enums import DaysEnum
 
@@ -26,6 +26,47 @@ def return_day_of_week_name(date: date | None) -> DaysEnum | None:
     return None
 
 
+def return_dates_in_range_for_day(
+    day: DaysEnum, start_date: date, end_date: date
+) -> list[date]:
+    """Return every date between start and end date (inclusive) on day"""
+    dates = []
+    current_date = start_date
+
+    while current_date <= end_date:
+        if return_day_of_week_name(date=current_date) == day:
+            dates.append(current_date)
+            # Same day of week again is exactly a week away
+            current_date += timedelta(days=7)
+        else:
+            current_date += timedelta(days=1)
+
+    return dates
+
+
+def return_schedule_instance_window(
+    date: date, start_time_in_utc: time, end_time_in_utc: time
+) -> tuple[datetime, datetime]:
+    """Start and end of a schedule instance as aware UTC datetimes"""
+    start = datetime.combine(date, start_time_in_utc, tzinfo=timezone.utc)
+    end = datetime.combine(date, end_time_in_utc, tzinfo=timezone.utc)
+
+    # If end time is past midnight, it is on the next day
+    if end < start:
+        end += timedelta(days=1)
+
+    return start, end
+
+
+def return_first_day_of_month(date: date, months: int = 0) -> date:
+    """First day of the month of date, shifted by a number of months"""
+    month_index = date.year * 12 + date.month - 1 + months
+
+    return date.replace(
+        year=month_index // 12, month=month_index % 12 + 1, day=1
+    )
+
+
 def convert_datetime_to_iso_8601_with_z_suffix(dt: datetime) -> str:
     """Convert datetime to ISO 8601 format with the Z suffix"""
     return dt.strftime(time_constants.CREATED_AND_UPDATED_AT_FORMAT)
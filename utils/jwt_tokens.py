@@ -1,6 +1,15 @@
+import hashlib
+
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
+from time import time
 
 from jose import jwt
+from jose.exceptions import ExpiredSignatureError
+
+from secret import secret
+
+from utils.metrics import metrics
 
 
 def create_access_token(
@@ -13,3 +22,55 @@ def create_access_token(
     encoded_jwt = jwt.encode(to_encode, key=key, algorithm=algorithm)
 
     return encoded_jwt
+
+
+def return_access_token_claims(user) -> dict:
+    """Claims that let a request be authorized without loading the user"""
+    return {
+        "sub": user.email,
+        "uid": user.id,
+        "role": user.role.value,
+        "ver": user.token_version,
+    }
+
+
+class AccessTokenCache:
+    """Payloads of access tokens whose signature was already verified
+
+    Keyed by the SHA-256 of the token, so the tokens themselves are not
+    kept. Bounded to `max_size` entries, the least recently used is evicted
+    first, and an entry is served only until its token expires.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+
+        self._payloads: OrderedDict[bytes, dict] = OrderedDict()
+
+    def decode(self, token: str, key: str, algorithm: str) -> dict:
+        digest = hashlib.sha256(token.encode()).digest()
+
+        payload = self._payloads.get(digest)
+        if payload is not None:
+            if payload["exp"] <= time():
+                del self._payloads[digest]
+                raise ExpiredSignatureError("Signature has expired.")
+
+            self._payloads.move_to_end(digest)
+            metrics.increment("access_token_cache.hits")
+            return payload
+
+        metrics.increment("access_token_cache.misses")
+        payload = jwt.decode(token, key=key, algorithms=[algorithm])
+
+        if self.max_size > 0 and "exp" in payload:
+            self._payloads[digest] = payload
+            while len(self._payloads) > self.max_size:
+                self._payloads.popitem(last=False)
+
+        return payload
+
+
+access_token_cache = AccessTokenCache(
+    max_size=secret.ACCESS_TOKEN_CACHE_MAX_SIZE
+)
@@ -0,0 +1,36 @@
+from collections import defaultdict
+
+
+class Metrics:
+    """In-process counters and timings, keyed by a dotted name"""
+
+    def __init__(self):
+        self._counters: dict[str, float] = defaultdict(float)
+        self._timings: dict[str, dict[str, float]] = {}
+        self._last: dict[str, dict] = {}
+
+    def increment(self, name: str, value: float = 1):
+        self._counters[name] += value
+
+    def observe(self, name: str, seconds: float):
+        timing = self._timings.setdefault(
+            name, {"count": 0, "sum": 0.0, "max": 0.0, "last": 0.0}
+        )
+        timing["count"] += 1
+        timing["sum"] += seconds
+        timing["max"] = max(timing["max"], seconds)
+        timing["last"] = seconds
+
+    def set_last(self, name: str, value: dict):
+        """Keep the latest value of something, like the last run of a job"""
+        self._last[name] = value
+
+    def snapshot(self) -> dict:
+        return {
+            "counters": dict(self._counters),
+            "timings": {name: dict(t) for name, t in self._timings.items()},
+            "last": dict(self._last),
+        }
+
+
+metrics = Metrics()
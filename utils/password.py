@@ -1,5 +1,16 @@
+import asyncio
+import multiprocessing
+import os
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from time import perf_counter
+
 from passlib.context import CryptContext
 
+from secret import secret
+
+from utils.metrics import metrics
+
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -12,3 +23,128 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     """Generate a hash for the provided password string"""
     return pwd_context.hash(password)
+
+
+def get_password_hashes(passwords: list[str]) -> list[str]:
+    """Generate hashes for many passwords, in a worker process"""
+    return [get_password_hash(password=password) for password in passwords]
+
+
+class PasswordProcessPool:
+    """Hashes the passwords of bulk imports across worker processes
+
+    The processes are spawned rather than forked, so they start without a
+    copy of the event loop and its connections. They are started by the
+    first import and kept for the next ones, until `shutdown`. With 0
+    `processes`, there is one per CPU.
+
+    A process hashes about 4 passwords a second at bcrypt's default cost,
+    so an import of N users takes about N / (4 * processes) seconds. 10k
+    users within a minute need about 40 processes.
+    """
+
+    # Small enough for every process to get a share of a small import
+    chunk_size = 25
+
+    def __init__(self, processes: int):
+        self.processes = processes or os.cpu_count() or 1
+
+        self._executor: ProcessPoolExecutor | None = None
+
+    async def hash_many(self, passwords: list[str]) -> list[str]:
+        if not passwords:
+            return []
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+
+        loop = asyncio.get_running_loop()
+        started_at = perf_counter()
+        chunks = await asyncio.gather(
+            *[
+                loop.run_in_executor(
+                    self._executor,
+                    get_password_hashes,
+                    passwords[index : index + self.chunk_size],
+                )
+                for index in range(0, len(passwords), self.chunk_size)
+            ]
+        )
+        metrics.observe(
+            "password_process_pool.hash_many_seconds",
+            perf_counter() - started_at,
+        )
+
+        return [password_hash for chunk in chunks for password_hash in chunk]
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+class PasswordPool:
+    """Runs bcrypt on its own bounded thread pool, off the event loop
+
+    A hash or a verification takes a few hundred milliseconds of CPU, which
+    would otherwise stall every other request of the process. bcrypt lets
+    go of the GIL while it works, so up to `max_workers` of them run in
+    parallel, and the rest wait in the pool's queue. How many had to wait,
+    and for how long, is in the metrics.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="password"
+        )
+        self._pending_count = 0
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(
+            verify_password,
+            plain_password,
+            hashed_password,
+            name="verify",
+        )
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password, name="hash")
+
+    async def _run(self, func, *args, name: str):
+        submitted_at = perf_counter()
+        started_at = None
+
+        def run():
+            nonlocal started_at
+            started_at = perf_counter()
+            return func(*args)
+
+        if self._pending_count >= self.max_workers:
+            metrics.increment("password_pool.queued")
+        self._pending_count += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, run
+            )
+        finally:
+            self._pending_count -= 1
+            if started_at is not None:
+                metrics.observe(
+                    "password_pool.wait_seconds", started_at - submitted_at
+                )
+                metrics.observe(
+                    f"password_pool.{name}_seconds",
+                    perf_counter() - started_at,
+                )
+
+
+password_pool = PasswordPool(max_workers=secret.PASSWORD_POOL_MAX_WORKERS)
+
+password_process_pool = PasswordProcessPool(
+    processes=secret.USER_IMPORT_HASHING_PROCESSES
+)
@@ -1,3 +1,5 @@
+from fastapi import Header, Query
+
 from sqlite.schemas import CommonResponseClass
 
 
@@ -8,3 +10,24 @@ def common_responses():
         404: {"model": CommonResponseClass},
         403: {"model": CommonResponseClass},
     }
+
+
+def should_return_minimal_response(
+    minimal: bool = Query(
+        False, description="Only return the id, status and timestamp"
+    ),
+    prefer: str | None = Header(None),
+) -> bool:
+    """Whether the client asked for a minimal response
+
+    Either with `?minimal=true` or the `Prefer: return=minimal` header.
+    """
+    if minimal:
+        return True
+
+    if prefer:
+        return "return=minimal" in [
+            preference.strip().lower() for preference in prefer.split(",")
+        ]
+
+    return False
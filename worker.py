@@ -0,0 +1,20 @@
+import asyncio
+import logging
+
+from jobs.registry import job_runner
+from sqlite.database import sessionmanager
+
+
+async def main():
+    try:
+        await job_runner.run_forever()
+    finally:
+        await sessionmanager.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
+
+# python worker.py
+# Or set RUN_JOBS_IN_PROCESS=true to run the same jobs inside the API